@@ -0,0 +1,368 @@
+'''ASGI server module serving the /languages routes without blocking a
+thread per in-flight request'''
+
+import asyncio
+import json
+from http import HTTPStatus
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from lang_exch.setup.setup import config
+from lang_exch.db.asyncpg_db import AsyncPostgresDB
+from lang_exch.db.database import MissingLanguagesError
+from lang_exch.db.db_manager import InvalidLanguageError, validate_language_name
+from lang_exch.models.catalog import LanguageCatalog
+from lang_exch.models.language import Language
+from lang_exch.const import dataBaseSection, serverSection, confSection
+from lang_exch.conf.log.lang_exch_logging import logger
+
+MAX_PAGE_SIZE = 1000
+MAX_LANG_ID = 2 ** 31 - 1
+language_catalog = LanguageCatalog()
+async_db = AsyncPostgresDB(db_config=dict(config._sections[confSection.DATABASE_SECTION.value]))
+
+
+def success_response(status_code=None, lang_id=None, lang_name=None, lang_obj=None) -> JSONResponse:
+    '''
+    Creates a success response with message and status_code
+
+    Args:
+        status_code: HTTP status code
+        lang_id: language id
+        lang_name: language name
+        lang_obj: language details
+
+    Returns:
+        JSONResponse
+    '''
+    message = {"error": '', "data": {"lang_id": lang_id}}
+    if lang_name is not None:
+        message['data']['lang_name'] = lang_name
+    if lang_obj is not None:
+        message['data'] = lang_obj
+    return JSONResponse(message, status_code=status_code)
+
+
+def error_response(error_string=None, status_code=None, data='') -> JSONResponse:
+    '''
+    Creates an error response with message and status_code
+
+    Args:
+        error_string: error which got generated
+        status_code: HTTP status code
+        data: optional details, e.g. a per-item report of a batch
+
+    Returns:
+        JSONResponse
+    '''
+    return JSONResponse({"error": error_string, "data": data}, status_code=status_code)
+
+
+async def startup() -> None:
+    '''Opens the connection pool and hydrates the catalog before serving'''
+    await async_db.connect()
+    language_catalog.load(await async_db.get_languages())
+    if config.getboolean(confSection.DATABASE_SECTION.value, dataBaseSection.DB_LISTEN_KEY.value, fallback=False):
+        logger.info('Subscribing to catalog changes made by other processes')
+        # reloads again once LISTEN runs and after every reconnect of the listener
+        await async_db.listen(apply_catalog_change, reload_catalog)
+
+
+async def shutdown() -> None:
+    '''Closes the connection pool'''
+    await async_db.close()
+
+
+async def reload_catalog() -> None:
+    '''Replaces the in-memory catalog with the database content'''
+    language_catalog.load(await async_db.get_languages())
+
+
+def apply_catalog_change(event: dict) -> None:
+    '''Applies a change committed by another process to the in-memory catalog'''
+    logger.info('Applying catalog change from another process: %s', event)
+    operation = event.get('op')
+    if operation in ('insert', 'update'):
+        language_catalog.update(int(event['lang_id']), event['lang_name'])
+    elif operation == 'delete':
+        language_catalog.remove(int(event['lang_id']))
+    else:
+        # bulk changes such as an import are announced without details
+        asyncio.ensure_future(reload_catalog())
+
+
+async def read_json(request):
+    '''Returns the decoded JSON request body, or an error response'''
+    try:
+        if request.headers.get('Content-type') != 'application/json':
+            return None, error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        return json.loads(await request.body()), None
+    except ValueError as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return None, error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+
+async def read_lang_name(request):
+    '''Returns the lang_name of a JSON request body, or an error response'''
+    try:
+        if request.headers.get('Content-type') != 'application/json':
+            return None, error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        lang_input = json.loads(await request.body())
+        lang_name = lang_input['lang_name']
+    except (ValueError, KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return None, error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+    if lang_name == '' or not isinstance(lang_name, str):
+        logger.error('Can not process request, Invalid input. language name must not be empty and non string')
+        return None, error_response('Invalid input', HTTPStatus.UNPROCESSABLE_ENTITY)
+    try:
+        validate_language_name(lang_name)
+    except InvalidLanguageError as lang_err:
+        return None, error_response(str(lang_err), HTTPStatus.UNPROCESSABLE_ENTITY)
+    return lang_name, None
+
+
+async def create_language(request) -> JSONResponse:
+    '''Handles a POST request for adding a new language to the database'''
+    lang_name, error = await read_lang_name(request)
+    if error is not None:
+        return error
+    with language_catalog.reserve(lang_name) as reserved:
+        if not reserved:
+            logger.error('Can not process request, language name already exists. language name must be unique')
+            return error_response('Language already exists', HTTPStatus.CONFLICT)
+        lang_id = await async_db.add_language(Language(lang_name))
+        language_catalog.add(lang_id, lang_name)
+    return success_response(HTTPStatus.CREATED, lang_id)
+
+
+async def create_languages(request) -> JSONResponse:
+    '''Handles a POST request for adding many new languages at once,
+    given a JSON array of names or {"lang_names": [...]}. Every valid
+    name is inserted within a single transaction'''
+    lang_input, error = await read_json(request)
+    if error is not None:
+        return error
+    try:
+        lang_names = lang_input['lang_names'] if isinstance(lang_input, dict) else lang_input
+        if not isinstance(lang_names, list):
+            raise TypeError('a list of language names is expected')
+    except (KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+    results = [{'lang_name': lang_name, 'lang_id': None, 'error': ''} for lang_name in lang_names]
+    candidates = []
+    for result in results:
+        try:
+            validate_language_name(result['lang_name'])
+        except InvalidLanguageError as lang_err:
+            result['error'] = str(lang_err)
+            continue
+        candidates.append(result)
+
+    with language_catalog.reserve_many([result['lang_name'] for result in candidates]) as reserved:
+        to_insert = []
+        for result, is_free in zip(candidates, reserved):
+            if is_free:
+                to_insert.append(result)
+            else:
+                result['error'] = 'Language already exists'
+        if to_insert:
+            lang_ids = await async_db.add_languages([Language(result['lang_name']) for result in to_insert])
+            for result, lang_id in zip(to_insert, lang_ids):
+                result['lang_id'] = lang_id
+                language_catalog.add(lang_id, result['lang_name'])
+    logger.info('%s of %s languages successfully added', len(to_insert), len(results))
+    status_code = HTTPStatus.CREATED if to_insert else HTTPStatus.UNPROCESSABLE_ENTITY
+    return success_response(status_code, lang_obj=results)
+
+
+async def update_languages(request) -> JSONResponse:
+    '''Handles a PATCH request for renaming many languages at once,
+    given a JSON array of {"lang_id", "lang_name"} objects or
+    {"languages": [...]}. Either every language is updated or none'''
+    lang_input, error = await read_json(request)
+    if error is not None:
+        return error
+    try:
+        languages = lang_input['languages'] if isinstance(lang_input, dict) else lang_input
+        results = [{'lang_id': int(language['lang_id']), 'lang_name': language['lang_name'], 'error': ''}
+                   for language in languages]
+    except (ValueError, KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+    seen_ids = set()
+    for result in results:
+        if result['lang_id'] in seen_ids:
+            result['error'] = 'Language ID repeated within the request'
+        elif not language_catalog.has_id(result['lang_id']):
+            result['error'] = 'Language does not exist'
+        else:
+            try:
+                validate_language_name(result['lang_name'])
+            except InvalidLanguageError as lang_err:
+                result['error'] = str(lang_err)
+        seen_ids.add(result['lang_id'])
+
+    # only valid names are reserved, an invalid one may not even be a string
+    candidates = [result for result in results if not result['error']]
+    with language_catalog.reserve_many([result['lang_name'] for result in candidates],
+                                       [result['lang_id'] for result in candidates]) as reserved:
+        for result, is_free in zip(candidates, reserved):
+            if not is_free:
+                result['error'] = 'Language name must be unique'
+        if any(result['error'] for result in results):
+            logger.error('Can not process request, batch update rejected as a whole')
+            return error_response('Batch rejected, no language was updated',
+                                  HTTPStatus.UNPROCESSABLE_ENTITY, results)
+        try:
+            await async_db.update_languages([Language(result['lang_name'], result['lang_id'])
+                                             for result in results])
+        except MissingLanguagesError as missing_err:
+            for result in results:
+                if result['lang_id'] in missing_err.lang_ids:
+                    result['error'] = 'Language does not exist'
+            return error_response('Batch rejected, no language was updated', HTTPStatus.NOT_FOUND, results)
+        for result in results:
+            language_catalog.update(result['lang_id'], result['lang_name'])
+    logger.info('%s languages successfully updated', len(results))
+    return success_response(HTTPStatus.OK, lang_obj=results)
+
+
+async def delete_languages(request) -> JSONResponse:
+    '''Handles a DELETE request for deleting many languages at once,
+    given a JSON array of ids or {"lang_ids": [...]}. Either every
+    language is deleted or none'''
+    lang_input, error = await read_json(request)
+    if error is not None:
+        return error
+    try:
+        lang_ids = lang_input['lang_ids'] if isinstance(lang_input, dict) else lang_input
+        results = [{'lang_id': int(lang_id), 'error': ''} for lang_id in lang_ids]
+    except (ValueError, KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+    for result in results:
+        if not language_catalog.has_id(result['lang_id']):
+            result['error'] = 'Language does not exist'
+    if any(result['error'] for result in results):
+        logger.error('Can not process request, batch delete rejected as a whole')
+        return error_response('Batch rejected, no language was deleted', HTTPStatus.NOT_FOUND, results)
+    lang_ids = list(dict.fromkeys(result['lang_id'] for result in results))
+    try:
+        await async_db.delete_languages([Language(lang_id=lang_id) for lang_id in lang_ids])
+    except MissingLanguagesError as missing_err:
+        for result in results:
+            if result['lang_id'] in missing_err.lang_ids:
+                result['error'] = 'Language does not exist'
+        return error_response('Batch rejected, no language was deleted', HTTPStatus.NOT_FOUND, results)
+    for lang_id in lang_ids:
+        language_catalog.remove(lang_id)
+    logger.info('%s languages successfully deleted', len(lang_ids))
+    return success_response(HTTPStatus.OK, lang_obj=results)
+
+
+async def update_language(request) -> JSONResponse:
+    '''Handles a PUT request for updating an existing language'''
+    lang_id = request.path_params['lang_id']
+    lang_name, error = await read_lang_name(request)
+    if error is not None:
+        return error
+    if not language_catalog.has_id(lang_id):
+        logger.error('Can not process request, language ID does not exist to update')
+        return error_response('Language does not exist', HTTPStatus.NOT_FOUND)
+    with language_catalog.reserve(lang_name, lang_id) as reserved:
+        if not reserved:
+            logger.error('Can not process request, language name already exists. language name must be unique')
+            return error_response('Language name must be unique', HTTPStatus.CONFLICT)
+        await async_db.update_language(Language(lang_id=lang_id), lang_name)
+        language_catalog.update(lang_id, lang_name)
+    return success_response(HTTPStatus.OK, lang_id)
+
+
+async def delete_language(request) -> JSONResponse:
+    '''Handles a DELETE request for deleting an existing language'''
+    lang_id = request.path_params['lang_id']
+    if not language_catalog.has_id(lang_id):
+        logger.error('Language does not exist with ID:%s', lang_id)
+        return error_response('Language does not exist', HTTPStatus.NOT_FOUND)
+    await async_db.delete_language(Language(lang_id=lang_id))
+    language_catalog.remove(lang_id)
+    return success_response(HTTPStatus.OK, lang_id)
+
+
+async def get_a_language(request) -> JSONResponse:
+    '''Handles a GET request to retrieve a language record'''
+    lang_id = request.path_params['lang_id']
+    if not language_catalog.has_id(lang_id):
+        logger.error('No data found for reqested language with ID: %s', lang_id)
+        return error_response('Language does not exist', HTTPStatus.NOT_FOUND)
+    lang_name = await async_db.get_language(lang_id)
+    return success_response(HTTPStatus.OK, lang_id, lang_name)
+
+
+async def get_languages(request) -> JSONResponse:
+    '''Handles a GET request to retrieve every language record, one
+    page of them with limit and after_id, or, with stream=true, every
+    record streamed as the JSON array is produced'''
+    try:
+        limit = request.query_params.get('limit')
+        after_id = request.query_params.get('after_id')
+        limit = int(limit) if limit is not None else None
+        after_id = int(after_id) if after_id is not None else None
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+        # ids are 32 bit integers in the database
+        if after_id is not None and not 0 <= after_id <= MAX_LANG_ID:
+            raise ValueError(f'after_id must be between 0 and {MAX_LANG_ID}')
+    except ValueError as arg_err:
+        return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+    if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return StreamingResponse(stream_languages(), media_type='application/json')
+    if limit is None and after_id is None:
+        id_name_map = await async_db.get_languages()
+        return success_response(HTTPStatus.OK, lang_obj=[
+            {'lang_id': id, 'lang_name': name} for id, name in id_name_map.items()])
+    id_name_map = await async_db.get_languages(limit=limit or MAX_PAGE_SIZE, after_id=after_id)
+    languages = [{'lang_id': id, 'lang_name': name} for id, name in id_name_map.items()]
+    next_after_id = languages[-1]['lang_id'] if len(languages) == (limit or MAX_PAGE_SIZE) else None
+    return success_response(HTTPStatus.OK, lang_obj={'languages': languages, 'next_after_id': next_after_id})
+
+
+async def stream_languages():
+    '''Yields every language as a JSON array produced row by row from a
+    server side cursor, so peak memory does not depend on the catalog size'''
+    yield '{"error": "", "data": ['
+    separator = ''
+    async for lang_id, lang_name in async_db.iter_languages():
+        yield separator + json.dumps({'lang_id': lang_id, 'lang_name': lang_name})
+        separator = ', '
+    yield ']}'
+
+
+app = Starlette(
+    routes=[
+        Route('/languages', create_language, methods=['POST']),
+        Route('/languages', update_languages, methods=['PATCH']),
+        Route('/languages', delete_languages, methods=['DELETE']),
+        Route('/languages/bulk', create_languages, methods=['POST']),
+        Route('/languages/', get_languages, methods=['GET']),
+        Route('/languages/{lang_id:int}', get_a_language, methods=['GET']),
+        Route('/languages/{lang_id:int}', update_language, methods=['PUT']),
+        Route('/languages/{lang_id:int}', delete_language, methods=['DELETE']),
+    ],
+    on_startup=[startup],
+    on_shutdown=[shutdown])
+
+
+if __name__ == '__main__':
+
+    server_section = confSection.SERVER_SECTION.value
+    uvicorn.run(app, host=config[server_section][serverSection.SERVER_IP_KEY.value],
+                port=int(config[server_section][serverSection.SERVER_PORT_KEY.value]))
@@ -0,0 +1,309 @@
+'''Benchmark driving every /languages route of server.py
+
+Runs each endpoint at a configurable concurrency against a catalog of a
+configurable size, reports throughput and p50/p95/p99 latency, writes the
+results as JSON and compares two result files.
+
+Run it from the repository root, the configuration path is relative:
+
+    python benchmarks/bench_endpoints.py run --catalog-size 10000 --concurrency 8 -o new.json
+    python benchmarks/bench_endpoints.py compare base.json new.json --threshold 10
+
+The database provider defaults to the in-memory SQLite one, so no database
+server is needed. Any registered provider name or module:class path of a
+Database implementation can be plugged in with --provider.
+'''
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import string
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lang_exch.setup.setup import config  # noqa: E402
+from lang_exch.const import confSection, dataBaseSection  # noqa: E402
+
+
+def synthetic_names(prefix='Lang'):
+    '''Yields unique alphabetic language names starting with prefix.
+    Two prefixes of which neither starts the other never yield the same
+    name'''
+    for length in itertools.count(1):
+        for letters in itertools.product(string.ascii_lowercase, repeat=length):
+            yield prefix + ''.join(letters)
+
+
+def percentile(sorted_values, fraction):
+    '''Returns the nearest-rank percentile of an already sorted list'''
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class TestClientTransport:
+    '''Sends requests through the Flask test client, one per thread'''
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.open(path, method=method, data=body,
+                               content_type='application/json' if body is not None else None)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    '''Sends requests over a real socket to a local threaded server'''
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        self._server = make_server('127.0.0.1', 0, app, threaded=True)
+        self._port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection('127.0.0.1', self._port)
+        headers = {'Content-type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self._server.shutdown()
+
+
+class Scenario:
+    '''Produces the requests of every benchmarked endpoint'''
+
+    def __init__(self, catalog_ids, batch_size):
+        self._catalog_ids = catalog_ids
+        self._batch_size = batch_size
+        # distinct from the seeded names, a write must never hit name_taken
+        self._names = synthetic_names('Edit')
+        self._lock = threading.Lock()
+        # ids created during the run, consumed by the delete endpoints
+        self._created = []
+
+    def _next_name(self):
+        with self._lock:
+            return next(self._names)
+
+    def _pick_id(self, counter):
+        return self._catalog_ids[counter % len(self._catalog_ids)]
+
+    def _take_created(self, count):
+        with self._lock:
+            taken, self._created = self._created[:count], self._created[count:]
+        return taken
+
+    def remember(self, lang_id):
+        with self._lock:
+            self._created.append(lang_id)
+
+    def endpoints(self):
+        '''Returns (name, expected status, request factory) triples, a
+        factory taking a request counter and returning (method, path, body)'''
+        return [
+            ('GET /languages/<id>', HTTPStatus.OK, lambda i: ('GET', f'/languages/{self._pick_id(i)}', None)),
+            ('GET /languages/', HTTPStatus.OK, lambda i: ('GET', '/languages/', None)),
+            ('GET /languages/?limit', HTTPStatus.OK,
+             lambda i: ('GET', f'/languages/?limit=100&after_id={self._pick_id(i)}', None)),
+            ('GET /languages/?stream', HTTPStatus.OK, lambda i: ('GET', '/languages/?stream=true', None)),
+            ('POST /languages', HTTPStatus.CREATED,
+             lambda i: ('POST', '/languages', json.dumps({'lang_name': self._next_name()}))),
+            ('PUT /languages/<id>', HTTPStatus.OK, lambda i: ('PUT', f'/languages/{self._pick_id(i)}',
+                                                              json.dumps({'lang_name': self._next_name()}))),
+            ('POST /languages/bulk', HTTPStatus.CREATED, lambda i: ('POST', '/languages/bulk', json.dumps(
+                [self._next_name() for _ in range(self._batch_size)]))),
+            ('PATCH /languages', HTTPStatus.OK, lambda i: ('PATCH', '/languages', json.dumps(
+                [{'lang_id': self._pick_id(i * self._batch_size + j), 'lang_name': self._next_name()}
+                 for j in range(self._batch_size)]))),
+            ('DELETE /languages/<id>', HTTPStatus.OK,
+             lambda i: ('DELETE', f'/languages/{(self._take_created(1) or [0])[0]}', None)),
+            ('DELETE /languages', HTTPStatus.OK, lambda i: ('DELETE', '/languages',
+                                                            json.dumps(self._take_created(self._batch_size)))),
+        ]
+
+
+def check_statuses(name, stats, expected):
+    '''Exits if an endpoint answered anything but the expected status,
+    its numbers would not measure the work under test'''
+    unexpected = {status: count for status, count in stats['statuses'].items() if int(status) != expected}
+    if unexpected:
+        sys.exit(f'{name} answered {unexpected}, expected only {int(expected)}')
+
+
+def run_endpoint(transport, factory, requests, concurrency):
+    '''Sends requests for one endpoint and returns its statistics'''
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker(_):
+        local_latencies = []
+        local_statuses = {}
+        while True:
+            i = next(counter)
+            if i >= requests:
+                break
+            method, path, body = factory(i)
+            started = time.perf_counter()
+            status = transport.request(method, path, body)
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def run(args):
+    '''Seeds the catalog, benchmarks every endpoint and writes the results'''
+    config.set(confSection.DATABASE_SECTION.value, dataBaseSection.DB_PROVIDER_KEY.value, args.provider)
+    # must be imported once the provider is set, DBFactory is a singleton
+    import server
+    from lang_exch.db.db_manager import DatabaseManager
+
+    db_manager = DatabaseManager()
+    names = synthetic_names()
+    remaining = args.catalog_size
+    while remaining > 0:
+        chunk = min(remaining, 5000)
+        db_manager.add_languages([next(names) for _ in range(chunk)])
+        remaining -= chunk
+    server.reload_catalog()
+    catalog_ids = [lang_id for lang_id, _ in server.language_catalog.items()]
+    if not catalog_ids:
+        sys.exit('The catalog is empty, use a positive --catalog-size')
+
+    transport = HTTPTransport(server.app) if args.transport == 'http' else TestClientTransport(server.app)
+    scenario = Scenario(catalog_ids, args.batch_size)
+    # make sure the delete endpoints have something to delete
+    deletable = (args.requests + args.warmup) * (args.batch_size + 1)
+    for lang_id in db_manager.add_languages([next(names) for _ in range(deletable)]):
+        scenario.remember(lang_id)
+    server.reload_catalog()
+
+    selected = set(args.endpoint or [])
+    results = {}
+    for name, expected, factory in scenario.endpoints():
+        if selected and name not in selected:
+            continue
+        # warm up caches and code paths outside of the measurement
+        check_statuses(name, run_endpoint(transport, factory, min(args.warmup, args.requests), 1), expected)
+        results[name] = run_endpoint(transport, factory, args.requests, args.concurrency)
+        stats = results[name]
+        print(f"{name:28} {stats['throughput']:10.1f} req/s  p50 {stats['p50_ms']:8.3f} ms  "
+              f"p95 {stats['p95_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms  {stats['statuses']}")
+        check_statuses(name, stats, expected)
+    transport.close()
+
+    report = {
+        'meta': {'provider': args.provider, 'transport': args.transport, 'catalog_size': args.catalog_size,
+                 'concurrency': args.concurrency, 'requests': args.requests, 'batch_size': args.batch_size,
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'endpoints': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f'Results written to {args.output}')
+
+
+def compare(args):
+    '''Prints the change of every metric between two result files and
+    exits with 1 if any endpoint regressed beyond the threshold'''
+    with open(args.base) as base_file, open(args.new) as new_file:
+        base = json.load(base_file)['endpoints']
+        new = json.load(new_file)['endpoints']
+    regressions = []
+    print(f"{'endpoint':28} {'throughput':>12} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for name in sorted(set(base) & set(new)):
+        deltas = {}
+        for metric in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms'):
+            before, after = base[name][metric], new[name][metric]
+            deltas[metric] = (after - before) / before * 100 if before else 0.0
+        print(f"{name:28} {deltas['throughput']:+11.1f}% {deltas['p50_ms']:+9.1f}% "
+              f"{deltas['p95_ms']:+9.1f}% {deltas['p99_ms']:+9.1f}%")
+        if deltas['throughput'] < -args.threshold or \
+                any(deltas[metric] > args.threshold for metric in ('p50_ms', 'p95_ms', 'p99_ms')):
+            regressions.append(name)
+    for name in sorted(set(base) ^ set(new)):
+        print(f'{name:28} only present in one of the runs')
+    if regressions:
+        print(f"Regressed beyond {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='benchmark the endpoints')
+    run_parser.add_argument('--provider', default='sqlite',
+                            help='database provider name or module:class (default: sqlite)')
+    run_parser.add_argument('--transport', choices=('client', 'http'), default='client',
+                            help='Flask test client or a local HTTP server (default: client)')
+    run_parser.add_argument('--catalog-size', type=int, default=1000)
+    run_parser.add_argument('--concurrency', type=int, default=4)
+    run_parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    run_parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per endpoint')
+    run_parser.add_argument('--batch-size', type=int, default=10, help='items per bulk/batch request')
+    run_parser.add_argument('--endpoint', action='append', help='only run this endpoint, repeatable')
+    run_parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=10.0,
+                                help='allowed change in percent (default: 10)')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
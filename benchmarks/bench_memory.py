@@ -0,0 +1,109 @@
+'''Benchmark measuring the memory held per language by each catalog representation
+
+Builds every representation for the same synthetic catalog and reports the
+bytes allocated per language, as traced by tracemalloc:
+
+    python benchmarks/bench_memory.py --size 100000 -o memory.json
+
+"before" rows are the previous representations, a Language with a
+per-instance __dict__ and a dict of boxed ids to names, "after" rows the
+slotted Language and the columnar CatalogSnapshot. Language objects are
+measured without their names, which they share with the input.
+'''
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lang_exch.models.catalog import LanguageCatalog  # noqa: E402
+from lang_exch.models.language import Language  # noqa: E402
+from lang_exch.models.snapshot import CatalogSnapshot  # noqa: E402
+
+
+class DictLanguage:
+    '''The Language model as it was, with a per-instance __dict__'''
+
+    def __init__(self, lang_name=None, lang_id=None):
+        self._lang_id = lang_id
+        self._lang_name = lang_name
+
+
+def synthetic_pairs(size):
+    '''Returns (lang_id, lang_name) pairs with freshly allocated names, the
+    ids starting high enough to not be cached small ints'''
+    names = (''.join(letters) for length in itertools.count(1)
+             for letters in itertools.product(string.ascii_lowercase, repeat=length))
+    return [(1000000 + index, 'Lang' + name) for index, name in zip(range(size), names)]
+
+
+def traced_bytes(build):
+    '''Returns the bytes still allocated by build() once it returned,
+    along with its result so that it stays alive while measured'''
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return allocated, result
+
+
+def measure(size):
+    '''Returns bytes per language of every representation'''
+    pairs = synthetic_pairs(size)
+
+    cases = [
+        ('before', 'Language objects', lambda: [DictLanguage(name, lang_id) for lang_id, name in pairs]),
+        ('after', 'Language objects', lambda: [Language(name, lang_id) for lang_id, name in pairs]),
+        # own copies of the ids and names, as held after a fetch
+        ('before', 'id -> name map', lambda: {int(str(lang_id)): name.encode().decode()
+                                               for lang_id, name in pairs}),
+        ('after', 'CatalogSnapshot', lambda: CatalogSnapshot(pairs)),
+        ('info', 'LanguageCatalog indexes', lambda: _loaded_catalog(pairs)),
+    ]
+    results = []
+    for stage, name, build in cases:
+        allocated, kept = traced_bytes(build)
+        results.append({'stage': stage, 'representation': name, 'bytes': allocated,
+                        'bytes_per_language': allocated / size})
+        del kept
+    return {'results': results}
+
+
+def _loaded_catalog(pairs):
+    catalog = LanguageCatalog()
+    catalog.load(dict(pairs))
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=100000, help='number of languages')
+    parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    report = measure(args.size)
+    print(f"{'stage':8} {'representation':26} {'bytes/language':>15}")
+    for result in report['results']:
+        print(f"{result['stage']:8} {result['representation']:26} {result['bytes_per_language']:15.1f}")
+
+    report['meta'] = {'size': args.size, 'python': platform.python_version(),
+                      'platform': platform.platform(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,9 @@
+import atexit
 import logging
 import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
 
 from lang_exch.const import confSection, loggingSection
 from lang_exch.setup.setup import config
@@ -7,8 +11,12 @@ from lang_exch.setup.setup import config
 LOG_LEVEL = config[confSection.LOGGING_SECTION.value][loggingSection.LOG_LEVEL_KEY.value]
 LOG_FILE = config[confSection.LOGGING_SECTION.value][loggingSection.LOG_FILE_KEY.value]
 LOG_PATH = config[confSection.LOGGING_SECTION.value][loggingSection.LOG_PATH_KEY.value]
+LOG_QUEUE_SIZE = int(config[confSection.LOGGING_SECTION.value].get(loggingSection.LOG_QUEUE_SIZE_KEY.value, 10000))
+LOG_SAMPLE_RATE = float(config[confSection.LOGGING_SECTION.value].get(loggingSection.LOG_SAMPLE_RATE_KEY.value, 1.0))
 
 logger = logging.getLogger('language-exchange')
+# per-row and per-request lines, only a LOG_SAMPLE_RATE fraction of them is kept
+sampled_logger = logging.getLogger('language-exchange.sampled')
 
 log_level_mapping = {
     "INFO": logging.INFO,
@@ -18,19 +26,77 @@ log_level_mapping = {
     "ERROR": logging.ERROR
 }
 
+
+class DroppingQueueHandler(QueueHandler):
+    '''Hands records over to a bounded queue without ever blocking the
+    caller. Records arriving while the queue is full are dropped and
+    counted'''
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # formatting is left to the listener thread, the record is only
+        # stripped of what can not cross threads safely
+        record.exc_text = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    '''Keeps a random rate fraction of the records, 1.0 keeps them all'''
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
 # DEBUG < INFO < WARNING < ERROR < CRITICAL
-# Defualt root logger level is WARNING.
-# So, if not set, level above warning will not be logged
-logger.setLevel(log_level_mapping['DEBUG'])
+# The logger level is the configured one, so calls below it return before
+# a record is even created
+logger.setLevel(log_level_mapping[LOG_LEVEL])
+sampled_logger.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
 
 log_file = os.path.join(LOG_PATH, LOG_FILE)
 handler = logging.FileHandler(os.path.abspath(log_file))
-
-# From INFO onwards, logs will be populated
 handler.setLevel(log_level_mapping[LOG_LEVEL])
 
 log_format = '%(asctime)s %(name)s [%(process)d]: %(levelname)s %(message)s'
-formatter = logging.Formatter(log_format, "%Y-%m-%d %H:%M:%S")  
+formatter = logging.Formatter(log_format, "%Y-%m-%d %H:%M:%S")
 handler.setFormatter(formatter)
 
-logger.addHandler(handler)
+# request threads only enqueue, the file is written by the listener thread
+queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+logger.addHandler(queue_handler)
+
+listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+listener.start()
+
+
+def _stop_listener():
+    listener.stop()
+
+
+def _restart_listener_in_child():
+    '''A forked worker inherits the queue but not the listener thread,
+    so it starts its own on a fresh queue'''
+    global listener
+    queue_handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    listener.start()
+
+
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_restart_listener_in_child)
@@ -7,6 +7,8 @@ class confSection(Enum):
     STORAGE_SECTION = "storage"
     DATABASE_SECTION = "database"
     SERVER_SECTION = "server"
+    CACHE_SECTION = "cache"
+    CATALOG_SECTION = "catalog"
 
 class dataBaseSection(Enum):
     DB_PROVIDER_KEY = "provider"
@@ -15,15 +17,65 @@ class dataBaseSection(Enum):
     DB_PORT_KEY = "port"
     DB_USERNAME_KEY = "username"
     DB_PASSWORD_KEY = "password"
+    DB_POOL_MIN_SIZE_KEY = "pool_min_size"
+    DB_POOL_MAX_SIZE_KEY = "pool_max_size"
+    DB_POOL_TIMEOUT_KEY = "pool_timeout"
+    DB_POOL_HEALTH_CHECK_KEY = "pool_health_check_interval"
+    DB_NOTIFY_CHANNEL_KEY = "notify_channel"
+    DB_LISTEN_KEY = "listen_for_changes"
+    DB_STREAM_ITERSIZE_KEY = "stream_itersize"
+    DB_SQLITE_PATH_KEY = "sqlite_path"
+    DB_WRITE_BATCH_WINDOW_KEY = "write_batch_window_ms"
+    DB_WRITE_BATCH_MAX_SIZE_KEY = "write_batch_max_size"
+    DB_CONNECT_TIMEOUT_KEY = "connect_timeout"
+    DB_STATEMENT_TIMEOUT_KEY = "statement_timeout_ms"
+    DB_BULK_STATEMENT_TIMEOUT_KEY = "bulk_statement_timeout_ms"
+    DB_READ_RETRIES_KEY = "read_retries"
+    DB_RETRY_BACKOFF_KEY = "retry_backoff_ms"
+    DB_BREAKER_THRESHOLD_KEY = "breaker_failure_threshold"
+    DB_BREAKER_RESET_KEY = "breaker_reset_timeout"
+    DB_REPLICA_DSNS_KEY = "replica_dsns"
+    DB_READ_YOUR_WRITES_KEY = "read_your_writes_ms"
+    DB_TRANSFER_STATEMENT_TIMEOUT_KEY = "transfer_statement_timeout_ms"
+    DB_COPY_BUFFER_SIZE_KEY = "copy_buffer_size"
+
+class cacheSection(Enum):
+    CACHE_ENABLED_KEY = "enabled"
+    CACHE_TTL_KEY = "ttl"
+    CACHE_MAX_SIZE_KEY = "max_size"
+
+class catalogSection(Enum):
+    CATALOG_FUZZY_GUARD_KEY = "fuzzy_duplicate_guard"
+    CATALOG_MAX_DISTANCE_KEY = "max_edit_distance"
+    CATALOG_SIMILAR_LIMIT_KEY = "similar_limit"
 
 class loggingSection(Enum):
     LOG_FILE_KEY = "log_file"
     LOG_LEVEL_KEY = "log_level"
     LOG_PATH_KEY = "log_path"
+    LOG_QUEUE_SIZE_KEY = "queue_size"
+    LOG_SAMPLE_RATE_KEY = "sample_rate"
     
 class serverSection(Enum):
     SERVER_IP_KEY = "ip"
     SERVER_PORT_KEY = "port"
+    SERVER_JSON_ENCODER_KEY = "json_encoder"
+    SERVER_RESPONSE_CACHE_SIZE_KEY = "response_cache_size"
+    SERVER_GZIP_MIN_SIZE_KEY = "gzip_min_size"
+    SERVER_MODE_KEY = "mode"
+    SERVER_WORKERS_KEY = "workers"
+    SERVER_THREADS_KEY = "threads"
+    SERVER_MAX_REQUESTS_KEY = "max_requests"
+    SERVER_MAX_REQUESTS_JITTER_KEY = "max_requests_jitter"
+    SERVER_TIMEOUT_KEY = "timeout"
+    SERVER_GRACEFUL_TIMEOUT_KEY = "graceful_timeout"
+    SERVER_READ_CONCURRENCY_KEY = "read_concurrency"
+    SERVER_READ_QUEUE_KEY = "read_queue"
+    SERVER_WRITE_CONCURRENCY_KEY = "write_concurrency"
+    SERVER_WRITE_QUEUE_KEY = "write_queue"
+    SERVER_QUEUE_TIMEOUT_KEY = "admission_queue_timeout_ms"
+    SERVER_RETRY_AFTER_KEY = "retry_after"
+    SERVER_DEGRADED_READS_KEY = "serve_reads_from_catalog"
     DB_HOST_KEY = "host"
     DB_PORT_KEY = "port"
     DB_USERNAME_KEY = "username"
@@ -0,0 +1,121 @@
+'''Module for Any of the asynchronous Database routines'''
+
+from abc import ABCMeta, abstractmethod
+from lang_exch.models.language import Language
+
+
+class AsyncDatabase(metaclass=ABCMeta):
+    '''Abstract base class for any non-blocking database communication.
+    Mirrors Database with coroutine methods'''
+
+    def __init__(self, host, port, username, password):
+        '''Init method'''
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+
+    @abstractmethod
+    async def connect(self):
+        '''
+        opens the connections to the database
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def close(self):
+        '''
+        closes the connections with databse
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    def is_open(self):
+        '''
+        Returns true if connection with database is open
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    def get_host(self):
+        '''
+        Returns the hostname used while connecting to database
+        '''
+        return self._host
+
+    def get_port(self):
+        '''
+        Returns the port used while connecting to database
+        '''
+        return self._port
+
+    async def listen(self, on_change, on_reconnect=None) -> bool:
+        '''
+        Subscribes to catalog changes made by other processes, awaiting
+        on_reconnect whenever the subscription (re)starts. Providers
+        which can publish change notifications override this.
+        Returns False if the provider does not support it
+        '''
+        return False
+
+    @abstractmethod
+    async def get_languages(self, limit: int = None, after_id: int = None) -> dict:
+        '''
+        Returns all the information for every
+        language present in the database, or for a single
+        page of at most limit languages with an id greater
+        than after_id, ordered by id
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def get_language(self, lang_id: int) -> str:
+        '''
+        Returns all the information for a given
+        language present in the database
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def add_language(self, lang_obj: Language) -> int:
+        '''Inserts a new language into the database'''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def delete_language(self, lang_obj: Language) -> None:
+        '''Deletes an existing language from the database'''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def update_language(self, lang_obj: Language, new_lang: str) -> None:
+        '''Updates an existing language from the database'''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def add_languages(self, lang_objs: list) -> list:
+        '''Inserts many new languages within a single transaction and
+        returns their ids in the order of lang_objs'''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def update_languages(self, lang_objs: list) -> None:
+        '''
+        Renames many existing languages within a single transaction.
+        Raises MissingLanguagesError, updating none, if any is missing
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    async def delete_languages(self, lang_objs: list) -> None:
+        '''
+        Deletes many existing languages within a single transaction.
+        Raises MissingLanguagesError, deleting none, if any is missing
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    def iter_languages(self, itersize: int = None):
+        '''
+        Asynchronous generator of every (lang_id, lang_name) ordered
+        by id, fetching itersize rows per round trip
+        '''
+        raise NotImplementedError('Derived class must implement this')
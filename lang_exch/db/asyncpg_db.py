@@ -0,0 +1,367 @@
+'''Module for non-blocking Postgres Database routines'''
+
+import asyncio
+import json
+import random
+
+import asyncpg
+
+from lang_exch.db.async_database import AsyncDatabase
+from lang_exch.db.change_events import event_payload, is_own_event
+from lang_exch.db.database import MissingLanguagesError
+from lang_exch.models.language import Language
+from lang_exch.conf.log.lang_exch_logging import logger, sampled_logger
+from lang_exch.const import dataBaseSection
+
+
+class AsyncPostgresDB(AsyncDatabase):
+    '''Connects and communicates to postgres database through asyncpg'''
+
+    def __init__(self, **kwargs):
+        '''Init method
+        Args:
+            db_config: dict of the database section of the configuration
+
+        Returns:
+            AsyncPostgresDB()
+        '''
+        for args_val in kwargs.values():
+            db_conf_dict = args_val
+
+        self._host = db_conf_dict[dataBaseSection.DB_HOST_KEY.value]
+        self._port = db_conf_dict[dataBaseSection.DB_PORT_KEY.value]
+        self._username = db_conf_dict[dataBaseSection.DB_USERNAME_KEY.value]
+        self._password = db_conf_dict[dataBaseSection.DB_PASSWORD_KEY.value]
+        self._database = db_conf_dict[dataBaseSection.DB_DATABASE_KEY.value]
+        super().__init__(self._host, self._port, self._username, self._password)
+        self._pool_min_size = int(db_conf_dict.get(dataBaseSection.DB_POOL_MIN_SIZE_KEY.value, 1))
+        self._pool_max_size = int(db_conf_dict.get(dataBaseSection.DB_POOL_MAX_SIZE_KEY.value, 10))
+        self._pool_timeout = float(db_conf_dict.get(dataBaseSection.DB_POOL_TIMEOUT_KEY.value, 30))
+        self._notify_channel = db_conf_dict.get(dataBaseSection.DB_NOTIFY_CHANNEL_KEY.value,
+                                                'lang_exch_languages')
+        self._stream_itersize = int(db_conf_dict.get(dataBaseSection.DB_STREAM_ITERSIZE_KEY.value, 2000))
+        self.__pool = None
+        self.__listener_task = None
+
+    async def connect(self) -> None:
+        '''creates the asyncpg connection pool
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        if self.__pool is not None:
+            return
+        self.__pool = await asyncpg.create_pool(
+                    host=self._host,
+                    user=self._username,
+                    password=self._password,
+                    database=self._database,
+                    port=int(self._port),
+                    min_size=self._pool_min_size,
+                    max_size=self._pool_max_size,
+                    timeout=self._pool_timeout)
+        logger.debug('Connected to postgres database: %s:%s/%s', self._host, self._port, self._database)
+
+    async def close(self) -> None:
+        '''closes every pooled connection with postgres
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        if self.__listener_task is not None:
+            self.__listener_task.cancel()
+            try:
+                await self.__listener_task
+            except asyncio.CancelledError:
+                pass
+            self.__listener_task = None
+        if self.__pool is not None:
+            await self.__pool.close()
+            self.__pool = None
+
+    def is_open(self) -> bool:
+        '''Returns True if the connection pool is open'''
+        return self.__pool is not None
+
+    async def listen(self, on_change, on_reconnect=None) -> bool:
+        '''Subscribes to the change events published by other processes.
+        The subscription runs in a background task which LISTENs again,
+        with jittered backoff, whenever its connection drops
+
+        Args:
+            on_change: callable(dict) receiving every change event
+            on_reconnect: coroutine function awaited every time the task
+                starts listening, the first time included, as changes
+                committed while nothing listened were never notified
+
+        Returns:
+            bool: True as postgres supports change notifications
+        '''
+        def _on_notify(conn, pid, channel, payload):
+            try:
+                event = json.loads(payload)
+            except ValueError:
+                logger.error('Ignoring malformed catalog notification: %s', payload)
+                return
+            if is_own_event(event):
+                return
+            try:
+                on_change(event)
+            except Exception as callback_err:
+                logger.error('Failed to apply catalog change %s: %s', event, callback_err)
+
+        if self.__listener_task is None:
+            self.__listener_task = asyncio.ensure_future(self._listen_forever(_on_notify, on_reconnect))
+        return True
+
+    async def _listen_forever(self, on_notify, on_reconnect, poll_interval=5.0, max_backoff=30.0) -> None:
+        '''Listens until cancelled, reconnecting with jittered backoff'''
+        backoff = 0.5
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(
+                        host=self._host, user=self._username, password=self._password,
+                        database=self._database, port=int(self._port))
+                await conn.add_listener(self._notify_channel, on_notify)
+                logger.info('Listening for catalog changes on channel: %s', self._notify_channel)
+                if on_reconnect is not None:
+                    await on_reconnect()
+                backoff = 0.5
+                # notifications arrive through on_notify, this only notices a dropped connection
+                while True:
+                    await asyncio.sleep(poll_interval)
+                    await asyncio.wait_for(conn.fetchval('SELECT 1;'), poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as listen_err:
+                logger.error('Catalog change listener lost its connection: %s', listen_err)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            # missed notifications are recovered by on_reconnect
+            await asyncio.sleep(random.uniform(0, backoff))
+            backoff = min(backoff * 2, max_backoff)
+
+    async def _notify(self, conn, operation: str, lang_id=None, lang_name=None) -> None:
+        '''Publishes a change event within the current transaction'''
+        payload = event_payload(operation, lang_id, lang_name)
+        await conn.execute('SELECT pg_notify($1, $2);', self._notify_channel, payload)
+
+    async def add_language(self, lang_obj: Language) -> int:
+        '''A new table entry will be added for a new language
+
+        Args:
+            lang_obj: object of type Language
+
+        Returns:
+            int: id of the new language
+        '''
+        lang = lang_obj.get_language_name()
+        logger.info('Querying database to insert a new language:%s to a postgres db', lang)
+        async with self.__pool.acquire() as conn:
+            async with conn.transaction():
+                language_id = await conn.fetchval("""
+                INSERT INTO lang_exch.languages (lang_name)
+                VALUES ($1) RETURNING lang_id;
+                """, lang)
+                await self._notify(conn, 'insert', language_id, lang)
+        logger.info('New language:%s successfully added in the Database: %s', lang, language_id)
+        return language_id
+
+    async def update_language(self, lang_obj: Language, new_lang: str) -> None:
+        '''An entry will be updated for the existing language
+
+        Args:
+            lang_obj: object of type Language
+            new_lang: A new language name
+
+        Returns:
+            None
+        '''
+        lang_id = lang_obj.get_lang_id()
+        logger.info('Querying database to update a language with ID:%s with new lang: %s', lang_id, new_lang)
+        async with self.__pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                UPDATE lang_exch.languages SET lang_name = $1
+                WHERE lang_id = $2;
+                """, new_lang, lang_id)
+                await self._notify(conn, 'update', lang_id, new_lang)
+        logger.info('language successfully updated with %s in the Database', new_lang)
+
+    async def delete_language(self, lang_obj: Language) -> None:
+        '''An entry for the requested language will be deleted
+
+        Args:
+            lang_obj: An object of type Language
+
+        Returns:
+            None
+        '''
+        lang_id = lang_obj.get_lang_id()
+        logger.info('Querying database to delete a language with ID:%s to a postgres db', lang_id)
+        async with self.__pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                DELETE FROM lang_exch.languages
+                WHERE lang_id = $1;
+                """, lang_id)
+                await self._notify(conn, 'delete', lang_id)
+        logger.info('language successfully deleted from the Database')
+
+    async def add_languages(self, lang_objs: list) -> list:
+        '''New table entries will be added for every language within a
+        single INSERT ... SELECT FROM unnest(...) statement and transaction
+
+        Args:
+            lang_objs: list of objects of type Language with unique names
+
+        Returns:
+            list: ids of the new languages, in the order of lang_objs
+        '''
+        lang_names = [lang_obj.get_language_name() for lang_obj in lang_objs]
+        logger.info('Querying database to insert %s new languages to a postgres db', len(lang_names))
+        async with self.__pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch("""
+                INSERT INTO lang_exch.languages (lang_name)
+                SELECT unnest($1::text[])
+                RETURNING lang_id, btrim(lang_name) AS lang_name;
+                """, lang_names)
+                # a single event, listeners reload rather than receiving one per row
+                await self._notify(conn, 'reload')
+        # RETURNING does not guarantee the input order, map back by name
+        name_id_map = {row['lang_name']: row['lang_id'] for row in rows}
+        logger.info('%s new languages successfully added in the Database', len(rows))
+        return [name_id_map.get(lang_name) for lang_name in lang_names]
+
+    async def update_languages(self, lang_objs: list) -> None:
+        '''Entries will be updated for every given language within a
+        single UPDATE ... FROM unnest(...) statement and transaction
+
+        Args:
+            lang_objs: list of objects of type Language with id and new name
+
+        Returns:
+            None
+
+        Exceptions:
+            MissingLanguagesError
+        '''
+        lang_ids = [lang_obj.get_lang_id() for lang_obj in lang_objs]
+        logger.info('Querying database to update %s languages to a postgres db', len(lang_objs))
+        async with self.__pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch("""
+                UPDATE lang_exch.languages AS languages SET lang_name = new_values.lang_name
+                FROM unnest($1::integer[], $2::text[]) AS new_values (lang_id, lang_name)
+                WHERE languages.lang_id = new_values.lang_id
+                RETURNING languages.lang_id;
+                """, lang_ids, [lang_obj.get_language_name() for lang_obj in lang_objs])
+                missing_ids = set(lang_ids) - {row['lang_id'] for row in rows}
+                if missing_ids:
+                    # leaving the block with an error rolls the transaction back
+                    raise MissingLanguagesError(missing_ids)
+                await self._notify(conn, 'reload')
+        logger.info('%s languages successfully updated in the Database', len(lang_objs))
+
+    async def delete_languages(self, lang_objs: list) -> None:
+        '''Entries for every given language will be deleted within a
+        single DELETE ... = ANY(...) statement and transaction
+
+        Args:
+            lang_objs: list of objects of type Language
+
+        Returns:
+            None
+
+        Exceptions:
+            MissingLanguagesError
+        '''
+        lang_ids = [lang_obj.get_lang_id() for lang_obj in lang_objs]
+        logger.info('Querying database to delete %s languages to a postgres db', len(lang_ids))
+        async with self.__pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch("""
+                DELETE FROM lang_exch.languages
+                WHERE lang_id = ANY($1::integer[])
+                RETURNING lang_id;
+                """, lang_ids)
+                missing_ids = set(lang_ids) - {row['lang_id'] for row in rows}
+                if missing_ids:
+                    raise MissingLanguagesError(missing_ids)
+                await self._notify(conn, 'reload')
+        logger.info('%s languages successfully deleted from the Database', len(lang_ids))
+
+    async def iter_languages(self, itersize: int = None):
+        '''Yields every language record ordered by id through a server
+        side cursor, fetching itersize rows per round trip, so memory
+        stays constant whatever the size of the table
+
+        args:
+            itersize: number of rows fetched per round trip
+
+        returns:
+            asynchronous generator of (lang_id, lang_name) tuples
+        '''
+        logger.info('Querying database to stream details for all languages from a postgres db')
+        async with self.__pool.acquire() as conn:
+            # a cursor lives on the server for the current transaction
+            async with conn.transaction():
+                async for row in conn.cursor("""
+                SELECT lang_id, btrim(lang_name) AS lang_name FROM lang_exch.languages
+                ORDER BY lang_id;
+                """, prefetch=itersize or self._stream_itersize):
+                    yield row['lang_id'], row['lang_name']
+
+    async def get_language(self, lang_id: int) -> str:
+        '''Returns a language name for a given id or None
+
+        args:
+            lang_id: id of a language whose record is needed
+
+        returns:
+            str
+        '''
+        sampled_logger.debug('Querying database to get language details for ID:%s to a postgres db', lang_id)
+        # asyncpg prepares and caches every statement per connection
+        async with self.__pool.acquire() as conn:
+            lang_name = await conn.fetchval("""
+            SELECT btrim(lang_name) FROM lang_exch.languages
+            WHERE lang_id = $1;
+            """, lang_id)
+        return lang_name
+
+    async def get_languages(self, limit: int = None, after_id: int = None) -> dict:
+        '''Returns the language records, all of them or a single page
+        ordered by id when a limit is given
+
+        args:
+            limit: maximum number of records to return
+            after_id: return only records with an id greater than this
+
+        returns:
+            dict: language id to language name
+        '''
+        sampled_logger.debug('Querying database to get details for all languages to a postgres db')
+        async with self.__pool.acquire() as conn:
+            if limit is None:
+                rows = await conn.fetch("""
+                SELECT lang_id, btrim(lang_name) AS lang_name FROM lang_exch.languages
+                ORDER BY lang_id;
+                """)
+            else:
+                rows = await conn.fetch("""
+                SELECT lang_id, btrim(lang_name) AS lang_name FROM lang_exch.languages
+                WHERE lang_id > $1
+                ORDER BY lang_id
+                LIMIT $2;
+                """, after_id if after_id is not None else -1, limit)
+        return {row['lang_id']: row['lang_name'] for row in rows}
@@ -0,0 +1,263 @@
+'''Module for the read-through cache sitting in front of a database provider'''
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    '''Thread-safe cache bounded by max_size entries, evicting the least
+    recently used entry first. Every entry expires ttl seconds after it
+    was stored'''
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        '''Init method
+        Args:
+            max_size: maximum number of entries kept
+            ttl: seconds an entry stays valid
+
+        Returns:
+            LRUCache()
+        '''
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped on every invalidation so that a value read from the
+        # database before a concurrent write is never stored afterwards
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def generation(self) -> int:
+        '''Returns the current invalidation generation'''
+        return self._generation
+
+    def get(self, key):
+        '''Returns a tuple (found, value) for the given key'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, generation=None) -> None:
+        '''Stores a value, unless the cache was invalidated since
+        the given generation was read'''
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self._ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys, match=None) -> None:
+        '''Drops the given keys, and every key for which match(key)
+        returns True when a match callable is given'''
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            for key in keys:
+                self._entries.pop(key, None)
+            if match is not None:
+                for key in [key for key in self._entries if match(key)]:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        '''Drops every entry'''
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        '''Returns the cache counters'''
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'max_size': self._max_size,
+                    'ttl': self._ttl, 'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'expirations': self.expirations,
+                    'invalidations': self.invalidations}
+
+
+class CachedDatabase:
+    '''Wraps a Database provider, answering reads from an LRUCache and
+    invalidating the affected entries on every write. Anything else is
+    passed through to the wrapped provider'''
+
+    _LANGUAGES = 'languages'
+
+    def __init__(self, db, cache: LRUCache):
+        '''Init method
+        Args:
+            db: Database provider to wrap
+            cache: LRUCache holding the read results
+
+        Returns:
+            CachedDatabase()
+        '''
+        self._db = db
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    @staticmethod
+    def _language_key(lang_id):
+        return ('language', int(lang_id))
+
+    @classmethod
+    def _is_collection_key(cls, key) -> bool:
+        return key[0] == cls._LANGUAGES
+
+    def _invalidate(self, lang_ids=()) -> None:
+        '''Drops every cached collection page and the given languages'''
+        self._cache.invalidate(*[self._language_key(lang_id) for lang_id in lang_ids],
+                               match=self._is_collection_key)
+
+    def cache_stats(self) -> dict:
+        '''Returns the counters of the underlying cache'''
+        return self._cache.stats()
+
+    def get_language(self, lang_id: int) -> str:
+        '''Returns a language name, from the cache when possible'''
+        key = self._language_key(lang_id)
+        found, lang_name = self._cache.get(key)
+        if found:
+            return lang_name
+        generation = self._cache.generation()
+        lang_name = self._db.get_language(lang_id)
+        # a missing language is not cached, it would hide a later insert
+        if lang_name is not None:
+            self._cache.set(key, lang_name, generation)
+        return lang_name
+
+    def get_languages_by_ids(self, lang_ids: list) -> dict:
+        '''Returns the names of many languages, the ones missing from the
+        cache fetched from the database at once'''
+        id_name_map = {}
+        misses = []
+        for lang_id in lang_ids:
+            found, lang_name = self._cache.get(self._language_key(lang_id))
+            if not found:
+                misses.append(lang_id)
+            elif lang_name is not None:
+                id_name_map[lang_id] = lang_name
+        if misses:
+            generation = self._cache.generation()
+            fetched = self._db.get_languages_by_ids(misses)
+            # unknown ids are not cached, an insert only invalidates the
+            # collection entries and may well be given one of them
+            for lang_id, lang_name in fetched.items():
+                self._cache.set(self._language_key(lang_id), lang_name, generation)
+            id_name_map.update(fetched)
+        return id_name_map
+
+    def get_languages(self, limit: int = None, after_id: int = None) -> dict:
+        '''Returns every language or a page of them, from the cache when
+        possible. The returned dict is shared and must not be modified'''
+        key = (self._LANGUAGES, limit, after_id)
+        found, id_name_map = self._cache.get(key)
+        if found:
+            return id_name_map
+        generation = self._cache.generation()
+        if limit is None and after_id is None:
+            id_name_map = self._db.get_languages()
+        else:
+            id_name_map = self._db.get_languages(limit=limit, after_id=after_id)
+        self._cache.set(key, id_name_map, generation)
+        return id_name_map
+
+    def add_language(self, lang_obj):
+        '''Inserts a language and invalidates the collection entry'''
+        try:
+            return self._db.add_language(lang_obj)
+        finally:
+            self._invalidate()
+
+    def add_languages(self, lang_objs: list):
+        '''Inserts many languages and invalidates the collection entry'''
+        try:
+            return self._db.add_languages(lang_objs)
+        finally:
+            self._invalidate()
+
+    def update_language(self, lang_obj, new_lang: str):
+        '''Updates a language and invalidates its entries'''
+        try:
+            return self._db.update_language(lang_obj, new_lang)
+        finally:
+            self._invalidate([lang_obj.get_lang_id()])
+
+    def delete_language(self, lang_obj):
+        '''Deletes a language and invalidates its entries'''
+        try:
+            return self._db.delete_language(lang_obj)
+        finally:
+            self._invalidate([lang_obj.get_lang_id()])
+
+    def listen(self, on_change, on_reconnect=None) -> bool:
+        '''Subscribes to changes of the wrapped provider, invalidating
+        the cache before handing each event over'''
+        def _on_change(event):
+            self.invalidate(event.get('lang_id'))
+            on_change(event)
+
+        def _on_reconnect():
+            self.invalidate()
+            if on_reconnect is not None:
+                on_reconnect()
+
+        return self._db.listen(_on_change, _on_reconnect)
+
+    def update_languages(self, lang_objs: list):
+        '''Updates many languages and invalidates their entries'''
+        try:
+            return self._db.update_languages(lang_objs)
+        finally:
+            self._invalidate([lang_obj.get_lang_id() for lang_obj in lang_objs])
+
+    def delete_languages(self, lang_objs: list):
+        '''Deletes many languages and invalidates their entries'''
+        try:
+            return self._db.delete_languages(lang_objs)
+        finally:
+            self._invalidate([lang_obj.get_lang_id() for lang_obj in lang_objs])
+
+    def apply_mutations(self, mutations: list) -> list:
+        '''Applies a batch of writes and invalidates their entries'''
+        try:
+            return self._db.apply_mutations(mutations)
+        finally:
+            self._invalidate([lang_obj.get_lang_id() for _, lang_obj in mutations
+                              if lang_obj.get_lang_id() is not None])
+
+    def import_languages(self, source, fmt: str = 'csv', report_limit: int = 100, near_duplicates=None) -> dict:
+        '''Merges an import and drops every cached entry'''
+        try:
+            return self._db.import_languages(source, fmt, report_limit, near_duplicates)
+        finally:
+            self.invalidate()
+
+    def invalidate(self, lang_id: int = None) -> None:
+        '''Drops cached entries for one language, or everything when
+        no id is given'''
+        if lang_id is None:
+            self._cache.clear()
+            return
+        self._invalidate([lang_id])
@@ -0,0 +1,38 @@
+'''Module for the catalog change events published through pg_notify'''
+
+import json
+import os
+import uuid
+
+# tags the events of this process, a pid repeats across hosts and containers
+_process_tag = uuid.uuid4().hex
+
+
+def _renew_process_tag() -> None:
+    '''A forked worker is a process of its own'''
+    global _process_tag
+    _process_tag = uuid.uuid4().hex
+
+
+os.register_at_fork(after_in_child=_renew_process_tag)
+
+
+def event_payload(operation: str, lang_id=None, lang_name=None) -> str:
+    '''Returns the JSON payload of a change event published by this process
+
+    Args:
+        operation: insert, update, delete or reload
+        lang_id: id of the changed language, if any
+        lang_name: new name of the changed language, if any
+
+    Returns:
+        str
+    '''
+    return json.dumps({'op': operation, 'lang_id': lang_id, 'lang_name': lang_name,
+                       'origin': _process_tag})
+
+
+def is_own_event(event: dict) -> bool:
+    '''Returns True if the event was published by this very process,
+    whose changes are already applied'''
+    return event.get('origin') == _process_tag
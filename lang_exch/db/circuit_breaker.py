@@ -0,0 +1,128 @@
+'''Module for failing fast while a database keeps erroring'''
+
+import threading
+import time
+
+from lang_exch.conf.log.lang_exch_logging import logger
+
+
+class CircuitOpenError(Exception):
+    '''Raised instead of calling a database which is known to be failing'''
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'Circuit {name} is open, retry after {retry_after:.1f} seconds')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    '''Counts consecutive failures of the calls it guards. Once
+    failure_threshold is reached the circuit opens and every call fails
+    right away with CircuitOpenError. After reset_timeout seconds a single
+    probe call is let through, half open: its success closes the circuit,
+    its failure opens it again'''
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=10.0):
+        '''Init method
+        Args:
+            name: name reported by errors and stats
+            failure_threshold: consecutive failures opening the circuit
+            reset_timeout: seconds the circuit stays open before a probe
+
+        Returns:
+            CircuitBreaker()
+        '''
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._times_opened = 0
+
+    @property
+    def state(self) -> str:
+        '''closed, open or half_open'''
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> None:
+        '''Returns if a call may proceed
+
+        Exceptions:
+            CircuitOpenError
+        '''
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            remaining = self._opened_at + self._reset_timeout - time.monotonic()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(self.name, max(remaining, 0.0))
+            # the reset timeout elapsed, this very call is the probe
+            self._state = self.HALF_OPEN
+            self._probing = True
+
+    def record_success(self) -> None:
+        '''Closes the circuit and forgets past failures'''
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info('Circuit %s closed', self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        '''Counts a failure, opening the circuit at the threshold or when
+        the probe failed'''
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+                if self._state != self.OPEN:
+                    self._times_opened += 1
+                    logger.error('Circuit %s opened after %s consecutive failures', self.name, self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def call(self, func, is_failure=lambda error: True):
+        '''Calls func through the breaker
+
+        Args:
+            func: callable without arguments
+            is_failure: callable(exception) -> bool telling whether an
+                error raised by func says the database is failing,
+                other errors count as successful calls
+
+        Returns:
+            result of func
+
+        Exceptions:
+            CircuitOpenError, or whatever func raised
+        '''
+        self.allow()
+        try:
+            result = func()
+        except Exception as call_err:
+            if is_failure(call_err):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        '''Returns the state, consecutive failures and how many times the
+        circuit opened'''
+        state = self.state
+        with self._lock:
+            return {'state': state, 'consecutive_failures': self._failures,
+                    'times_opened': self._times_opened}
@@ -0,0 +1,224 @@
+'''Module for a bounded, thread-safe pool of database connections'''
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.metrics import POOL_WAIT
+
+
+class PoolTimeoutError(Exception):
+    '''Raised when no connection could be checked out in time'''
+
+
+class PoolClosedError(Exception):
+    '''Raised when a connection is requested from a closed pool'''
+
+
+class ConnectionPool:
+    '''Keeps between min_size and max_size open connections and hands
+    them out to one caller at a time'''
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30.0,
+                 health_check_interval=30.0, is_healthy=None, reset=None,
+                 disconnect=None):
+        '''Init method
+        Args:
+            connect: callable returning a new connection
+            min_size: number of connections opened up front and kept idle
+            max_size: upper bound of open connections
+            timeout: seconds to wait for a free connection on checkout
+            health_check_interval: connections idle for longer than this
+                many seconds are health checked before being handed out
+            is_healthy: callable(conn) -> bool used for health checks
+            reset: callable(conn) run on checkin to clean the connection
+            disconnect: callable(conn) closing a connection
+
+        Returns:
+            ConnectionPool()
+        '''
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f'Invalid pool bounds: min_size={min_size} max_size={max_size}')
+        self._connect = connect
+        self._min_size = min_size
+        self._max_size = max_size
+        self._timeout = timeout
+        self._health_check_interval = health_check_interval
+        self._is_healthy = is_healthy or (lambda conn: True)
+        self._reset = reset or (lambda conn: None)
+        self._disconnect = disconnect or (lambda conn: conn.close())
+
+        self._cond = threading.Condition(threading.Lock())
+        # idle connections along with the time they were checked in
+        self._idle = deque()
+        self._size = 0
+        self._closed = True
+
+    def open(self) -> None:
+        '''Opens the pool and pre-creates min_size connections
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        with self._cond:
+            if not self._closed:
+                return
+            self._closed = False
+        for _ in range(self._min_size):
+            conn = self._create()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+        logger.info('Connection pool opened with %s connections, max: %s', self._min_size, self._max_size)
+
+    def close(self) -> None:
+        '''Closes every idle connection and rejects further checkouts.
+        Connections currently checked out are closed on checkin.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._safe_disconnect(conn)
+        logger.info('Connection pool closed')
+
+    def is_open(self) -> bool:
+        '''Returns True if the pool accepts checkouts'''
+        return not self._closed
+
+    def checkout(self, timeout=None):
+        '''Borrows a connection from the pool, opening a new one if the
+        pool has not yet reached max_size
+
+        Args:
+            timeout: seconds to wait, defaults to the pool timeout
+
+        Returns:
+            connection object
+
+        Exceptions:
+            PoolClosedError, PoolTimeoutError
+        '''
+        timeout = self._timeout if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            return self._checkout(started + timeout, timeout)
+        finally:
+            POOL_WAIT.observe(time.monotonic() - started)
+
+    def _checkout(self, deadline, timeout):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosedError('Connection pool is closed')
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        break
+                    if self._size < self._max_size:
+                        # reserve the slot, connect outside of the lock
+                        self._size += 1
+                        conn, idle_since = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f'No connection available within {timeout} seconds')
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+
+            if time.monotonic() - idle_since < self._health_check_interval \
+                    or self._check_health(conn):
+                return conn
+            logger.warning('Discarding unhealthy pooled connection')
+            self._safe_disconnect(conn)
+            self._release_slot()
+
+    def checkin(self, conn, discard=False) -> None:
+        '''Returns a borrowed connection to the pool
+
+        Args:
+            conn: connection obtained from checkout()
+            discard: close the connection instead of reusing it
+
+        Returns:
+            None
+        '''
+        if not discard:
+            try:
+                self._reset(conn)
+            except Exception as reset_err:
+                logger.warning('Failed to reset pooled connection, discarding it: %s', reset_err)
+                discard = True
+        with self._cond:
+            if not discard and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._safe_disconnect(conn)
+        self._release_slot()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        '''Context manager borrowing a connection for the duration of
+        the with block'''
+        conn = self.checkout(timeout)
+        try:
+            yield conn
+        finally:
+            # reset rolls back whatever the caller left behind; a broken
+            # connection fails to reset and gets discarded
+            self.checkin(conn)
+
+    def stats(self) -> dict:
+        '''Returns the current size of the pool'''
+        with self._cond:
+            return {'size': self._size, 'idle': len(self._idle),
+                    'in_use': self._size - len(self._idle),
+                    'min_size': self._min_size, 'max_size': self._max_size}
+
+    def _create(self):
+        '''Opens a new connection accounting for it in the pool size'''
+        with self._cond:
+            self._size += 1
+        try:
+            return self._connect()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _check_health(self, conn) -> bool:
+        try:
+            return bool(self._is_healthy(conn))
+        except Exception:
+            return False
+
+    def _safe_disconnect(self, conn) -> None:
+        try:
+            self._disconnect(conn)
+        except Exception as close_err:
+            logger.debug('Ignoring error while closing connection: %s', close_err)
@@ -5,7 +5,17 @@ import sys
 import importlib
 
 from abc import ABCMeta, abstractmethod
-from lang_exch.models.language import Language
+from lang_exch.db.transfer import format_rows, parse_rows, valid_import_name
+from lang_exch.models.language import Language, normalize_name
+
+
+class MissingLanguagesError(Exception):
+    '''Raised when a batched operation references languages which do
+    not exist. The whole batch is rolled back'''
+
+    def __init__(self, lang_ids):
+        super().__init__(f'Languages do not exist: {sorted(lang_ids)}')
+        self.lang_ids = set(lang_ids)
 
 
 class Database(metaclass=ABCMeta):
@@ -63,14 +73,31 @@ class Database(metaclass=ABCMeta):
         '''
         return self._password
 
+    def listen(self, on_change, on_reconnect=None) -> bool:
+        '''
+        Subscribes to catalog changes made by other processes. Providers
+        which can publish change notifications override this.
+        Returns False if the provider does not support it
+        '''
+        return False
+
     @abstractmethod
-    def get_languages(self) -> None:
+    def get_languages(self, limit: int = None, after_id: int = None) -> dict:
         '''
         Returns all the information for every
-        language present in the database
+        language present in the database, or for a single
+        page of at most limit languages with an id greater
+        than after_id, ordered by id
         '''
         raise NotImplementedError('Derived class must implement this')
 
+    def iter_languages(self, itersize: int = None):
+        '''
+        Yields (lang_id, lang_name) for every language ordered
+        by id. Providers able to stream rows override this
+        '''
+        yield from sorted(self.get_languages().items())
+
     @abstractmethod
     def get_language(self, lang_id: int) -> None:
         '''
@@ -79,11 +106,32 @@ class Database(metaclass=ABCMeta):
         '''
         raise NotImplementedError('Derived class must implement this')
 
+    def get_languages_by_ids(self, lang_ids: list) -> dict:
+        '''
+        Returns lang_id -> lang_name for the given ids which exist,
+        unknown ids being left out. Providers able to fetch them all
+        in a single query override this
+        '''
+        id_name_map = {}
+        for lang_id in lang_ids:
+            lang_name = self.get_language(lang_id)
+            if lang_name is not None:
+                id_name_map[lang_id] = lang_name
+        return id_name_map
+
     @abstractmethod
     def add_language(self, lang_obj: Language) -> None:
         '''Inserts a new language into the database'''
         raise NotImplementedError('Derived class must implement this')
 
+    @abstractmethod
+    def add_languages(self, lang_objs: list) -> list:
+        '''
+        Inserts many new languages in a single transaction and
+        returns their ids in the same order
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
     @abstractmethod
     def delete_language(self, lang_obj: Language) -> None:
         '''Deletes an existing language from the database'''
@@ -94,4 +142,121 @@ class Database(metaclass=ABCMeta):
         '''Updates an existing language from the database'''
         raise NotImplementedError('Derived class must implement this')
 
+    @abstractmethod
+    def update_languages(self, lang_objs: list) -> None:
+        '''
+        Renames many existing languages, each Language carrying its id
+        and new name, in a single transaction. Raises
+        MissingLanguagesError and applies nothing if any id is unknown
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    @abstractmethod
+    def delete_languages(self, lang_objs: list) -> None:
+        '''
+        Deletes many existing languages in a single transaction. Raises
+        MissingLanguagesError and deletes nothing if any id is unknown
+        '''
+        raise NotImplementedError('Derived class must implement this')
+
+    def apply_mutations(self, mutations: list) -> list:
+        '''
+        Applies (operation, Language) pairs, operation being insert,
+        update or delete, and returns one result per pair: the new id
+        of an insert, None, or the exception the write failed with.
+        A failing write does not fail the others. Providers able to
+        commit all of them in a single transaction override this
+        '''
+        results = []
+        for operation, lang_obj in mutations:
+            try:
+                if operation == 'insert':
+                    results.append(self.add_language(lang_obj))
+                elif operation == 'update':
+                    results.append(self.update_language(lang_obj, lang_obj.get_language_name()))
+                elif operation == 'delete':
+                    results.append(self.delete_language(lang_obj))
+                else:
+                    raise ValueError(f'Unknown write operation: {operation}')
+            except Exception as write_err:
+                results.append(write_err)
+        return results
+
+    def export_languages(self, out, fmt: str = 'csv') -> int:
+        '''
+        Writes every language ordered by id to the binary file-like
+        out, as csv with a header line or as ndjson, and returns the
+        number of languages written. Providers able to produce the
+        export in the database override this
+        '''
+        written = 0
+        for chunk in format_rows(self.iter_languages(), fmt):
+            out.write(chunk)
+            written += 1
+        # the csv header line is not a language
+        return written - 1 if fmt == 'csv' else written
+
+    def import_languages(self, source, fmt: str = 'csv', report_limit: int = 100, near_duplicates=None) -> dict:
+        '''
+        Merges the languages read from the binary file-like source
+        into the database. A row whose id exists renames it, a row with
+        an unknown id is inserted under it and a row without id under a
+        new one. Rows with an invalid name, repeating a name or id of an
+        earlier row or taking the name of another language are skipped
+        and reported, as are the rows for which near_duplicates(lang_name,
+        lang_id), when given, returns a non empty list. Providers able to merge in the database override
+        this, here the rows are applied through apply_mutations
+
+        Returns:
+            dict: inserted, updated, unchanged and rejected counts, and
+                the first report_limit conflicts as dicts with keys
+                row, the data row counted from 1, lang_id, lang_name
+                and reason
+
+        Exceptions:
+            InvalidImportError
+        '''
+        existing = dict(self.get_languages() or {})
+        name_owners = {normalize_name(name): lang_id for lang_id, name in existing.items()}
+        seen_names, seen_ids = set(), set()
+        report = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0, 'conflicts': []}
+        mutations = []
+
+        def reject(row, lang_id, lang_name, reason):
+            report['rejected'] += 1
+            if len(report['conflicts']) < report_limit:
+                report['conflicts'].append({'row': row, 'lang_id': lang_id, 'lang_name': lang_name,
+                                            'reason': reason})
+
+        for row, lang_id, lang_name in parse_rows(source, fmt):
+            if not valid_import_name(lang_name):
+                reject(row, lang_id, lang_name, 'invalid_name')
+                continue
+            lang_name = lang_name.strip()
+            normalized = normalize_name(lang_name)
+            if normalized in seen_names or (lang_id is not None and lang_id in seen_ids):
+                reject(row, lang_id, lang_name, 'duplicate_in_import')
+                continue
+            seen_names.add(normalized)
+            seen_ids.add(lang_id)
+            if name_owners.get(normalized, lang_id) != lang_id:
+                reject(row, lang_id, lang_name, 'name_taken')
+                continue
+            if near_duplicates is not None and near_duplicates(lang_name, lang_id):
+                reject(row, lang_id, lang_name, 'too_similar')
+                continue
+            if lang_id in existing:
+                if existing[lang_id] == lang_name:
+                    report['unchanged'] += 1
+                else:
+                    mutations.append((row, 'update', Language(lang_name, lang_id)))
+            else:
+                mutations.append((row, 'insert', Language(lang_name, lang_id)))
 
+        results = self.apply_mutations([(operation, lang_obj) for _, operation, lang_obj in mutations])
+        for (row, operation, lang_obj), result in zip(mutations, results):
+            if isinstance(result, Exception):
+                reject(row, lang_obj.get_lang_id(), lang_obj.get_language_name(), f'write_failed: {result}')
+            else:
+                report['inserted' if operation == 'insert' else 'updated'] += 1
+        return report
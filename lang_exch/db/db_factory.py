@@ -1,43 +1,76 @@
 import importlib
-import os
-import sys
-from pathlib import Path
+import threading
 
 from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.const import cacheSection, confSection
+from lang_exch.db.cache import CachedDatabase, LRUCache
 from lang_exch.setup.setup import config
 
 
+# Known database providers: provider name in the [database] section of
+# the configuration -> "module:class" implementing the Database ABC
+PROVIDERS = {
+    'postgres': 'lang_exch.db.postgres_db:PostgresDB',
+    'sqlite': 'lang_exch.db.sqlite_db:SQLiteDB',
+}
+
+
+def register_provider(name: str, target: str) -> None:
+    '''Registers a database provider under a name usable as the
+    provider key of the configuration
+
+    Args:
+        name: provider name
+        target: "module:class" of a Database implementation
+
+    Returns:
+        None
+    '''
+    PROVIDERS[name] = target
+
+
 class DBFactory:
     '''singleton factory class for database instantiation'''
 
+    _lock = threading.Lock()
+
     def __new__(cls, _db_name=None):
         '''static new method'''
-        cls._db_name = _db_name
         if not hasattr(cls, '_db_instance'):
-            cls._db_instance = cls.get_instance(cls._db_name)
+            # request threads may race for the very first instance
+            with cls._lock:
+                if not hasattr(cls, '_db_instance'):
+                    cls._db_name = _db_name
+                    cls._db_instance = cls.with_cache(cls.get_instance(cls._db_name))
         return cls._db_instance
 
-    def get_instance(db_name):
-        '''Returns an instance of a database provider'''
-        req_path = None
-        req_path = os.path.dirname(__file__)
-        _db_instance = None
-
-        if req_path:
-            # get the PosixPath
-            db_path = Path(req_path)
-            if db_path.exists():
-                # There is a way to iterate posixpath dir using iterdir()
-                # But facing one problem after one iteration. Hence, iterating
-                # using os.listdir()
-                for pkg in os.listdir(db_path):
-                    if not os.path.isdir(pkg) and db_name in pkg:
-                        logger.debug(f'Found directory path to import database')
-                        module = importlib.import_module('.' + pkg.split('.')[0], package=__package__)
-                        db_attribute = getattr(module, 'PostgresDB', None)
-                        if db_attribute is not None:
-                            logger.info(f'Instantiating a db instance: {db_attribute}')
-                            _db_instance = db_attribute(db_config = dict(config._sections['database']))
-                            break
-        return _db_instance
+    def with_cache(db_instance):
+        '''Wraps a database provider into a read-through cache when
+        enabled in the cache section of the configuration'''
+        cache_section = confSection.CACHE_SECTION.value
+        if db_instance is None or not config.has_section(cache_section) or \
+                not config.getboolean(cache_section, cacheSection.CACHE_ENABLED_KEY.value, fallback=False):
+            return db_instance
+        cache = LRUCache(
+            max_size=config.getint(cache_section, cacheSection.CACHE_MAX_SIZE_KEY.value, fallback=1024),
+            ttl=config.getfloat(cache_section, cacheSection.CACHE_TTL_KEY.value, fallback=60.0))
+        logger.info('Caching database reads with max size: %s and ttl: %s', cache._max_size, cache._ttl)
+        return CachedDatabase(db_instance, cache)
+
+    def get_instance(db_name, db_config=None):
+        '''Returns an instance of a database provider. db_name is either a
+        registered provider name or a "module:class" path. db_config
+        defaults to the database section of the configuration'''
+        target = PROVIDERS.get(db_name, db_name)
+        if ':' not in target:
+            raise ValueError(f'Unknown database provider: {db_name}. '
+                             f'Known providers: {", ".join(sorted(PROVIDERS))}')
+        module_name, class_name = target.split(':', 1)
+        logger.debug('Importing database provider %s from %s', class_name, module_name)
+        module = importlib.import_module(module_name)
+        db_attribute = getattr(module, class_name)
+        logger.info('Instantiating a db instance: %s', db_attribute)
+        if db_config is None:
+            db_config = dict(config._sections[confSection.DATABASE_SECTION.value])
+        return db_attribute(db_config = db_config)
 
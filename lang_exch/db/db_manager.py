@@ -1,77 +1,333 @@
+import threading
+
 from lang_exch.const import dataBaseSection, confSection
 from lang_exch.db.db_factory import DBFactory
+from lang_exch.db.replica_set import ReplicaSet, replica_config
+from lang_exch.db.write_batcher import WriteBatcher
 from lang_exch.models.language import Language
 from lang_exch.setup.setup import config
-from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.conf.log.lang_exch_logging import logger, sampled_logger
+
+
+class InvalidLanguageError(Exception):
+    '''Raised when a language name does not pass validation'''
+
+
+def validate_language_name(lang_name: str) -> None:
+    '''
+    Validates a language name: it must only contain alphabetic
+    characters, without space, and be 1 to 20 characters long
+
+    Exceptions:
+        InvalidLanguageError
+    '''
+    if not isinstance(lang_name, str) or not lang_name.isalpha() or ' ' in lang_name:
+        logger.error('%s is not a valid language. Language name must contain all the characters without space',
+                     lang_name)
+        raise InvalidLanguageError(f'{lang_name} is not a valid Language. Language name must '
+                                   f'contain all the characters without space in between')
+    if len(lang_name) < 1 or len(lang_name) > 20:
+        logger.error('%s is not a valid language. Language length must be between 1 to 20', lang_name)
+        raise InvalidLanguageError(f'{lang_name} is not a valid Language. Language length must '
+                                   f'be between 1 to 20 characters')
 
 
 class DatabaseManager():
 
-    def __init__(self):
+    _write_batcher = None
+    _write_batcher_lock = threading.Lock()
+    _replica_set = None
+    _replica_set_lock = threading.Lock()
+
+    def __init__(self, client_key=None, connect=True):
+        '''
+        client_key identifies the client on whose behalf the database is
+        used, it reads from the primary for a while after its own writes.
+        connect=False leaves the provider as it is, for reading its
+        statistics without opening a connection
+        '''
         db_provider = config[confSection.DATABASE_SECTION.value][dataBaseSection.DB_PROVIDER_KEY.value]
         self._db = DBFactory(db_provider)
-        self._db.connect()
-        
+        self._client_key = client_key
+        # The provider is a process wide singleton owning a connection
+        # pool, hence connect only the first time around
+        if connect and not self._db.is_open():
+            self._db.connect()
+
+    @classmethod
+    def write_batcher(cls):
+        '''
+        Returns the process wide WriteBatcher, or None when write
+        batching is disabled in the configuration
+        '''
+        if cls._write_batcher is None:
+            window_ms = config.getfloat(confSection.DATABASE_SECTION.value,
+                                        dataBaseSection.DB_WRITE_BATCH_WINDOW_KEY.value, fallback=0)
+            if window_ms <= 0:
+                return None
+            with cls._write_batcher_lock:
+                if cls._write_batcher is None:
+                    max_batch_size = config.getint(confSection.DATABASE_SECTION.value,
+                                                   dataBaseSection.DB_WRITE_BATCH_MAX_SIZE_KEY.value,
+                                                   fallback=100)
+                    # a batch is one transaction, its statements each
+                    # bound by the statement timeout
+                    timeout_ms = config.getfloat(confSection.DATABASE_SECTION.value,
+                                                 dataBaseSection.DB_STATEMENT_TIMEOUT_KEY.value, fallback=5000)
+                    logger.info('Batching writes within %s ms, at most %s per transaction',
+                                window_ms, max_batch_size)
+                    cls._write_batcher = WriteBatcher(DBFactory(), window_ms / 1000.0, max_batch_size,
+                                                      timeout_ms / 1000.0 if timeout_ms > 0 else None)
+        return cls._write_batcher
+
+    @classmethod
+    def replica_set(cls):
+        '''
+        Returns the process wide ReplicaSet, or None when no replica is
+        configured. Replicas connect on their first read
+        '''
+        if cls._replica_set is None:
+            database_section = confSection.DATABASE_SECTION.value
+            dsns = [dsn.strip() for dsn in config.get(database_section, dataBaseSection.DB_REPLICA_DSNS_KEY.value,
+                                                      fallback='').split(',') if dsn.strip()]
+            if not dsns:
+                return None
+            with cls._replica_set_lock:
+                if cls._replica_set is None:
+                    db_provider = config[database_section][dataBaseSection.DB_PROVIDER_KEY.value]
+                    primary_config = dict(config._sections[database_section])
+                    window_ms = config.getfloat(database_section,
+                                                dataBaseSection.DB_READ_YOUR_WRITES_KEY.value, fallback=1000)
+                    logger.info('Routing reads across %s replicas, clients read their writes for %s ms',
+                                len(dsns), window_ms)
+                    cls._replica_set = ReplicaSet(
+                        [DBFactory.get_instance(db_provider, replica_config(dsn, primary_config)) for dsn in dsns],
+                        read_your_writes_window=window_ms / 1000.0)
+        return cls._replica_set
+
+    def close(self) -> None:
+        '''
+        Applies the pending batched writes, then closes the provider,
+        the replicas and their connections
+        '''
+        batcher, DatabaseManager._write_batcher = DatabaseManager._write_batcher, None
+        if batcher is not None:
+            batcher.stop()
+        replicas, DatabaseManager._replica_set = DatabaseManager._replica_set, None
+        if replicas is not None:
+            replicas.close()
+        self._db.close()
+
+    def _write(self, operation: str, lang_obj: Language, apply):
+        '''
+        Hands a single language write to the batcher when enabled,
+        otherwise applies it right away
+        '''
+        batcher = self.write_batcher()
+        try:
+            if batcher is None:
+                return apply()
+            return batcher.execute(operation, lang_obj)
+        finally:
+            self._wrote()
+
+    def _wrote(self) -> None:
+        '''
+        Keeps the reads of the client on the primary until the
+        replicas caught up with its write, even a failed one may
+        have been committed
+        '''
+        replicas = self.replica_set()
+        if replicas is not None:
+            replicas.record_write(self._client_key)
+
+    def _read(self, read):
+        '''
+        Calls read(provider) on a replica, or on the primary when no
+        replica is available or the client wrote recently
+        '''
+        replicas = self.replica_set()
+        if replicas is None or replicas.reads_primary(self._client_key):
+            return read(self._db)
+        return replicas.read(read, lambda: read(self._db))
+
     def add_language(self, lang_name: str):
         '''
            Validates a language input and then forms a Language
            object and passes this object for actual database operation
         '''
-        logger.info(f"Requesting a db to add new language: {lang_name}")
-        if not lang_name.isalpha() or ' ' in lang_name:
-            logger.error(f'{lang_name} is not a valid language. Language name must contain \
-                            all the characters without spacelength must be between 1 to 20')
-            raise Exception(f'{lang_name} is not a valid Language. \
-                            Language name must contain all the \
-                            characters without space in between')
-        if len(lang_name) < 0 or len(lang_name) > 20:
-            logger.error(f"{lang_name} is not a valid language. Language length must be \
-                        between 1 to 20")
-            raise Exception(f'{lang_name} is not a valid Language. \
-                            Language length must be between 1 to 20 \
-                            characters')
-        lang_id = self._db.add_language(Language(lang_name)) or None
+        logger.info('Requesting a db to add new language: %s', lang_name)
+        validate_language_name(lang_name)
+        lang_obj = Language(lang_name)
+        lang_id = self._write('insert', lang_obj, lambda: self._db.add_language(lang_obj)) or None
         return lang_id
 
+    def add_languages(self, lang_names: list) -> list:
+        '''
+        Validates every language name and then inserts all of them
+        in a single transaction. Returns the new ids in input order
+        '''
+        logger.info('Requesting a db to add %s new languages', len(lang_names))
+        for lang_name in lang_names:
+            validate_language_name(lang_name)
+        if not lang_names:
+            return []
+        try:
+            return self._db.add_languages([Language(lang_name) for lang_name in lang_names])
+        finally:
+            self._wrote()
+
     def update_language(self, lang_id: int, lang_name: str):
         '''
         validates a language input and then forms a Language 
         object and passes this object for actual database operation
         '''
-        logger.info(f"Requesting a db to update a language ID: {lang_id} with language: {lang_name}")
-        if not lang_name.isalpha() or ' ' in lang_name:
-            logger.error(f'{lang_name} is not a valid language. Language name must contain \
-                            all the characters without spacelength must be between 1 to 20')
-            raise Exception(f'{lang_name} is not a valid Language. \
-                            Language name must contain all the \
-                            characters without space in between')
-        if len(lang_name) < 0 or len(lang_name) > 20:
-            logger.error(f"{lang_name} is not a valid language. Language length must be \
-                        between 1 to 20")
-            raise Exception(f'{lang_name} is not a valid Language. \
-                            Language length must be between 1 to 20 \
-                            characters')
-        self._db.update_language(Language(lang_id=lang_id), lang_name)
+        logger.info('Requesting a db to update a language ID: %s with language: %s', lang_id, lang_name)
+        validate_language_name(lang_name)
+        lang_obj = Language(lang_name, lang_id)
+        self._write('update', lang_obj, lambda: self._db.update_language(lang_obj, lang_name))
+
+    def update_languages(self, id_name_pairs: list):
+        '''
+        Validates every new language name and then renames all the
+        languages in a single transaction, all or nothing
+        '''
+        logger.info('Requesting a db to update %s languages', len(id_name_pairs))
+        for _, lang_name in id_name_pairs:
+            validate_language_name(lang_name)
+        if id_name_pairs:
+            try:
+                self._db.update_languages([Language(lang_name, lang_id) for lang_id, lang_name in id_name_pairs])
+            finally:
+                self._wrote()
+
+    def delete_languages(self, lang_ids: list):
+        '''
+        Deletes all the given languages in a single transaction,
+        all or nothing
+        '''
+        logger.info('Requesting a db to delete %s languages', len(lang_ids))
+        if lang_ids:
+            try:
+                self._db.delete_languages([Language(lang_id=lang_id) for lang_id in lang_ids])
+            finally:
+                self._wrote()
 
     def delete_language(self, lang_id: int):
         '''
         Forms a Language object and passes this object for actual database 
         delete operation
         '''
-        self._db.delete_language(Language(lang_id=lang_id))
+        lang_obj = Language(lang_id=lang_id)
+        self._write('delete', lang_obj, lambda: self._db.delete_language(lang_obj))
 
-    def get_a_language(self, lang_id: int):
+    def get_a_language(self, lang_id: int, use_primary: bool = False):
         '''
         Forms a language object and passes this object for actual database
-        get operation
+        get operation. use_primary skips the replicas, which may lag behind
+        '''
+        sampled_logger.debug('Requesting a db to get language details for ID: %s', lang_id)
+        read = lambda db: db.get_language(lang_id)
+        return (read(self._db) if use_primary else self._read(read)) or None
+
+    def get_languages_by_ids(self, lang_ids: list) -> dict:
+        '''
+        Returns lang_id -> lang_name for the given ids which exist,
+        fetched in a single round trip
+        '''
+        sampled_logger.debug('Requesting a db to get details for %s languages', len(lang_ids))
+        if not lang_ids:
+            return {}
+        return self._read(lambda db: db.get_languages_by_ids(lang_ids))
+
+    def listen_for_changes(self, on_change, on_reconnect=None) -> bool:
+        '''
+        Subscribes to the catalog changes committed by other processes
+        when enabled in the configuration. Returns True if subscribed
+        '''
+        if not config.getboolean(confSection.DATABASE_SECTION.value,
+                                 dataBaseSection.DB_LISTEN_KEY.value, fallback=False):
+            return False
+        logger.info('Subscribing to catalog changes made by other processes')
+        return self._db.listen(on_change, on_reconnect)
+
+    def pool_stats(self) -> dict:
+        '''
+        Returns size information of the provider connection pool,
+        empty when the provider has no pool
+        '''
+        stats = getattr(self._db, 'pool_stats', None)
+        return stats() if stats is not None else {}
+
+    def circuit_stats(self) -> dict:
         '''
-        logger.info(f"Requesting a db to get language details for ID: {lang_id}")
-        return self._db.get_language(lang_id) or None
+        Returns the state of the circuit breaker guarding the provider,
+        empty when the provider has none
+        '''
+        stats = getattr(self._db, 'circuit_stats', None)
+        return stats() if stats is not None else {}
+
+    def replica_stats(self) -> list:
+        '''
+        Returns the reads in flight and the circuit state of every
+        replica, empty when none is configured
+        '''
+        replicas = self.replica_set()
+        return replicas.stats() if replicas is not None else []
 
-    def get_languages(self):
+    def cache_stats(self) -> dict:
+        '''
+        Returns hit, miss and eviction counters of the read cache,
+        empty when caching is disabled
+        '''
+        stats = getattr(self._db, 'cache_stats', None)
+        return stats() if stats is not None else {}
+
+    def get_languages(self, limit: int = None, after_id: int = None, use_primary: bool = False):
         '''
         Forms a language object and passes this object for actual database
-        fetch operation
+        fetch operation. With a limit, returns a single page of languages
+        ordered by id, starting after after_id. use_primary skips the
+        replicas, which may lag behind
+        '''
+        sampled_logger.debug('Requesting a db to get all language details')
+        if limit is None and after_id is None:
+            read = lambda db: db.get_languages()
+        else:
+            read = lambda db: db.get_languages(limit=limit, after_id=after_id)
+        return read(self._db) if use_primary else self._read(read)
+
+    def iter_languages(self):
+        '''
+        Yields (lang_id, lang_name) for every language ordered by id
+        without loading the whole catalog in memory
+        '''
+        logger.info('Requesting a db to stream all language details')
+        return self._db.iter_languages()
+
+    def export_languages(self, out, fmt: str = 'csv') -> int:
+        '''
+        Writes every language to the binary file-like out as csv or
+        ndjson and returns how many were written. Served by a replica
+        when available, without falling back to the primary as rows may
+        already be written when the replica fails
+        '''
+        logger.info('Requesting a db to export all languages as %s', fmt)
+        replicas = self.replica_set()
+        if replicas is None or replicas.reads_primary(self._client_key):
+            return self._db.export_languages(out, fmt)
+        with replicas.replica() as replica:
+            return (replica or self._db).export_languages(out, fmt)
+
+    def import_languages(self, source, fmt: str = 'csv', report_limit: int = 100, near_duplicates=None) -> dict:
+        '''
+        Merges the languages read from the binary file-like source, as
+        csv or ndjson, and returns the counts and conflicts of the merge.
+        near_duplicates(lang_name, lang_id) returns a non empty list for
+        a row to reject as too_similar
         '''
-        logger.info(f"Requesting a db to get all language details")
-        return self._db.get_languages()
+        logger.info('Requesting a db to import languages as %s', fmt)
+        try:
+            return self._db.import_languages(source, fmt, report_limit, near_duplicates)
+        finally:
+            self._wrote()
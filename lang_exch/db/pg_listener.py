@@ -0,0 +1,103 @@
+'''Module for receiving catalog change notifications from postgres'''
+
+import json
+import random
+import select
+import threading
+
+import psycopg2
+import psycopg2.extensions
+
+from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.db.change_events import is_own_event
+
+
+class ChangeListener(threading.Thread):
+    '''Background thread which LISTENs on a postgres channel and hands
+    every change notification published by another process to a callback'''
+
+    def __init__(self, connect, channel, on_change, on_reconnect=None,
+                 poll_interval=5.0, max_backoff=30.0):
+        '''Init method
+        Args:
+            connect: callable returning a new psycopg2 connection
+            channel: name of the notification channel
+            on_change: callable(dict) invoked for every change event
+            on_reconnect: callable() invoked every time the listener
+                starts listening, the first time included, as changes
+                committed before LISTEN ran were never notified. When
+                either callback fails the listener reconnects after a
+                backoff
+            poll_interval: seconds to wait on the socket before checking
+                whether the listener got stopped
+            max_backoff: upper bound of seconds between reconnect attempts
+
+        Returns:
+            ChangeListener()
+        '''
+        super().__init__(name=f'pg-listener-{channel}', daemon=True)
+        self._connect = connect
+        self._channel = channel
+        self._on_change = on_change
+        self._on_reconnect = on_reconnect
+        self._poll_interval = poll_interval
+        self._max_backoff = max_backoff
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        '''Asks the listener to exit after the current poll'''
+        self._stopped.set()
+
+    def run(self) -> None:
+        '''Listens until stopped, reconnecting with jittered backoff'''
+        backoff = 0.5
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor_obj = conn.cursor()
+                cursor_obj.execute(f'LISTEN "{self._channel}";')
+                cursor_obj.close()
+                logger.info('Listening for catalog changes on channel: %s', self._channel)
+                if self._on_reconnect is not None:
+                    self._on_reconnect()
+                backoff = 0.5
+                self._listen(conn)
+            except psycopg2.Error as pg_err:
+                logger.error('Catalog change listener lost its connection: %s', pg_err)
+            except Exception as callback_err:
+                # e.g. an open circuit failing the reload, which the raw
+                # listener connection does not go through
+                logger.error('Catalog change listener failed to update the catalog: %s', callback_err)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+            if not self._stopped.is_set():
+                # missed notifications are recovered by on_reconnect
+                self._stopped.wait(random.uniform(0, backoff))
+                backoff = min(backoff * 2, self._max_backoff)
+
+    def _listen(self, conn) -> None:
+        while not self._stopped.is_set():
+            readable, _, _ = select.select([conn], [], [], self._poll_interval)
+            if not readable:
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    event = json.loads(notify.payload)
+                except ValueError:
+                    logger.error('Ignoring malformed catalog notification: %s', notify.payload)
+                    continue
+                # changes made by this very process are already applied
+                if is_own_event(event):
+                    continue
+                try:
+                    self._on_change(event)
+                except Exception as callback_err:
+                    # listens again after a backoff, on_reconnect then
+                    # reloads what this change would have applied
+                    logger.error('Failed to apply catalog change %s: %s', event, callback_err)
+                    return
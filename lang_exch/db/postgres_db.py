@@ -1,12 +1,99 @@
 '''Module for Postgres Database routines'''
 
-import psycopg2
+import functools
+import random
+import threading
+import time
+import uuid
 
-from lang_exch.db.database import Database
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+from lang_exch.db.change_events import event_payload
+from lang_exch.db.circuit_breaker import CircuitBreaker
+from lang_exch.db.connection_pool import ConnectionPool, PoolTimeoutError
+from lang_exch.db.database import Database, MissingLanguagesError
+from lang_exch.db.pg_listener import ChangeListener
+from lang_exch.db.transfer import InvalidImportError
 from lang_exch.models.language import Language
-from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.conf.log.lang_exch_logging import logger, sampled_logger
+from lang_exch.metrics import QUERY_DURATION, QUERY_ROWS, batch_rows, one_row, timed_query
 from lang_exch.const import dataBaseSection
 
+# prepared once on every pooled connection and run with EXECUTE, so the
+# statements are parsed and planned once per connection instead of per call
+_PREPARED_STATEMENTS = {
+    'lang_exch_insert': """
+    PREPARE lang_exch_insert (text) AS
+    INSERT INTO lang_exch.languages (lang_name) VALUES ($1) RETURNING lang_id;
+    """,
+    'lang_exch_update': """
+    PREPARE lang_exch_update (text, integer) AS
+    UPDATE lang_exch.languages SET lang_name = $1 WHERE lang_id = $2;
+    """,
+    'lang_exch_delete': """
+    PREPARE lang_exch_delete (integer) AS
+    DELETE FROM lang_exch.languages WHERE lang_id = $1;
+    """,
+    'lang_exch_select_one': """
+    PREPARE lang_exch_select_one (integer) AS
+    SELECT btrim(lang_name) FROM lang_exch.languages WHERE lang_id = $1;
+    """,
+    'lang_exch_select_many': """
+    PREPARE lang_exch_select_many (integer[]) AS
+    SELECT lang_id, btrim(lang_name) FROM lang_exch.languages WHERE lang_id = ANY($1);
+    """,
+    'lang_exch_select_all': """
+    PREPARE lang_exch_select_all AS
+    SELECT lang_id, btrim(lang_name) FROM lang_exch.languages ORDER BY lang_id;
+    """,
+    'lang_exch_select_page': """
+    PREPARE lang_exch_select_page (integer, bigint) AS
+    SELECT lang_id, btrim(lang_name) FROM lang_exch.languages
+    WHERE lang_id > $1 ORDER BY lang_id LIMIT $2;
+    """,
+}
+
+
+# errors telling that the database, not the request, is the problem
+_TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeoutError)
+
+
+def _is_transient(error) -> bool:
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+def resilient(idempotent=False):
+    '''Decorator running a PostgresDB method through its circuit breaker.
+    An idempotent method is retried with jittered exponential backoff
+    after a dropped connection, the pool discarding the broken one
+
+    Args:
+        idempotent: True if the method can safely run again
+
+    Returns:
+        decorator
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            attempts = self._read_retries + 1 if idempotent else 1
+            for attempt in range(attempts):
+                try:
+                    return self._breaker.call(lambda: func(self, *args, **kwargs), _is_transient)
+                except _TRANSIENT_ERRORS as db_err:
+                    # a statement timeout says the database is slow, running
+                    # the query again would only add to its load
+                    if attempt + 1 == attempts or \
+                            isinstance(db_err, psycopg2.extensions.QueryCanceledError):
+                        raise
+                    delay = random.uniform(0, self._retry_backoff * 2 ** attempt)
+                    logger.warning('Retrying %s in %.3f seconds after: %s', func.__name__, delay, db_err)
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
 
 class PostgresDB(Database):
     '''Connects and communicates to postgres database'''
@@ -33,33 +120,65 @@ class PostgresDB(Database):
         self._password = db_conf_dict[dataBaseSection.DB_PASSWORD_KEY.value]
         self._database = db_conf_dict[dataBaseSection.DB_DATABASE_KEY.value]
         super().__init__(self._host, self._port, self._username, self._password)
-        logger.debug(f'Received database connection paremeters: Host: {self._host} \
-            Port: {self._port} Uname: {self._username} Pwd: {self._password} \
-                Database: {self._database}')
-        self.__pg_conn_obj = None
+        logger.debug('Received database connection paremeters: Host: %s Port: %s Uname: %s Database: %s',
+                     self._host, self._port, self._username, self._database)
+        self._pool_min_size = int(db_conf_dict.get(dataBaseSection.DB_POOL_MIN_SIZE_KEY.value, 1))
+        self._pool_max_size = int(db_conf_dict.get(dataBaseSection.DB_POOL_MAX_SIZE_KEY.value, 10))
+        self._pool_timeout = float(db_conf_dict.get(dataBaseSection.DB_POOL_TIMEOUT_KEY.value, 30))
+        self._pool_health_check_interval = float(
+            db_conf_dict.get(dataBaseSection.DB_POOL_HEALTH_CHECK_KEY.value, 30))
+        self._notify_channel = db_conf_dict.get(dataBaseSection.DB_NOTIFY_CHANNEL_KEY.value,
+                                                'lang_exch_languages')
+        self._stream_itersize = int(db_conf_dict.get(dataBaseSection.DB_STREAM_ITERSIZE_KEY.value, 2000))
+        self._connect_timeout = int(db_conf_dict.get(dataBaseSection.DB_CONNECT_TIMEOUT_KEY.value, 5))
+        self._statement_timeout = int(db_conf_dict.get(dataBaseSection.DB_STATEMENT_TIMEOUT_KEY.value, 5000))
+        self._bulk_statement_timeout = int(
+            db_conf_dict.get(dataBaseSection.DB_BULK_STATEMENT_TIMEOUT_KEY.value, 60000))
+        self._transfer_statement_timeout = int(
+            db_conf_dict.get(dataBaseSection.DB_TRANSFER_STATEMENT_TIMEOUT_KEY.value, 0))
+        self._copy_buffer_size = int(db_conf_dict.get(dataBaseSection.DB_COPY_BUFFER_SIZE_KEY.value, 65536))
+        self._read_retries = int(db_conf_dict.get(dataBaseSection.DB_READ_RETRIES_KEY.value, 2))
+        self._retry_backoff = float(db_conf_dict.get(dataBaseSection.DB_RETRY_BACKOFF_KEY.value, 50)) / 1000.0
+        self._breaker = CircuitBreaker(
+            f'postgres:{self._host}:{self._port}',
+            failure_threshold=int(db_conf_dict.get(dataBaseSection.DB_BREAKER_THRESHOLD_KEY.value, 5)),
+            reset_timeout=float(db_conf_dict.get(dataBaseSection.DB_BREAKER_RESET_KEY.value, 10)))
+        self.__pool = None
+        self.__pool_lock = threading.Lock()
+        self.__listener = None
 
     def close(self) -> None:
-        '''closes connection with postgres
+        '''closes every pooled connection with postgres
         Args:
             None
 
         Returns:
             None
         '''
+        with self.__pool_lock:
+            if self.__listener is not None:
+                self.__listener.stop()
+                self.__listener = None
+            if self.__pool is not None:
+                self.__pool.close()
+                self.__pool = None
 
     def is_open(self) -> bool:
-        '''Returns True if connection with postgres
+        '''Returns True if the connection pool to postgres
         database is open
 
         Args:
             None
 
         Returns:
-            None
+            bool
         '''
+        pool = self.__pool
+        return pool is not None and pool.is_open()
 
     def connect(self) -> None:
-        '''establishes a connection to postgres
+        '''opens the pool of connections to postgres. Calling it
+        again while the pool is open is a no-op
 
         Args:
             None
@@ -67,14 +186,126 @@ class PostgresDB(Database):
         Returns:
             None
         '''
-        self.__pg_conn_obj = psycopg2.connect(
+        with self.__pool_lock:
+            if self.is_open():
+                return
+            # while the database is down every request would otherwise wait
+            # for connect_timeout before failing
+            self._breaker.call(self._open_pool, _is_transient)
+        logger.debug('Connected to postgres database: %s:%s/%s', self._host, self._port, self._database)
+
+    def _open_pool(self) -> None:
+        '''Opens the pool, its lock held by the caller'''
+        pool = ConnectionPool(
+                self._new_prepared_connection,
+                min_size=self._pool_min_size,
+                max_size=self._pool_max_size,
+                timeout=self._pool_timeout,
+                health_check_interval=self._pool_health_check_interval,
+                is_healthy=self._is_healthy,
+                reset=self._reset)
+        pool.open()
+        self.__pool = pool
+
+    def pool_stats(self) -> dict:
+        '''Returns size information of the connection pool'''
+        pool = self.__pool
+        return pool.stats() if pool is not None else {}
+
+    def circuit_stats(self) -> dict:
+        '''Returns the state of the circuit breaker guarding postgres'''
+        return self._breaker.stats()
+
+    def _new_connection(self):
+        '''Opens a single new connection to postgres'''
+        return psycopg2.connect(
                     host=self._host,
                     user=self._username,
                     password=self._password,
                     database=self._database,
-                    port=self._port)
-        logger.debug(f"Connected to postgres database: {self.__pg_conn_obj}")
+                    port=self._port,
+                    connect_timeout=self._connect_timeout,
+                    # server side bound of every statement of the session
+                    options=f'-c statement_timeout={self._statement_timeout}')
+
+    def _new_prepared_connection(self):
+        '''Opens a new pooled connection with the catalog statements
+        prepared on it'''
+        conn = self._new_connection()
+        try:
+            cursor_obj = conn.cursor()
+            for statement in _PREPARED_STATEMENTS.values():
+                cursor_obj.execute(statement)
+            cursor_obj.close()
+            conn.commit()
+        except psycopg2.Error:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        '''Round trips a trivial query to verify an idle connection'''
+        if conn.closed:
+            return False
+        cursor_obj = conn.cursor()
+        try:
+            cursor_obj.execute('SELECT 1;')
+            cursor_obj.fetchone()
+        finally:
+            cursor_obj.close()
+        conn.rollback()
+        return True
+
+    @staticmethod
+    def _reset(conn) -> None:
+        '''Rolls back any transaction left open before the connection
+        goes back to the pool'''
+        if conn.closed:
+            raise psycopg2.InterfaceError('connection already closed')
+        if conn.status != psycopg2.extensions.STATUS_READY:
+            conn.rollback()
+
+    def listen(self, on_change, on_reconnect=None) -> bool:
+        '''Starts a background listener applying the catalog changes
+        published by other processes
 
+        Args:
+            on_change: callable(dict) receiving every change event
+            on_reconnect: callable() invoked after the listener had to
+                reconnect and may have missed events
+
+        Returns:
+            bool: True as postgres supports change notifications
+        '''
+        with self.__pool_lock:
+            if self.__listener is None:
+                self.__listener = ChangeListener(self._new_connection, self._notify_channel,
+                                                 on_change, on_reconnect)
+                self.__listener.start()
+        return True
+
+    def _notify(self, cursor_obj, operation: str, lang_id=None, lang_name=None) -> None:
+        '''Publishes a change event within the current transaction, so it
+        is only delivered to listeners once the change is committed'''
+        payload = event_payload(operation, lang_id, lang_name)
+        cursor_obj.execute('SELECT pg_notify(%(channel)s, %(payload)s);',
+                           {'channel': self._notify_channel, 'payload': payload})
+
+    def _set_bulk_statement_timeout(self, cursor_obj) -> None:
+        '''Raises the statement timeout of the current transaction for a
+        statement touching many rows'''
+        cursor_obj.execute('SET LOCAL statement_timeout = %(timeout)s;',
+                           {'timeout': self._bulk_statement_timeout})
+
+    def _connection(self):
+        '''Borrows a connection from the pool, opening the pool on first use'''
+        if not self.is_open():
+            self.connect()
+        return self.__pool.connection()
+
+    @timed_query('add_language', rows=one_row)
+    @resilient(idempotent=False)
     def add_language(self, lang_obj: Language) -> None:
         '''A new table entry will be added for a new language
 
@@ -87,29 +318,63 @@ class PostgresDB(Database):
         language_id = None
         lang = lang_obj.get_language_name()
 
-        # Use in-memory cursor object for fast read write access
-        # This will create as well as open the cursor
-        cursor_obj = self.__pg_conn_obj.cursor()
+        logger.info('Querying database to insert a new language:%s to a postgres db', lang)
 
-        logger.info(f'Querying database to insert a new language:{lang} to a postgres db')
+        with self._connection() as pg_conn_obj:
+            # Use in-memory cursor object for fast read write access
+            # This will create as well as open the cursor
+            cursor_obj = pg_conn_obj.cursor()
 
-        # TODO: how to get table name and how to get column name.
-        # For now, its hardcoded
-        cursor_obj.execute("""
-        INSERT INTO lang_exch.languages (lang_name)
-        VALUES (%(str)s) RETURNING lang_id;
-        """,
-        {'str': lang})
+            cursor_obj.execute('EXECUTE lang_exch_insert (%(str)s);', {'str': lang})
 
-        language_id = cursor_obj.fetchone()[0]
+            language_id = cursor_obj.fetchone()[0]
+            self._notify(cursor_obj, 'insert', language_id, lang)
 
-        # commit the transaction in order to flush the
-        # in-memory cursor buffer
-        self.__pg_conn_obj.commit()
-        cursor_obj.close()
-        logger.info(f'New language:{lang} successfully added in the Database: {language_id}')
+            # commit the transaction in order to flush the
+            # in-memory cursor buffer
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        logger.info('New language:%s successfully added in the Database: %s', lang, language_id)
         return language_id
 
+    @timed_query('add_languages')
+    @resilient(idempotent=False)
+    def add_languages(self, lang_objs: list) -> list:
+        '''New table entries will be added for every language using
+        multi-row inserts within a single transaction
+
+        Args:
+            lang_objs: list of objects of type Language with unique names
+
+        Returns:
+            list: ids of the new languages, in the order of lang_objs
+        '''
+        lang_names = [lang_obj.get_language_name() for lang_obj in lang_objs]
+
+        logger.info('Querying database to insert %s new languages to a postgres db', len(lang_names))
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            self._set_bulk_statement_timeout(cursor_obj)
+            # execute_values packs page_size rows into every INSERT statement
+            rows = psycopg2.extras.execute_values(cursor_obj, """
+            INSERT INTO lang_exch.languages (lang_name)
+            VALUES %s RETURNING lang_id, btrim(lang_name);
+            """,
+            [(lang_name,) for lang_name in lang_names],
+            page_size=1000, fetch=True)
+            # a single event, listeners reload rather than receiving one per row
+            self._notify(cursor_obj, 'reload')
+
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        # RETURNING does not guarantee the VALUES order, map back by name
+        name_id_map = {lang_name: lang_id for lang_id, lang_name in rows}
+        logger.info('%s new languages successfully added in the Database', len(rows))
+        return [name_id_map.get(lang_name) for lang_name in lang_names]
+
+    @timed_query('update_language', rows=one_row)
+    @resilient(idempotent=False)
     def update_language(self, lang_obj: Language, new_lang: str) -> None:
         '''An entry will be updated for the existing language
 
@@ -122,21 +387,21 @@ class PostgresDB(Database):
         '''
         lang_id = lang_obj.get_lang_id()
 
-        cursor_obj = self.__pg_conn_obj.cursor()
-
-        logger.info(f'Querying database to update a language with ID:{lang_id} with new lang: {new_lang}\
-            to a postgres db')
+        logger.info('Querying database to update a language with ID:%s with new lang: %s to a postgres db',
+                    lang_id, new_lang)
 
-        cursor_obj.execute("""
-        UPDATE lang_exch.languages SET lang_name = %(str)s
-        WHERE lang_id = %(int)s;
-        """,
-        {'str': new_lang, 'int': lang_id})
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            cursor_obj.execute('EXECUTE lang_exch_update (%(str)s, %(int)s);',
+                               {'str': new_lang, 'int': lang_id})
+            self._notify(cursor_obj, 'update', lang_id, new_lang)
 
-        self.__pg_conn_obj.commit()
-        cursor_obj.close()
-        logger.info(f'language successfully updated with {new_lang} in the Database')
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        logger.info('language successfully updated with %s in the Database', new_lang)
 
+    @timed_query('delete_language', rows=one_row)
+    @resilient(idempotent=False)
     def delete_language(self, lang_obj: Language) -> None:
         '''An entry for the requested language will be deleted
 
@@ -148,66 +413,473 @@ class PostgresDB(Database):
         '''
         lang_id = lang_obj.get_lang_id()
 
-        cursor_obj = self.__pg_conn_obj.cursor()
-        logger.info(f'Querying database to delete a language with ID:{lang_id} to a postgres db')
-        
-        cursor_obj.execute("""
-        DELETE FROM lang_exch.languages
-        WHERE lang_id = %(int)s;
-        """,
-        {'int': lang_id})
-
-        self.__pg_conn_obj.commit()
-        cursor_obj.close()
+        logger.info('Querying database to delete a language with ID:%s to a postgres db', lang_id)
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            cursor_obj.execute('EXECUTE lang_exch_delete (%(int)s);', {'int': lang_id})
+            self._notify(cursor_obj, 'delete', lang_id)
+
+            pg_conn_obj.commit()
+            cursor_obj.close()
         logger.info('language successfully deleted from the Database')
 
+    @timed_query('update_languages', rows=batch_rows)
+    @resilient(idempotent=False)
+    def update_languages(self, lang_objs: list) -> None:
+        '''Entries will be updated for every given language within a
+        single UPDATE ... FROM (VALUES ...) statement and transaction
+
+        Args:
+            lang_objs: list of objects of type Language with id and new name
+
+        Returns:
+            None
+
+        Exceptions:
+            MissingLanguagesError
+        '''
+        lang_ids = {lang_obj.get_lang_id() for lang_obj in lang_objs}
+
+        logger.info('Querying database to update %s languages to a postgres db', len(lang_objs))
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            self._set_bulk_statement_timeout(cursor_obj)
+            rows = psycopg2.extras.execute_values(cursor_obj, """
+            UPDATE lang_exch.languages AS languages SET lang_name = new_values.lang_name
+            FROM (VALUES %s) AS new_values (lang_id, lang_name)
+            WHERE languages.lang_id = new_values.lang_id
+            RETURNING languages.lang_id;
+            """,
+            [(lang_obj.get_lang_id(), lang_obj.get_language_name()) for lang_obj in lang_objs],
+            template='(%s::integer, %s::text)', page_size=1000, fetch=True)
+
+            missing_ids = lang_ids - {row[0] for row in rows}
+            if missing_ids:
+                pg_conn_obj.rollback()
+                cursor_obj.close()
+                raise MissingLanguagesError(missing_ids)
+            self._notify(cursor_obj, 'reload')
+
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        logger.info('%s languages successfully updated in the Database', len(lang_objs))
+
+    @timed_query('delete_languages', rows=batch_rows)
+    @resilient(idempotent=False)
+    def delete_languages(self, lang_objs: list) -> None:
+        '''Entries for every given language will be deleted within a
+        single DELETE ... = ANY(...) statement and transaction
+
+        Args:
+            lang_objs: list of objects of type Language
+
+        Returns:
+            None
+
+        Exceptions:
+            MissingLanguagesError
+        '''
+        lang_ids = [lang_obj.get_lang_id() for lang_obj in lang_objs]
+
+        logger.info('Querying database to delete %s languages to a postgres db', len(lang_ids))
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            self._set_bulk_statement_timeout(cursor_obj)
+            cursor_obj.execute("""
+            DELETE FROM lang_exch.languages
+            WHERE lang_id = ANY(%(ids)s)
+            RETURNING lang_id;
+            """,
+            {'ids': lang_ids})
+
+            missing_ids = set(lang_ids) - {row[0] for row in cursor_obj.fetchall()}
+            if missing_ids:
+                pg_conn_obj.rollback()
+                cursor_obj.close()
+                raise MissingLanguagesError(missing_ids)
+            self._notify(cursor_obj, 'reload')
+
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        logger.info('%s languages successfully deleted from the Database', len(lang_ids))
+
+    @timed_query('apply_mutations')
+    @resilient(idempotent=False)
+    def apply_mutations(self, mutations: list) -> list:
+        '''Applies single language writes within one transaction, each
+        one inside its own savepoint so a failing write is rolled back
+        alone while the others still commit
+
+        Args:
+            mutations: list of (operation, Language) pairs, operation
+                being insert, update or delete
+
+        Returns:
+            list: per mutation, the new id of an insert, None, or the
+                exception the write failed with
+        '''
+        logger.info('Querying database to apply %s writes to a postgres db', len(mutations))
+
+        results = []
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            for operation, lang_obj in mutations:
+                lang_id = lang_obj.get_lang_id()
+                lang_name = lang_obj.get_language_name()
+                cursor_obj.execute('SAVEPOINT lang_exch_write;')
+                try:
+                    if operation == 'insert':
+                        cursor_obj.execute('EXECUTE lang_exch_insert (%(str)s);', {'str': lang_name})
+                        lang_id = cursor_obj.fetchone()[0]
+                        result = lang_id
+                    elif operation == 'update':
+                        cursor_obj.execute('EXECUTE lang_exch_update (%(str)s, %(int)s);',
+                                           {'str': lang_name, 'int': lang_id})
+                        result = None
+                    elif operation == 'delete':
+                        cursor_obj.execute('EXECUTE lang_exch_delete (%(int)s);', {'int': lang_id})
+                        result = None
+                    else:
+                        raise ValueError(f'Unknown write operation: {operation}')
+                    self._notify(cursor_obj, operation, lang_id, lang_name)
+                    cursor_obj.execute('RELEASE SAVEPOINT lang_exch_write;')
+                except (psycopg2.DataError, psycopg2.IntegrityError, ValueError) as write_err:
+                    cursor_obj.execute('ROLLBACK TO SAVEPOINT lang_exch_write;')
+                    result = write_err
+                results.append(result)
+
+            # a single commit, hence a single WAL flush, for the whole batch
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        logger.info('%s writes successfully applied in the Database', len(mutations))
+        return results
+
+    @timed_query('get_language', rows=one_row)
+    @resilient(idempotent=True)
     def get_language(self, lang_id: int) -> str:
-        '''Returns a language record for a given id
+        '''Returns a language name for a given id or None
 
         args:
             lang_id: id of a language whose record is needed
 
         returns:
-            None
+            str
         '''
-        cursor_obj = self.__pg_conn_obj.cursor()
-        logger.info(f'Querying database to get language details for ID:{lang_id} to a postgres db')
-    
-        cursor_obj.execute("""
-        SELECT * FROM lang_exch.languages
-        WHERE lang_id = %(int)s;
-        """,
-        {'int': lang_id})
-
-        lang_name = cursor_obj.fetchone()[1]
-        cursor_obj.close()
-        logger.info('language details successfully fetched from the Database')
+        sampled_logger.debug('Querying database to get language details for ID:%s to a postgres db', lang_id)
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            cursor_obj.execute('EXECUTE lang_exch_select_one (%(int)s);', {'int': lang_id})
+            row = cursor_obj.fetchone()
+            cursor_obj.close()
+        lang_name = row[0] if row is not None else None
+        sampled_logger.debug('language details successfully fetched from the Database')
         return lang_name
 
-    def get_languages(self) -> None:
-        '''Returns all the language records
+    @timed_query('get_languages_by_ids')
+    @resilient(idempotent=True)
+    def get_languages_by_ids(self, lang_ids: list) -> dict:
+        '''Returns the records of many languages in a single query
 
         args:
-            None
+            lang_ids: ids of the languages whose records are needed
 
         returns:
-            None
+            dict: lang_id -> lang_name, unknown ids being left out
         '''
+        sampled_logger.debug('Querying database to get details for %s languages from a postgres db', len(lang_ids))
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            # a list is sent as a single array parameter, whatever its length
+            cursor_obj.execute('EXECUTE lang_exch_select_many (%(ids)s::integer[]);', {'ids': list(lang_ids)})
+            id_name_map = dict(cursor_obj.fetchall())
+            cursor_obj.close()
+        return id_name_map
+
+    @timed_query('get_languages')
+    @resilient(idempotent=True)
+    def get_languages(self, limit: int = None, after_id: int = None) -> dict:
+        '''Returns the language records, all of them or a single page
+        ordered by id when a limit is given
+
+        args:
+            limit: maximum number of records to return
+            after_id: return only records with an id greater than this,
+                i.e. the last id of the previous page
 
-        cursor_obj = self.__pg_conn_obj.cursor()
+        returns:
+            dict: language id to language name
+        '''
+        sampled_logger.debug('Querying database to get details for all languages to a postgres db')
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            if limit is None:
+                cursor_obj.execute('EXECUTE lang_exch_select_all;')
+            else:
+                # keyset pagination, served by the primary key index
+                cursor_obj.execute('EXECUTE lang_exch_select_page (%(after_id)s, %(limit)s);',
+                                   {'after_id': after_id if after_id is not None else -1, 'limit': limit})
+
+            rows = cursor_obj.fetchall()
+            cursor_obj.close()
+        id_name_map = dict(rows)
+        sampled_logger.debug('Corresponding languages for all language get query: %s', rows)
+        sampled_logger.debug('language details successfully fetched from the Database')
+        return id_name_map
 
-        logger.info(f'Querying database to get details for all languages to a postgres db')
+    def iter_languages(self, itersize: int = None):
+        '''Yields every language record ordered by id through a server
+        side cursor, fetching itersize rows per round trip, so memory
+        stays constant whatever the size of the table
 
-        cursor_obj.execute("""
-        SELECT * FROM lang_exch.languages;
+        args:
+            itersize: number of rows fetched per round trip
+
+        returns:
+            generator of (lang_id, lang_name) tuples
+        '''
+        logger.info('Querying database to stream details for all languages from a postgres db')
+        # rows are consumed lazily, the breaker only guards opening the stream
+        self._breaker.allow()
+        # every outcome is recorded, a half-open probe must not stay pending
+        recorded = False
+        try:
+            with self._connection() as pg_conn_obj:
+                # a named cursor lives on the server for the current transaction
+                cursor_obj = pg_conn_obj.cursor(name=f'lang_exch_stream_{uuid.uuid4().hex}')
+                cursor_obj.itersize = itersize or self._stream_itersize
+                started = time.perf_counter()
+                row_count = 0
+                try:
+                    # a named cursor can not be declared over EXECUTE
+                    cursor_obj.execute("""
+                    SELECT lang_id, btrim(lang_name) FROM lang_exch.languages
+                    ORDER BY lang_id;
+                    """)
+                    recorded = True
+                    self._breaker.record_success()
+                    for row in cursor_obj:
+                        row_count += 1
+                        yield row
+                finally:
+                    cursor_obj.close()
+                    # includes the time the consumer spent between rows
+                    QUERY_DURATION.observe(time.perf_counter() - started, 'iter_languages')
+                    QUERY_ROWS.inc('iter_languages', amount=row_count)
+        except BaseException as stream_err:
+            if _is_transient(stream_err):
+                self._breaker.record_failure()
+            elif not recorded:
+                self._breaker.record_success()
+            raise
+        else:
+            if not recorded:
+                self._breaker.record_success()
+
+    def _reject_near_duplicates(self, pg_conn_obj, cursor_obj, near_duplicates) -> None:
+        '''Marks the staged rows for which near_duplicates(lang_name,
+        lang_id) returns a non empty list as too_similar. The rows are
+        read in import order through a server side cursor'''
+        reader = pg_conn_obj.cursor(name=f'lang_exch_import_{uuid.uuid4().hex}')
+        reader.itersize = self._stream_itersize
+        reader.execute("""
+        SELECT import_row, lang_id, btrim(lang_name) FROM lang_exch_import
+        WHERE reason IS NULL ORDER BY import_row;
         """)
+        too_similar = [(import_row,) for import_row, lang_id, lang_name in reader
+                       if near_duplicates(lang_name, lang_id)]
+        reader.close()
+        if too_similar:
+            psycopg2.extras.execute_values(cursor_obj, """
+            UPDATE lang_exch_import AS staged SET reason = 'too_similar'
+            FROM (VALUES %s) AS rejected (import_row)
+            WHERE staged.import_row = rejected.import_row;
+            """, too_similar, template='(%s::bigint)', page_size=1000)
+
+    def _set_transfer_statement_timeout(self, cursor_obj) -> None:
+        '''Sets the statement timeout of the current transaction for an
+        export or import, which runs at the pace of the client'''
+        cursor_obj.execute('SET LOCAL statement_timeout = %(timeout)s;',
+                           {'timeout': self._transfer_statement_timeout})
+
+    @timed_query('export_languages', rows=lambda result, args: result)
+    @resilient(idempotent=False)
+    def export_languages(self, out, fmt: str = 'csv') -> int:
+        '''Writes every language ordered by id to out with COPY TO STDOUT,
+        rows going from the server to out without being turned into
+        Python objects
 
-        row = cursor_obj.fetchall()
-        id_name_map = {}
-        for fields in row:
-            logger.info(f'Corresponding language for all language get query:')
-            id_name_map[fields[0]] = fields[1].strip()
-        cursor_obj.close()
-        logger.info('language details successfully fetched from the Database')
-        return id_name_map
+        args:
+            out: binary file-like object
+            fmt: csv, with a header line, or ndjson
+
+        returns:
+            int: number of languages written
+        '''
+        logger.info('Exporting every language as %s from a postgres db', fmt)
+        if fmt == 'csv':
+            copy_sql = """
+            COPY (SELECT lang_id, btrim(lang_name) AS lang_name FROM lang_exch.languages ORDER BY lang_id)
+            TO STDOUT WITH (FORMAT csv, HEADER true);
+            """
+        else:
+            # a csv whose quote and delimiter never occur in json leaves
+            # every document as it is, the text format would escape it
+            copy_sql = """
+            COPY (SELECT jsonb_build_object('lang_id', lang_id, 'lang_name', btrim(lang_name))
+                  FROM lang_exch.languages ORDER BY lang_id)
+            TO STDOUT WITH (FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02');
+            """
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            self._set_transfer_statement_timeout(cursor_obj)
+            cursor_obj.copy_expert(copy_sql, out, size=self._copy_buffer_size)
+            row_count = cursor_obj.rowcount
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        logger.info('%s languages exported', row_count)
+        return row_count
+
+    @timed_query('import_languages', rows=lambda result, args: result['inserted'] + result['updated'])
+    @resilient(idempotent=False)
+    def import_languages(self, source, fmt: str = 'csv', report_limit: int = 100, near_duplicates=None) -> dict:
+        '''Merges the languages read from source into the table within a
+        single transaction. The rows are streamed with COPY FROM STDIN
+        into a temporary staging table, checked and merged there with set
+        based statements, see Database.import_languages for the rules.
+        Names are compared with the table as it was before the import
+
+        args:
+            source: binary file-like object
+            fmt: csv, with a header line, or ndjson
+            report_limit: maximum number of conflicts reported
+            near_duplicates: callable(lang_name, lang_id) returning a non
+                empty list for a row to reject as too_similar, or None
 
+        returns:
+            dict: inserted, updated, unchanged and rejected counts, and
+                the first report_limit conflicts
+
+        Exceptions:
+            InvalidImportError
+        '''
+        logger.info('Importing languages as %s into a postgres db', fmt)
+
+        with self._connection() as pg_conn_obj:
+            cursor_obj = pg_conn_obj.cursor()
+            self._set_transfer_statement_timeout(cursor_obj)
+            cursor_obj.execute("""
+            CREATE TEMP TABLE lang_exch_import (
+                import_row bigserial PRIMARY KEY, lang_id integer, lang_name text, reason text
+            ) ON COMMIT DROP;
+            """)
+            try:
+                if fmt == 'csv':
+                    cursor_obj.copy_expert("""
+                    COPY lang_exch_import (lang_id, lang_name) FROM STDIN WITH (FORMAT csv, HEADER true);
+                    """, source, size=self._copy_buffer_size)
+                else:
+                    cursor_obj.execute("""
+                    CREATE TEMP TABLE lang_exch_import_documents (line bigserial, document text)
+                    ON COMMIT DROP;
+                    """)
+                    cursor_obj.copy_expert("""
+                    COPY lang_exch_import_documents (document) FROM STDIN
+                    WITH (FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02');
+                    """, source, size=self._copy_buffer_size)
+                    cursor_obj.execute("""
+                    SELECT line FROM lang_exch_import_documents
+                    WHERE btrim(document) <> '' AND jsonb_typeof(document::jsonb) <> 'object'
+                    ORDER BY line LIMIT 1;
+                    """)
+                    not_an_object = cursor_obj.fetchone()
+                    if not_an_object is not None:
+                        pg_conn_obj.rollback()
+                        cursor_obj.close()
+                        raise InvalidImportError(f'Line {not_an_object[0]}: expected an object')
+                    cursor_obj.execute("""
+                    INSERT INTO lang_exch_import (lang_id, lang_name)
+                    SELECT (document::jsonb->>'lang_id')::integer, document::jsonb->>'lang_name'
+                    FROM lang_exch_import_documents WHERE btrim(document) <> '' ORDER BY line;
+                    """)
+            except psycopg2.DataError as copy_err:
+                pg_conn_obj.rollback()
+                cursor_obj.close()
+                raise InvalidImportError(f'Invalid {fmt} import: {copy_err.pgerror or copy_err}') from copy_err
+            cursor_obj.execute('ANALYZE lang_exch_import;')
+
+            # the same rules as valid_import_name, then the first row of a
+            # name or id wins, then names owned by another language
+            cursor_obj.execute("""
+            UPDATE lang_exch_import SET reason = 'invalid_name'
+            WHERE lang_name IS NULL OR btrim(lang_name) !~ '^[[:alpha:]]{1,20}$';
+
+            UPDATE lang_exch_import AS staged SET reason = 'duplicate_in_import'
+            FROM (SELECT import_row,
+                         row_number() OVER (PARTITION BY lower(btrim(lang_name)) ORDER BY import_row) AS name_rank,
+                         row_number() OVER (PARTITION BY lang_id ORDER BY import_row) AS id_rank
+                  FROM lang_exch_import WHERE reason IS NULL) AS ranked
+            WHERE staged.import_row = ranked.import_row
+            AND (ranked.name_rank > 1 OR (staged.lang_id IS NOT NULL AND ranked.id_rank > 1));
+
+            UPDATE lang_exch_import AS staged SET reason = 'name_taken'
+            FROM lang_exch.languages AS languages
+            WHERE staged.reason IS NULL
+            AND lower(btrim(languages.lang_name)) = lower(btrim(staged.lang_name))
+            AND languages.lang_id IS DISTINCT FROM staged.lang_id;
+            """)
+            if near_duplicates is not None:
+                self._reject_near_duplicates(pg_conn_obj, cursor_obj, near_duplicates)
+            cursor_obj.execute('SELECT count(*) FROM lang_exch_import WHERE reason IS NULL;')
+            accepted = cursor_obj.fetchone()[0]
+
+            cursor_obj.execute("""
+            UPDATE lang_exch.languages AS languages SET lang_name = btrim(staged.lang_name)
+            FROM lang_exch_import AS staged
+            WHERE staged.reason IS NULL AND languages.lang_id = staged.lang_id
+            AND btrim(languages.lang_name) <> btrim(staged.lang_name);
+            """)
+            updated = cursor_obj.rowcount
+            cursor_obj.execute("""
+            INSERT INTO lang_exch.languages (lang_id, lang_name)
+            SELECT staged.lang_id, btrim(staged.lang_name) FROM lang_exch_import AS staged
+            WHERE staged.reason IS NULL AND staged.lang_id IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM lang_exch.languages AS languages
+                            WHERE languages.lang_id = staged.lang_id)
+            ORDER BY staged.import_row;
+            """)
+            inserted = cursor_obj.rowcount
+            if inserted:
+                # later inserts must not be handed an id taken just now
+                cursor_obj.execute("""
+                SELECT setval(pg_get_serial_sequence('lang_exch.languages', 'lang_id'),
+                              (SELECT max(lang_id) FROM lang_exch.languages));
+                """)
+            cursor_obj.execute("""
+            INSERT INTO lang_exch.languages (lang_name)
+            SELECT btrim(lang_name) FROM lang_exch_import
+            WHERE reason IS NULL AND lang_id IS NULL ORDER BY import_row;
+            """)
+            inserted += cursor_obj.rowcount
+
+            cursor_obj.execute('SELECT count(*) FROM lang_exch_import WHERE reason IS NOT NULL;')
+            rejected = cursor_obj.fetchone()[0]
+            cursor_obj.execute("""
+            SELECT import_row, lang_id, lang_name, reason FROM lang_exch_import
+            WHERE reason IS NOT NULL ORDER BY import_row LIMIT %(limit)s;
+            """, {'limit': report_limit})
+            conflicts = [{'row': row, 'lang_id': lang_id, 'lang_name': lang_name, 'reason': reason}
+                         for row, lang_id, lang_name, reason in cursor_obj.fetchall()]
+            if inserted or updated:
+                self._notify(cursor_obj, 'reload')
+
+            pg_conn_obj.commit()
+            cursor_obj.close()
+        logger.info('Import applied: %s inserted, %s updated, %s rejected', inserted, updated, rejected)
+        return {'inserted': inserted, 'updated': updated, 'unchanged': accepted - inserted - updated,
+                'rejected': rejected, 'conflicts': conflicts}
@@ -0,0 +1,176 @@
+'''Module for spreading reads across read replicas of the primary database'''
+
+import random
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import unquote, urlsplit
+
+from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.const import dataBaseSection
+
+# libpq connection parameter -> key of the [database] configuration section
+_DSN_KEYS = {
+    'host': dataBaseSection.DB_HOST_KEY.value,
+    'port': dataBaseSection.DB_PORT_KEY.value,
+    'dbname': dataBaseSection.DB_DATABASE_KEY.value,
+    'user': dataBaseSection.DB_USERNAME_KEY.value,
+    'password': dataBaseSection.DB_PASSWORD_KEY.value,
+}
+
+
+def replica_config(dsn: str, primary_config: dict) -> dict:
+    '''Returns the database configuration of a replica, the primary one
+    overridden by what the DSN sets
+
+    Args:
+        dsn: postgresql:// URI or key=value libpq connection string,
+            parameters it leaves out are taken from the primary
+        primary_config: [database] section of the configuration
+
+    Returns:
+        dict
+
+    Exceptions:
+        ValueError
+    '''
+    if '://' in dsn:
+        parts = urlsplit(dsn)
+        params = {'host': parts.hostname, 'port': parts.port,
+                  'dbname': unquote(parts.path.lstrip('/')) or None,
+                  'user': unquote(parts.username) if parts.username else None,
+                  'password': unquote(parts.password) if parts.password else None}
+    else:
+        try:
+            params = dict(pair.split('=', 1) for pair in shlex.split(dsn))
+        except ValueError as dsn_err:
+            raise ValueError(f'Invalid replica DSN: {dsn}') from dsn_err
+    db_config = dict(primary_config)
+    db_config.update({_DSN_KEYS[name]: str(value) for name, value in params.items()
+                      if name in _DSN_KEYS and value is not None})
+    return db_config
+
+
+class ReplicaSet:
+    '''Routes reads to the replica with the fewest reads in flight,
+    skipping replicas whose circuit is open. Remembers for a window after
+    each write which clients must keep reading from the primary, so that
+    they read their own writes despite the replication lag'''
+
+    def __init__(self, replicas, read_your_writes_window=1.0, max_clients=100000):
+        '''Init method
+        Args:
+            replicas: connected Database providers of the replicas
+            read_your_writes_window: seconds a client reads from the
+                primary after its last write
+            max_clients: clients remembered at most, the ones whose
+                window expired are forgotten first
+
+        Returns:
+            ReplicaSet()
+        '''
+        self._replicas = list(replicas)
+        self._outstanding = [0] * len(self._replicas)
+        self._window = read_your_writes_window
+        self._max_clients = max_clients
+        self._lock = threading.Lock()
+        # client key -> time.monotonic() until which it reads the primary
+        self._primary_until = {}
+
+    def record_write(self, client_key) -> None:
+        '''Pins the client to the primary for the read your writes window'''
+        if client_key is None or self._window <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._primary_until) >= self._max_clients:
+                self._primary_until = {key: until for key, until in self._primary_until.items()
+                                       if until > now}
+                if len(self._primary_until) >= self._max_clients:
+                    # every window is still running, forget the oldest one
+                    del self._primary_until[min(self._primary_until, key=self._primary_until.get)]
+            self._primary_until[client_key] = now + self._window
+
+    def reads_primary(self, client_key) -> bool:
+        '''Returns True while the client is within the window of its last
+        write'''
+        if client_key is None:
+            return False
+        with self._lock:
+            until = self._primary_until.get(client_key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._primary_until[client_key]
+                return False
+            return True
+
+    def _pick(self):
+        '''Returns the index of the least busy available replica, ties
+        broken at random, or None when none is available'''
+        with self._lock:
+            available = [index for index, replica in enumerate(self._replicas)
+                         if _circuit_state(replica) != 'open']
+            if not available:
+                return None
+            fewest = min(self._outstanding[index] for index in available)
+            index = random.choice([index for index in available if self._outstanding[index] == fewest])
+            self._outstanding[index] += 1
+            return index
+
+    @contextmanager
+    def replica(self):
+        '''Yields the least busy available replica for the duration of
+        the with block, or None when every replica is unavailable'''
+        index = self._pick()
+        if index is None:
+            yield None
+            return
+        try:
+            yield self._replicas[index]
+        finally:
+            with self._lock:
+                self._outstanding[index] -= 1
+
+    def read(self, read, fallback):
+        '''Calls read(replica) on the least busy replica, and fallback()
+        instead when no replica is available or the replica failed
+
+        Args:
+            read: callable(replica) performing the read
+            fallback: callable without arguments reading the primary
+
+        Returns:
+            result of read or fallback
+        '''
+        with self.replica() as replica:
+            if replica is not None:
+                try:
+                    return read(replica)
+                except Exception as replica_err:
+                    # reads are idempotent, the primary answers instead
+                    logger.warning('Read from replica %s:%s failed, reading the primary: %s',
+                                   replica.get_host(), replica.get_port(), replica_err)
+        return fallback()
+
+    def close(self) -> None:
+        '''Closes every replica'''
+        for replica in self._replicas:
+            replica.close()
+
+    def stats(self) -> list:
+        '''Returns the reads in flight and the circuit state of every
+        replica'''
+        with self._lock:
+            return [{'host': replica.get_host(), 'port': replica.get_port(),
+                     'outstanding': outstanding, 'circuit': _circuit_state(replica)}
+                    for replica, outstanding in zip(self._replicas, self._outstanding)]
+
+    def __len__(self):
+        return len(self._replicas)
+
+
+def _circuit_state(replica) -> str:
+    stats = getattr(replica, 'circuit_stats', None)
+    return stats().get('state', 'closed') if stats is not None else 'closed'
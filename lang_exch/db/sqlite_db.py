@@ -0,0 +1,378 @@
+'''Module for embedded SQLite Database routines'''
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from lang_exch.db.connection_pool import ConnectionPool
+from lang_exch.db.database import Database, MissingLanguagesError
+from lang_exch.models.language import Language
+from lang_exch.conf.log.lang_exch_logging import logger, sampled_logger
+from lang_exch.metrics import batch_rows, one_row, timed_query
+from lang_exch.const import dataBaseSection
+
+# sqlite3 keeps the compiled form of every statement in a per connection
+# cache keyed by its text, so the fixed statements below are only
+# prepared once per connection
+_CREATE_TABLE = '''
+CREATE TABLE IF NOT EXISTS languages (
+    lang_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lang_name TEXT NOT NULL
+);
+'''
+_INSERT = 'INSERT INTO languages (lang_name) VALUES (?);'
+_INSERT_WITH_ID = 'INSERT INTO languages (lang_id, lang_name) VALUES (?, ?);'
+_UPDATE = 'UPDATE languages SET lang_name = ? WHERE lang_id = ?;'
+_DELETE = 'DELETE FROM languages WHERE lang_id = ?;'
+_SELECT_ONE = 'SELECT lang_name FROM languages WHERE lang_id = ?;'
+_SELECT_MANY = 'SELECT lang_id, lang_name FROM languages WHERE lang_id IN ({});'
+# below the default limit of 999 host parameters per statement
+_SELECT_MANY_CHUNK = 500
+_SELECT_ALL = 'SELECT lang_id, lang_name FROM languages ORDER BY lang_id;'
+_SELECT_PAGE = 'SELECT lang_id, lang_name FROM languages WHERE lang_id > ? ORDER BY lang_id LIMIT ?;'
+
+
+class SQLiteDB(Database):
+    '''Stores the catalog in an embedded SQLite database, in a file or
+    in memory, with no network hop'''
+
+    MEMORY = ':memory:'
+
+    def __init__(self, **kwargs):
+        '''Init method
+        Args:
+            db_config: dict of the database section of the configuration,
+                sqlite_path being the database file or :memory:
+
+        Returns:
+            SQLiteDB()
+        '''
+        for args_val in kwargs.values():
+            db_conf_dict = args_val
+
+        self._path = db_conf_dict.get(dataBaseSection.DB_SQLITE_PATH_KEY.value, self.MEMORY) or self.MEMORY
+        super().__init__(None, None, None, None)
+        logger.debug('Received sqlite database path: %s', self._path)
+        self._pool_min_size = int(db_conf_dict.get(dataBaseSection.DB_POOL_MIN_SIZE_KEY.value, 1))
+        self._pool_max_size = int(db_conf_dict.get(dataBaseSection.DB_POOL_MAX_SIZE_KEY.value, 10))
+        self._pool_timeout = float(db_conf_dict.get(dataBaseSection.DB_POOL_TIMEOUT_KEY.value, 30))
+        self._lock = threading.RLock()
+        # a file database is used through a bounded pool, connections
+        # are borrowed per operation instead of kept per thread
+        self._pool = None
+        # an in-memory database lives as long as its single connection
+        self._shared_conn = None
+        self._open = False
+
+    def _new_connection(self):
+        conn = sqlite3.connect(self._path, check_same_thread=False, cached_statements=64)
+        if self._path != self.MEMORY:
+            # readers no longer block behind the writer
+            conn.execute('PRAGMA journal_mode=WAL;')
+            conn.execute('PRAGMA synchronous=NORMAL;')
+            conn.execute('PRAGMA busy_timeout=5000;')
+        return conn
+
+    def connect(self) -> None:
+        '''opens the database and creates the languages table if needed
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        with self._lock:
+            if self._open:
+                return
+            if self._path == self.MEMORY:
+                conn = self._new_connection()
+                with conn:
+                    conn.execute(_CREATE_TABLE)
+                self._shared_conn = conn
+            else:
+                pool = ConnectionPool(self._new_connection,
+                                      min_size=min(self._pool_min_size, self._pool_max_size),
+                                      max_size=self._pool_max_size,
+                                      timeout=self._pool_timeout,
+                                      reset=lambda conn: conn.rollback())
+                pool.open()
+                with pool.connection() as conn, conn:
+                    conn.execute(_CREATE_TABLE)
+                self._pool = pool
+            self._open = True
+        logger.debug('Connected to sqlite database: %s', self._path)
+
+    def close(self) -> None:
+        '''closes every connection with the database
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+            if self._shared_conn is not None:
+                self._shared_conn.close()
+                self._shared_conn = None
+            self._open = False
+
+    def is_open(self) -> bool:
+        '''Returns True if the database is open'''
+        return self._open
+
+    def pool_stats(self) -> dict:
+        '''Returns size information of the connection pool, empty for
+        an in-memory database'''
+        pool = self._pool
+        return pool.stats() if pool is not None else {}
+
+    @contextmanager
+    def _connection(self):
+        '''Yields a connection borrowed from the pool, or the single
+        connection of an in-memory database guarded by a lock'''
+        if not self._open:
+            self.connect()
+        if self._path == self.MEMORY:
+            with self._lock:
+                yield self._shared_conn
+            return
+        with self._pool.connection() as conn:
+            yield conn
+
+    @timed_query('add_language', rows=one_row)
+    def add_language(self, lang_obj: Language) -> int:
+        '''A new table entry will be added for a new language
+
+        Args:
+            lang_obj: object of type Language
+
+        Returns:
+            int: id of the new language
+        '''
+        lang = lang_obj.get_language_name()
+        logger.info('Querying database to insert a new language:%s to a sqlite db', lang)
+        with self._connection() as conn, conn:
+            language_id = conn.execute(_INSERT, (lang,)).lastrowid
+        logger.info('New language:%s successfully added in the Database: %s', lang, language_id)
+        return language_id
+
+    @timed_query('add_languages')
+    def add_languages(self, lang_objs: list) -> list:
+        '''New table entries will be added for every language within a
+        single transaction
+
+        Args:
+            lang_objs: list of objects of type Language
+
+        Returns:
+            list: ids of the new languages, in the order of lang_objs
+        '''
+        logger.info('Querying database to insert %s new languages to a sqlite db', len(lang_objs))
+        with self._connection() as conn, conn:
+            cursor_obj = conn.cursor()
+            lang_ids = [cursor_obj.execute(_INSERT, (lang_obj.get_language_name(),)).lastrowid
+                        for lang_obj in lang_objs]
+        return lang_ids
+
+    @timed_query('update_language', rows=one_row)
+    def update_language(self, lang_obj: Language, new_lang: str) -> None:
+        '''An entry will be updated for the existing language
+
+        Args:
+            lang_obj: object of type Language
+            new_lang: A new language name
+
+        Returns:
+            None
+        '''
+        lang_id = lang_obj.get_lang_id()
+        logger.info('Querying database to update a language with ID:%s with new lang: %s', lang_id, new_lang)
+        with self._connection() as conn, conn:
+            conn.execute(_UPDATE, (new_lang, lang_id))
+
+    @timed_query('update_languages', rows=batch_rows)
+    def update_languages(self, lang_objs: list) -> None:
+        '''Entries will be updated for every given language within a
+        single transaction
+
+        Args:
+            lang_objs: list of objects of type Language with id and new name
+
+        Returns:
+            None
+
+        Exceptions:
+            MissingLanguagesError
+        '''
+        logger.info('Querying database to update %s languages to a sqlite db', len(lang_objs))
+        with self._connection() as conn, conn:
+            cursor_obj = conn.cursor()
+            missing_ids = {lang_obj.get_lang_id() for lang_obj in lang_objs
+                           if not cursor_obj.execute(_UPDATE, (lang_obj.get_language_name(),
+                                                               lang_obj.get_lang_id())).rowcount}
+            if missing_ids:
+                # leaving the with block through an exception rolls back
+                raise MissingLanguagesError(missing_ids)
+
+    @timed_query('delete_language', rows=one_row)
+    def delete_language(self, lang_obj: Language) -> None:
+        '''An entry for the requested language will be deleted
+
+        Args:
+            lang_obj: An object of type Language
+
+        Returns:
+            None
+        '''
+        lang_id = lang_obj.get_lang_id()
+        logger.info('Querying database to delete a language with ID:%s to a sqlite db', lang_id)
+        with self._connection() as conn, conn:
+            conn.execute(_DELETE, (lang_id,))
+
+    @timed_query('delete_languages', rows=batch_rows)
+    def delete_languages(self, lang_objs: list) -> None:
+        '''Entries for every given language will be deleted within a
+        single transaction
+
+        Args:
+            lang_objs: list of objects of type Language
+
+        Returns:
+            None
+
+        Exceptions:
+            MissingLanguagesError
+        '''
+        logger.info('Querying database to delete %s languages to a sqlite db', len(lang_objs))
+        with self._connection() as conn, conn:
+            cursor_obj = conn.cursor()
+            missing_ids = {lang_obj.get_lang_id() for lang_obj in lang_objs
+                           if not cursor_obj.execute(_DELETE, (lang_obj.get_lang_id(),)).rowcount}
+            if missing_ids:
+                raise MissingLanguagesError(missing_ids)
+
+    @timed_query('apply_mutations')
+    def apply_mutations(self, mutations: list) -> list:
+        '''Applies single language writes within one transaction, each
+        one inside its own savepoint so a failing write is rolled back
+        alone while the others still commit
+
+        Args:
+            mutations: list of (operation, Language) pairs, operation
+                being insert, update or delete. An insert keeps the id
+                of its Language when it has one
+
+        Returns:
+            list: per mutation, the new id of an insert, None, or the
+                exception the write failed with
+        '''
+        logger.info('Querying database to apply %s writes to a sqlite db', len(mutations))
+        results = []
+        with self._connection() as conn, conn:
+            cursor_obj = conn.cursor()
+            # sqlite3 does not open a transaction before a SAVEPOINT, whose
+            # release would then commit every write on its own
+            if not conn.in_transaction:
+                cursor_obj.execute('BEGIN;')
+            for operation, lang_obj in mutations:
+                cursor_obj.execute('SAVEPOINT lang_exch_write;')
+                try:
+                    if operation == 'insert' and lang_obj.get_lang_id() is not None:
+                        # an import keeps the ids it was given
+                        result = cursor_obj.execute(_INSERT_WITH_ID, (lang_obj.get_lang_id(),
+                                                                      lang_obj.get_language_name())).lastrowid
+                    elif operation == 'insert':
+                        result = cursor_obj.execute(_INSERT, (lang_obj.get_language_name(),)).lastrowid
+                    elif operation == 'update':
+                        cursor_obj.execute(_UPDATE, (lang_obj.get_language_name(), lang_obj.get_lang_id()))
+                        result = None
+                    elif operation == 'delete':
+                        cursor_obj.execute(_DELETE, (lang_obj.get_lang_id(),))
+                        result = None
+                    else:
+                        raise ValueError(f'Unknown write operation: {operation}')
+                    cursor_obj.execute('RELEASE SAVEPOINT lang_exch_write;')
+                except (sqlite3.DatabaseError, ValueError) as write_err:
+                    cursor_obj.execute('ROLLBACK TO SAVEPOINT lang_exch_write;')
+                    result = write_err
+                results.append(result)
+        return results
+
+    @timed_query('get_language', rows=one_row)
+    def get_language(self, lang_id: int) -> str:
+        '''Returns a language name for a given id or None
+
+        args:
+            lang_id: id of a language whose record is needed
+
+        returns:
+            str
+        '''
+        sampled_logger.debug('Querying database to get language details for ID:%s to a sqlite db', lang_id)
+        with self._connection() as conn:
+            row = conn.execute(_SELECT_ONE, (lang_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    @timed_query('get_languages_by_ids')
+    def get_languages_by_ids(self, lang_ids: list) -> dict:
+        '''Returns the records of many languages, a single query per
+        chunk of ids
+
+        args:
+            lang_ids: ids of the languages whose records are needed
+
+        returns:
+            dict: lang_id -> lang_name, unknown ids being left out
+        '''
+        sampled_logger.debug('Querying database to get details for %s languages from a sqlite db', len(lang_ids))
+        lang_ids = list(lang_ids)
+        id_name_map = {}
+        with self._connection() as conn:
+            for start in range(0, len(lang_ids), _SELECT_MANY_CHUNK):
+                chunk = lang_ids[start:start + _SELECT_MANY_CHUNK]
+                id_name_map.update(conn.execute(_SELECT_MANY.format(', '.join('?' * len(chunk))), chunk))
+        return id_name_map
+
+    @timed_query('get_languages')
+    def get_languages(self, limit: int = None, after_id: int = None) -> dict:
+        '''Returns the language records, all of them or a single page
+        ordered by id when a limit is given
+
+        args:
+            limit: maximum number of records to return
+            after_id: return only records with an id greater than this
+
+        returns:
+            dict: language id to language name
+        '''
+        sampled_logger.debug('Querying database to get details for all languages to a sqlite db')
+        with self._connection() as conn:
+            if limit is None:
+                rows = conn.execute(_SELECT_ALL).fetchall()
+            else:
+                rows = conn.execute(_SELECT_PAGE, (after_id if after_id is not None else -1, limit)).fetchall()
+        return dict(rows)
+
+    def iter_languages(self, itersize: int = None):
+        '''Yields every language record ordered by id, fetching itersize
+        rows at a time
+
+        args:
+            itersize: number of rows fetched at a time
+
+        returns:
+            generator of (lang_id, lang_name) tuples
+        '''
+        itersize = itersize or 2000
+        after_id = -1
+        while True:
+            # keyset pages, so no connection or lock is held between yields
+            page = self.get_languages(limit=itersize, after_id=after_id)
+            yield from page.items()
+            if len(page) < itersize:
+                return
+            after_id = next(reversed(page))
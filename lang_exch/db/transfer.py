@@ -0,0 +1,199 @@
+'''Module for the catalog export and import formats'''
+
+import csv
+import io
+import json
+import queue
+import threading
+
+# format -> content type
+TRANSFER_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+CSV_HEADER = ('lang_id', 'lang_name')
+
+
+class InvalidImportError(Exception):
+    '''Raised when an import is not in the announced format. Nothing of
+    it is applied'''
+
+
+def check_format(fmt: str) -> str:
+    '''Returns fmt if it is a known transfer format
+
+    Exceptions:
+        ValueError
+    '''
+    if fmt not in TRANSFER_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(sorted(TRANSFER_FORMATS))}')
+    return fmt
+
+
+def format_rows(id_name_pairs, fmt: str):
+    '''Yields the encoded lines of an export, the same bytes a COPY of
+    the postgres provider produces
+
+    Args:
+        id_name_pairs: iterable of (lang_id, lang_name) ordered by id
+        fmt: csv or ndjson
+
+    Returns:
+        generator of bytes
+    '''
+    if fmt == 'csv':
+        line = io.StringIO()
+        writer = csv.writer(line, lineterminator='\n')
+        writer.writerow(CSV_HEADER)
+        yield line.getvalue().encode()
+        for lang_id, lang_name in id_name_pairs:
+            line.seek(0)
+            line.truncate()
+            writer.writerow((lang_id, lang_name))
+            yield line.getvalue().encode()
+    else:
+        for lang_id, lang_name in id_name_pairs:
+            yield (json.dumps({'lang_id': lang_id, 'lang_name': lang_name}, ensure_ascii=False)
+                   + '\n').encode()
+
+
+def parse_rows(source, fmt: str):
+    '''Yields the rows of an import read from a binary stream, lang_id
+    being None for languages to insert under a new id
+
+    Args:
+        source: binary file-like object
+        fmt: csv, with a header line, or ndjson
+
+    Returns:
+        generator of (row, lang_id, lang_name), row counting the data
+        rows from 1, neither the csv header nor blank ndjson lines
+
+    Exceptions:
+        InvalidImportError
+    '''
+    lines = io.TextIOWrapper(source, encoding='utf-8', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.reader(lines)
+            next(reader, None)
+            records = ((row[0] if row else '', row[1] if len(row) > 1 else None) for row in reader)
+        else:
+            records = _ndjson_records(lines)
+        for row, (lang_id, lang_name) in enumerate(records, 1):
+            try:
+                lang_id = int(lang_id) if lang_id not in (None, '') else None
+            except (TypeError, ValueError):
+                raise InvalidImportError(f'Row {row}: lang_id must be an integer')
+            yield row, lang_id, lang_name
+    except (UnicodeDecodeError, csv.Error, ValueError) as parse_err:
+        raise InvalidImportError(f'Invalid {fmt} import: {parse_err}') from parse_err
+    finally:
+        # the source belongs to the caller
+        lines.detach()
+
+
+def _ndjson_records(lines):
+    '''Yields the (lang_id, lang_name) of every non blank ndjson line'''
+    for line, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as json_err:
+            raise InvalidImportError(f'Line {line}: {json_err}') from json_err
+        if not isinstance(record, dict):
+            raise InvalidImportError(f'Line {line}: expected an object')
+        yield record.get('lang_id'), record.get('lang_name')
+
+
+def valid_import_name(lang_name) -> bool:
+    '''Returns True if the name, once trimmed, passes the rule of
+    validate_language_name'''
+    return isinstance(lang_name, str) and lang_name.strip().isalpha() and len(lang_name.strip()) <= 20
+
+
+class _QueueWriter:
+    '''File-like object handing what is written to a bounded queue in
+    chunks, blocking the writer while the queue is full'''
+
+    _END = object()
+
+    def __init__(self, chunk_size, max_chunks):
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._abandoned = threading.Event()
+
+    def write(self, data) -> int:
+        self._buffer += data.encode() if isinstance(data, str) else data
+        if len(self._buffer) >= self._chunk_size:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def _put(self, item) -> None:
+        while True:
+            if self._abandoned.is_set():
+                raise BrokenPipeError('Export abandoned by the reader')
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def finish(self, error=None) -> None:
+        '''Flushes what is buffered and marks the end, or the error the
+        export failed with'''
+        try:
+            if error is None and self._buffer:
+                self._put(bytes(self._buffer))
+            self._put((self._END, error))
+        except BrokenPipeError:
+            pass
+
+    def abandon(self) -> None:
+        '''Makes any pending or further write fail'''
+        self._abandoned.set()
+
+    def chunks(self):
+        '''Yields the written chunks until the end is marked'''
+        while True:
+            item = self._queue.get()
+            if isinstance(item, tuple) and item[0] is self._END:
+                if item[1] is not None:
+                    raise item[1]
+                return
+            yield item
+
+
+def stream_export(export, chunk_size=65536, max_chunks=16):
+    '''Runs export(out) in a thread, out being a binary file-like object,
+    and yields what it writes. At most max_chunks chunks of chunk_size
+    bytes are held at once, a slow reader slows the export down. Closing
+    the generator early aborts the export
+
+    Args:
+        export: callable(out) writing the whole export
+        chunk_size: bytes per yielded chunk
+        max_chunks: chunks buffered between the export and the reader
+
+    Returns:
+        generator of bytes
+    '''
+    out = _QueueWriter(chunk_size, max_chunks)
+
+    def run():
+        try:
+            export(out)
+        except BaseException as export_err:
+            out.finish(export_err)
+        else:
+            out.finish()
+
+    thread = threading.Thread(target=run, name='lang-exch-export', daemon=True)
+    thread.start()
+    try:
+        yield from out.chunks()
+    finally:
+        out.abandon()
@@ -0,0 +1,172 @@
+'''Module for group committing concurrent single language writes'''
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.models.language import Language
+
+
+class WriteBatcherStoppedError(Exception):
+    '''Raised when a write is submitted to a stopped batcher'''
+
+
+class WriteTimeoutError(Exception):
+    '''Raised when a write was still queued after the timeout. It got
+    withdrawn, so nothing of it is committed'''
+
+
+class WriteBatcher:
+    '''Collects the single language writes arriving within a short window
+    and hands them to the provider as one batch, committed in a single
+    transaction. Every caller blocks on its own result, and a failing
+    write only fails its own caller'''
+
+    _STOP = object()
+
+    def __init__(self, db, window=0.005, max_batch_size=100, timeout=None):
+        '''Init method
+        Args:
+            db: Database provider implementing apply_mutations
+            window: seconds to wait for more writes after the first one
+                of a batch arrived
+            max_batch_size: a batch is applied as soon as it holds this
+                many writes
+            timeout: seconds a caller waits for its batch to commit
+                after the window, None to wait as long as it takes
+
+        Returns:
+            WriteBatcher()
+        '''
+        self._db = db
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+
+    def start(self) -> None:
+        '''Starts the background thread applying the batches'''
+        with self._lock:
+            self._start()
+
+    def _start(self) -> None:
+        # called with the lock held
+        if self._stopped:
+            raise WriteBatcherStoppedError('The write batcher is stopped')
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='lang-exch-write-batcher',
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        '''Applies the pending writes and stops the background thread.
+        Writes submitted afterwards are rejected'''
+        with self._lock:
+            self._stopped = True
+            thread, self._thread = self._thread, None
+            # queued under the lock, after every write accepted so far
+            if thread is not None:
+                self._queue.put(self._STOP)
+        if thread is not None:
+            thread.join()
+
+    def submit(self, operation: str, lang_obj: Language) -> Future:
+        '''Queues a write without waiting for it
+
+        Args:
+            operation: insert, update or delete
+            lang_obj: object of type Language the write applies to
+
+        Returns:
+            Future: resolved with the result of the write, the new id
+                for an insert, or failed with its exception
+
+        Exceptions:
+            WriteBatcherStoppedError
+        '''
+        future = Future()
+        with self._lock:
+            self._start()
+            self._queue.put((operation, lang_obj, future))
+        return future
+
+    def execute(self, operation: str, lang_obj: Language):
+        '''Queues a write and blocks until its batch is committed. A write
+        not yet applied when the timeout expires is withdrawn, one whose
+        batch is being applied is waited for
+
+        Args:
+            operation: insert, update or delete
+            lang_obj: object of type Language the write applies to
+
+        Returns:
+            result of the write, the new id for an insert
+
+        Exceptions:
+            WriteBatcherStoppedError, WriteTimeoutError
+        '''
+        future = self.submit(operation, lang_obj)
+        timeout = None if self._timeout is None else self._window + self._timeout
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise WriteTimeoutError(f'The {operation} of {lang_obj.get_language_name()} '
+                                        f'was not applied within {timeout} seconds') from None
+        # the batch is already being applied and may commit, its outcome is
+        # awaited so that the caller keeps the catalog in step with it
+        return future.result()
+
+    def _collect(self, first) -> tuple:
+        '''Returns the writes of one batch, starting with first, and
+        whether the batcher got stopped meanwhile'''
+        batch = [first]
+        deadline = time.monotonic() + self._window
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _apply(self, batch: list) -> None:
+        # skips the writes withdrawn by their caller, the others can no
+        # longer be cancelled
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        mutations = [(operation, lang_obj) for operation, lang_obj, _ in batch]
+        try:
+            results = self._db.apply_mutations(mutations)
+        except Exception as batch_err:
+            # the transaction itself failed, nothing got committed
+            logger.error('Failed to apply a batch of %s writes: %s', len(batch), batch_err)
+            for _, _, future in batch:
+                future.set_exception(batch_err)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            first = self._queue.get()
+            if first is self._STOP:
+                return
+            batch, stopped = self._collect(first)
+            logger.debug('Applying a batch of %s writes', len(batch))
+            self._apply(batch)
@@ -0,0 +1,241 @@
+'''Module for in-process metrics exposed in the Prometheus text format'''
+
+import bisect
+import functools
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(label_names, label_values) -> str:
+    if not label_names:
+        return ''
+    pairs = []
+    for name, value in zip(label_names, label_values):
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    '''Base of every metric: a name, help text and label names'''
+
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f'{self.name} expects labels {self.label_names}, got {labels}')
+        return tuple(labels)
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    '''Monotonically increasing value'''
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, *labels) -> None:
+        '''Mirrors a total counted elsewhere since start, e.g. by a
+        collector, which must never decrease'''
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(_Metric):
+    '''Value which can go up and down'''
+
+    kind = 'gauge'
+
+    def set(self, value, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels, amount=1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    '''Distribution of observed values over fixed buckets'''
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self._buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per bucket counts (not cumulative), then the +Inf bucket
+                state = self._values[key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        label_names = self.label_names + ('le',)
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(label_names, label_values + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    '''Holds metrics and renders all of them'''
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        '''Registers a callable run before every render, typically
+        setting gauges from some current state'''
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        '''Returns every metric in the Prometheus text exposition format'''
+        for collector in list(self._collectors):
+            collector()
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'lang_exch_http_request_duration_seconds', 'Time spent handling HTTP requests',
+    ('method', 'route', 'status')))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'lang_exch_http_requests_in_flight', 'HTTP requests currently being handled'))
+QUERY_DURATION = REGISTRY.register(Histogram(
+    'lang_exch_db_query_duration_seconds', 'Time spent executing database operations',
+    ('operation',)))
+QUERY_ROWS = REGISTRY.register(Counter(
+    'lang_exch_db_query_rows_total', 'Rows returned or affected by database operations',
+    ('operation',)))
+QUERY_ERRORS = REGISTRY.register(Counter(
+    'lang_exch_db_query_errors_total', 'Database operations which raised an error',
+    ('operation',)))
+POOL_WAIT = REGISTRY.register(Histogram(
+    'lang_exch_db_pool_wait_seconds', 'Time spent waiting to check out a pooled connection'))
+POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    'lang_exch_db_pool_connections', 'Pooled database connections by state', ('state',)))
+CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    'lang_exch_db_circuit_open', 'Whether the database circuit breaker fails calls fast, 1 when open'))
+CIRCUIT_OPENED = REGISTRY.register(Counter(
+    'lang_exch_db_circuit_opened_total', 'Times the database circuit breaker opened since start'))
+REPLICA_READS = REGISTRY.register(Gauge(
+    'lang_exch_db_replica_reads_in_flight', 'Reads currently running on each read replica', ('replica',)))
+CACHE_EVENTS = REGISTRY.register(Counter(
+    'lang_exch_cache_events_total', 'Read cache lookups and evictions since start', ('event',)))
+ADMISSION_REQUESTS = REGISTRY.register(Gauge(
+    'lang_exch_admission_requests', 'Requests running or waiting for a slot by class',
+    ('route_class', 'state')))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    'lang_exch_admission_rejected_total', 'Requests shed because their class was at its limit',
+    ('route_class',)))
+ADMISSION_DEGRADED = REGISTRY.register(Counter(
+    'lang_exch_admission_degraded_total', 'Reads over the limit answered from the in-memory catalog'))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    'lang_exch_cache_hit_ratio', 'Share of read cache lookups answered from the cache'))
+
+
+def _count_rows(result, args) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple, dict, set)):
+        return len(result)
+    return 1
+
+
+def one_row(result, args) -> int:
+    '''Row count of an operation on a single language'''
+    return 1
+
+
+def batch_rows(result, args) -> int:
+    '''Row count of a batched operation, its first argument being the batch'''
+    return len(args[1])
+
+
+def timed_query(operation: str, rows=_count_rows):
+    '''Decorator recording the duration, row count and errors of a
+    database operation
+
+    Args:
+        operation: value of the operation label
+        rows: callable(result, args) -> int returning the row count,
+            args being the positional arguments of the call
+
+    Returns:
+        decorator
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                QUERY_ERRORS.inc(operation)
+                raise
+            finally:
+                QUERY_DURATION.observe(time.perf_counter() - started, operation)
+            QUERY_ROWS.inc(operation, amount=rows(result, args))
+            return result
+        return wrapper
+    return decorator
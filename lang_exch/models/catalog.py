@@ -0,0 +1,279 @@
+'''Module for the in-memory index of every known language'''
+
+import bisect
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from lang_exch.models.language import normalize_name
+from lang_exch.models.similarity import TrigramIndex
+from lang_exch.models.snapshot import CatalogSnapshot
+from lang_exch.conf.log.lang_exch_logging import logger
+
+
+class LanguageCatalog:
+    '''Bidirectional, thread-safe index of the languages present in the
+    database. Keeps an id -> name map and a normalized name -> id map so
+    that existence and uniqueness checks never scan. The normalized names
+    are also kept in sorted order and in a trigram index, so that prefix
+    and near duplicate searches never scan either'''
+
+    def __init__(self):
+        '''Init method'''
+        self._lock = threading.RLock()
+        self._id_to_name = {}
+        self._name_to_id = {}
+        # keys of _name_to_id in sorted order, for prefix searches
+        self._sorted_names = []
+        # keys of _name_to_id by trigram, for near duplicate searches
+        self._trigram_index = TrigramIndex()
+        # normalized names of in-flight creates/updates
+        self._reserved = set()
+        # bumped on every change of the catalog
+        self._version = 0
+        # xor of the digests of every (id, name) pair; unlike the version
+        # it is identical in every worker holding the same languages
+        self._digest = 0
+        # read-only columnar copy, rebuilt on demand once the version moved
+        self._snapshot = None
+        self._loaded = False
+
+    @staticmethod
+    def _item_digest(lang_id: int, lang_name: str) -> int:
+        digest = hashlib.blake2b(f'{lang_id}:{lang_name}'.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    @property
+    def version(self) -> int:
+        '''Monotonically increasing number of changes seen by the catalog'''
+        return self._version
+
+    def etag(self) -> str:
+        '''Returns a strong entity tag for the whole catalog, derived from
+        its content so that every worker computes the same tag'''
+        with self._lock:
+            return f'{len(self._id_to_name)}-{self._digest:016x}'
+
+    def item_etag(self, lang_id: int):
+        '''Returns a strong entity tag for one language or None'''
+        lang_name = self._id_to_name.get(lang_id)
+        if lang_name is None:
+            return None
+        return f'{lang_id}-{self._item_digest(lang_id, lang_name):016x}'
+
+    @staticmethod
+    def normalize(lang_name: str) -> str:
+        '''Returns the form of a language name used for uniqueness checks'''
+        return normalize_name(lang_name)
+
+    def load(self, id_name_map: dict) -> None:
+        '''Replaces the whole index with the given id -> name map
+
+        Args:
+            id_name_map: dict of language id to language name
+
+        Returns:
+            None
+        '''
+        id_to_name = {}
+        name_to_id = {}
+        digest = 0
+        for lang_id, lang_name in id_name_map.items():
+            lang_name = lang_name.strip()
+            id_to_name[int(lang_id)] = lang_name
+            name_to_id[self.normalize(lang_name)] = int(lang_id)
+            digest ^= self._item_digest(int(lang_id), lang_name)
+        sorted_names = sorted(name_to_id)
+        trigram_index = TrigramIndex()
+        for normalized in sorted_names:
+            trigram_index.add(normalized)
+        with self._lock:
+            self._id_to_name = id_to_name
+            self._name_to_id = name_to_id
+            self._sorted_names = sorted_names
+            self._trigram_index = trigram_index
+            self._digest = digest
+            self._version += 1
+            self._loaded = True
+        logger.info('Language catalog loaded with %s languages', len(id_to_name))
+
+    def is_loaded(self) -> bool:
+        '''Returns True once the catalog got loaded from the database'''
+        return self._loaded
+
+    def has_id(self, lang_id: int) -> bool:
+        '''Returns True if a language exists with the given id'''
+        return lang_id in self._id_to_name
+
+    def has_name(self, lang_name: str) -> bool:
+        '''Returns True if a language exists, or is being written, with
+        the given name'''
+        normalized = self.normalize(lang_name)
+        return normalized in self._name_to_id or normalized in self._reserved
+
+    def get_name(self, lang_id: int):
+        '''Returns the language name for a given id or None'''
+        return self._id_to_name.get(lang_id)
+
+    def get_id(self, lang_name: str):
+        '''Returns the language id for a given name or None'''
+        return self._name_to_id.get(self.normalize(lang_name))
+
+    def search(self, prefix: str, limit: int = 10) -> list:
+        '''Returns the languages whose name starts with prefix, ignoring
+        case, in name order. Costs a binary search plus the matches
+
+        Args:
+            prefix: beginning of the language names
+            limit: maximum number of languages to return
+
+        Returns:
+            list: (lang_id, lang_name) tuples
+        '''
+        prefix = self.normalize(prefix)
+        matches = []
+        with self._lock:
+            start = bisect.bisect_left(self._sorted_names, prefix)
+            for normalized in self._sorted_names[start:start + limit]:
+                if not normalized.startswith(prefix):
+                    break
+                lang_id = self._name_to_id[normalized]
+                matches.append((lang_id, self._id_to_name[lang_id]))
+        return matches
+
+    def similar(self, lang_name: str, max_distance: int = 2, limit: int = 5, exclude_id: int = None) -> list:
+        '''Returns the languages whose name is within max_distance edits
+        of lang_name, ignoring case, closest first
+
+        Args:
+            lang_name: name to compare
+            max_distance: largest edit distance to report
+            limit: maximum number of languages to return
+            exclude_id: id of a language left out of the result, e.g.
+                the one being renamed
+
+        Returns:
+            list: (lang_id, lang_name, distance) tuples
+        '''
+        matches = []
+        with self._lock:
+            for distance, normalized in self._trigram_index.similar(
+                    self.normalize(lang_name), max_distance, limit + 1):
+                lang_id = self._name_to_id[normalized]
+                if lang_id != exclude_id:
+                    matches.append((lang_id, self._id_to_name[lang_id], distance))
+        return matches[:limit]
+
+    def _index_name(self, normalized: str, lang_id: int) -> None:
+        '''Maps a normalized name to its language, lock held by the caller'''
+        if normalized not in self._name_to_id:
+            bisect.insort(self._sorted_names, normalized)
+            self._trigram_index.add(normalized)
+        self._name_to_id[normalized] = lang_id
+
+    def _unindex_name(self, normalized: str, lang_id: int) -> None:
+        '''Drops a normalized name if it still maps to lang_id, lock held
+        by the caller'''
+        if self._name_to_id.get(normalized) != lang_id:
+            return
+        del self._name_to_id[normalized]
+        position = bisect.bisect_left(self._sorted_names, normalized)
+        del self._sorted_names[position]
+        self._trigram_index.remove(normalized)
+
+    @contextmanager
+    def reserve(self, lang_name: str, lang_id: int = None):
+        '''Atomically checks that lang_name is free and holds it until the
+        with block exits, so concurrent writers can not both claim it.
+        A name already owned by lang_id counts as free.
+
+        Args:
+            lang_name: name about to be written
+            lang_id: id of the language being renamed, if any
+
+        Returns:
+            bool: True if the name was reserved
+        '''
+        with self.reserve_many([lang_name], [lang_id]) as reserved:
+            yield reserved[0]
+
+    @contextmanager
+    def reserve_many(self, lang_names: list, lang_ids: list = None):
+        '''Same as reserve() for several names at once. A name repeated
+        within lang_names is only reserved for its first occurrence
+
+        Args:
+            lang_names: names about to be written
+            lang_ids: ids of the languages being renamed, parallel to
+                lang_names, if any
+
+        Returns:
+            list: one bool per name, True if it was reserved
+        '''
+        reserved = []
+        claimed = []
+        lang_ids = lang_ids or [None] * len(lang_names)
+        with self._lock:
+            for lang_name, lang_id in zip(lang_names, lang_ids):
+                normalized = self.normalize(lang_name)
+                owner = self._name_to_id.get(normalized)
+                is_free = normalized not in self._reserved and \
+                    (owner is None or (lang_id is not None and owner == lang_id))
+                if is_free:
+                    self._reserved.add(normalized)
+                    claimed.append(normalized)
+                reserved.append(is_free)
+        try:
+            yield reserved
+        finally:
+            if claimed:
+                with self._lock:
+                    self._reserved.difference_update(claimed)
+
+    def add(self, lang_id: int, lang_name: str) -> None:
+        '''Adds a language to the index'''
+        self.update(lang_id, lang_name)
+
+    def update(self, lang_id: int, lang_name: str) -> None:
+        '''Sets the name of a language, adding it if needed'''
+        lang_name = lang_name.strip()
+        with self._lock:
+            old_name = self._id_to_name.get(lang_id)
+            if old_name == lang_name:
+                return
+            if old_name is not None:
+                self._digest ^= self._item_digest(lang_id, old_name)
+                self._unindex_name(self.normalize(old_name), lang_id)
+            self._id_to_name[lang_id] = lang_name
+            self._index_name(self.normalize(lang_name), lang_id)
+            self._digest ^= self._item_digest(lang_id, lang_name)
+            self._version += 1
+
+    def remove(self, lang_id: int) -> None:
+        '''Removes a language from the index, if present'''
+        with self._lock:
+            old_name = self._id_to_name.pop(lang_id, None)
+            if old_name is None:
+                return
+            self._digest ^= self._item_digest(lang_id, old_name)
+            self._unindex_name(self.normalize(old_name), lang_id)
+            self._version += 1
+
+    def snapshot(self) -> CatalogSnapshot:
+        '''Returns a compact read-only copy of the catalog, ordered by id.
+        The copy is shared until the catalog changes'''
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+        with self._lock:
+            snapshot = CatalogSnapshot(self._id_to_name.items(), self._version)
+        self._snapshot = snapshot
+        return snapshot
+
+    def items(self) -> list:
+        '''Returns a consistent list of (lang_id, lang_name) pairs'''
+        with self._lock:
+            return list(self._id_to_name.items())
+
+    def __len__(self):
+        return len(self._id_to_name)
@@ -4,13 +4,38 @@
 from lang_exch.conf.log.lang_exch_logging import logger
 
 
+def normalize_name(lang_name: str) -> str:
+    '''Returns the form of a language name used for uniqueness checks'''
+    return lang_name.strip().casefold()
+
+
 class Language:
-    '''Represent a single language'''
+    '''Represent a single language. Instances are immutable and carry no
+    per-instance __dict__'''
+
+    __slots__ = ('_lang_id', '_lang_name')
 
     def __init__(self, lang_name=None, lang_id=None):
         '''Init method'''
-        self._lang_id = lang_id
-        self._lang_name = lang_name
+        object.__setattr__(self, '_lang_id', lang_id)
+        object.__setattr__(self, '_lang_name', lang_name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __eq__(self, other):
+        if not isinstance(other, Language):
+            return NotImplemented
+        return (self._lang_id, self._lang_name) == (other._lang_id, other._lang_name)
+
+    def __hash__(self):
+        return hash((self._lang_id, self._lang_name))
+
+    def __repr__(self):
+        return f'Language(lang_name={self._lang_name!r}, lang_id={self._lang_id!r})'
 
     def get_language_name(self):
         '''returns language name'''
@@ -0,0 +1,94 @@
+'''Module for finding the language names close to a given one'''
+
+from collections import Counter, defaultdict
+from itertools import chain
+
+
+def trigrams(name: str) -> set:
+    '''Returns the distinct trigrams of a name padded on both ends'''
+    padded = f'  {name}  '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def levenshtein(first: str, second: str, max_distance: int) -> int:
+    '''Returns the edit distance between two strings, or max_distance + 1
+    as soon as it is known to exceed max_distance
+
+    Args:
+        first: a string
+        second: another string
+        max_distance: largest distance of interest
+
+    Returns:
+        int
+    '''
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    if len(first) > len(second):
+        first, second = second, first
+    previous = list(range(len(first) + 1))
+    for row, second_char in enumerate(second, 1):
+        current = [row]
+        for column, first_char in enumerate(first, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1,
+                               previous[column - 1] + (first_char != second_char)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class TrigramIndex:
+    '''Inverted index of trigram -> names. Only names sharing enough
+    trigrams with the query are compared by edit distance, as every edit
+    changes at most three trigrams. Not thread-safe, the owner locks'''
+
+    def __init__(self):
+        '''Init method'''
+        self._postings = defaultdict(set)
+
+    def add(self, name: str) -> None:
+        '''Indexes a name'''
+        for trigram in trigrams(name):
+            self._postings[trigram].add(name)
+
+    def remove(self, name: str) -> None:
+        '''Drops a name from the index'''
+        for trigram in trigrams(name):
+            posting = self._postings.get(trigram)
+            if posting is not None:
+                posting.discard(name)
+                if not posting:
+                    del self._postings[trigram]
+
+    def clear(self) -> None:
+        '''Drops every name'''
+        self._postings = defaultdict(set)
+
+    def similar(self, name: str, max_distance: int, limit: int) -> list:
+        '''Returns the indexed names within max_distance edits of name,
+        closest first. Names sharing no trigram with it are never
+        returned
+
+        Args:
+            name: name to compare
+            max_distance: largest edit distance to report
+            limit: maximum number of names to return
+
+        Returns:
+            list: (distance, name) tuples
+        '''
+        query = trigrams(name)
+        shared = Counter(chain.from_iterable(self._postings.get(trigram, ()) for trigram in query))
+        # q-gram lemma, the bound is at least one shared trigram
+        min_shared = max(len(query) - 3 * max_distance, 1)
+        min_length, max_length = len(name) - max_distance, len(name) + max_distance
+        matches = []
+        for candidate, count in shared.items():
+            if count < min_shared or not min_length <= len(candidate) <= max_length:
+                continue
+            distance = levenshtein(name, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, candidate))
+        matches.sort()
+        return matches[:limit]
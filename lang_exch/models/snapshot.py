@@ -0,0 +1,72 @@
+'''Module for a compact, read-only copy of the language catalog'''
+
+import bisect
+from array import array
+
+
+class CatalogSnapshot:
+    '''Read-only, columnar copy of the languages ordered by id. Ids live in
+    a typed array and names in one contiguous utf-8 buffer, sliced by an
+    array of offsets, so a language costs a few bytes plus its name
+    instead of two boxed objects and their dict entries'''
+
+    __slots__ = ('_ids', '_offsets', '_names', 'version')
+
+    def __init__(self, id_name_pairs, version=None):
+        '''Init method
+        Args:
+            id_name_pairs: iterable of (lang_id, lang_name) in any order
+            version: version of the catalog the snapshot was taken from
+
+        Returns:
+            CatalogSnapshot()
+        '''
+        ids = array('q')
+        offsets = array('Q', [0])
+        names = bytearray()
+        for lang_id, lang_name in sorted(id_name_pairs):
+            ids.append(lang_id)
+            names += lang_name.encode('utf-8')
+            offsets.append(len(names))
+        self._ids = ids
+        self._offsets = offsets
+        self._names = bytes(names)
+        self.version = version
+
+    def _name_at(self, index: int) -> str:
+        return self._names[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+    def get_name(self, lang_id: int):
+        '''Returns the language name for a given id or None, by a binary
+        search over the ids'''
+        index = bisect.bisect_left(self._ids, lang_id)
+        if index == len(self._ids) or self._ids[index] != lang_id:
+            return None
+        return self._name_at(index)
+
+    def __contains__(self, lang_id) -> bool:
+        index = bisect.bisect_left(self._ids, lang_id)
+        return index < len(self._ids) and self._ids[index] == lang_id
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        '''Yields (lang_id, lang_name) ordered by id'''
+        names = memoryview(self._names)
+        offsets = self._offsets
+        for index, lang_id in enumerate(self._ids):
+            yield lang_id, str(names[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def page(self, after_id: int = None, limit: int = 1000) -> list:
+        '''Returns at most limit (lang_id, lang_name) pairs ordered by id,
+        starting after after_id'''
+        start = 0 if after_id is None else bisect.bisect_right(self._ids, after_id)
+        stop = min(start + limit, len(self._ids))
+        return [(self._ids[index], self._name_at(index)) for index in range(start, stop)]
+
+    @property
+    def nbytes(self) -> int:
+        '''Size of the buffers holding the languages'''
+        return (self._ids.itemsize * len(self._ids) + self._offsets.itemsize * len(self._offsets)
+                + len(self._names))
@@ -0,0 +1,90 @@
+'''Module for bounding the number of requests a worker handles at once'''
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AdmissionRejectedError(Exception):
+    '''Raised when a request can neither run nor wait for a slot'''
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'Too many {name} requests, retry after {retry_after} seconds')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    '''Lets at most max_concurrent requests of a class run at once. Up to
+    max_queue more wait, each for at most queue_timeout seconds, anything
+    beyond is rejected right away instead of piling up behind a slow
+    database'''
+
+    def __init__(self, name, max_concurrent, max_queue=0, queue_timeout=0.1, retry_after=1):
+        '''Init method
+        Args:
+            name: class of requests, e.g. read or write
+            max_concurrent: requests allowed to run at once
+            max_queue: requests allowed to wait for a slot
+            queue_timeout: seconds a request waits for a slot
+            retry_after: seconds suggested to rejected clients
+
+        Returns:
+            AdmissionController()
+        '''
+        self.name = name
+        self._max_concurrent = max_concurrent
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._retry_after = retry_after
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting = 0
+        self._rejected = 0
+
+    def acquire(self) -> None:
+        '''Takes a slot, waiting in the bounded queue if needed
+
+        Exceptions:
+            AdmissionRejectedError
+        '''
+        with self._condition:
+            if self._running < self._max_concurrent:
+                self._running += 1
+                return
+            if self._waiting >= self._max_queue:
+                self._rejected += 1
+                raise AdmissionRejectedError(self.name, self._retry_after)
+            self._waiting += 1
+            deadline = time.monotonic() + self._queue_timeout
+            try:
+                while self._running >= self._max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._rejected += 1
+                        raise AdmissionRejectedError(self.name, self._retry_after)
+                    self._condition.wait(remaining)
+                self._running += 1
+            finally:
+                self._waiting -= 1
+
+    def release(self) -> None:
+        '''Gives a slot back'''
+        with self._condition:
+            self._running -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def admit(self):
+        '''Holds a slot for the duration of the with block'''
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        '''Returns the running, waiting and rejected request counts'''
+        with self._condition:
+            return {'running': self._running, 'waiting': self._waiting, 'rejected': self._rejected,
+                    'max_concurrent': self._max_concurrent, 'max_queue': self._max_queue}
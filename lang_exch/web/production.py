@@ -0,0 +1,105 @@
+'''Module for serving the Flask application with gunicorn worker processes'''
+
+import multiprocessing
+
+from gunicorn.app.base import BaseApplication
+
+from lang_exch.setup.setup import config
+from lang_exch.const import serverSection, confSection
+from lang_exch.conf.log.lang_exch_logging import logger
+
+
+def server_options() -> dict:
+    '''Returns the gunicorn settings derived from the server section of
+    the configuration
+
+    Args:
+        None
+
+    Returns:
+        dict: gunicorn setting name to value
+    '''
+    server_section = confSection.SERVER_SECTION.value
+    workers = config.getint(server_section, serverSection.SERVER_WORKERS_KEY.value, fallback=0)
+    threads = config.getint(server_section, serverSection.SERVER_THREADS_KEY.value, fallback=4)
+    return {
+        'bind': f'{config[server_section][serverSection.SERVER_IP_KEY.value]}:'
+                f'{config[server_section][serverSection.SERVER_PORT_KEY.value]}',
+        'workers': workers or multiprocessing.cpu_count(),
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'max_requests': config.getint(server_section, serverSection.SERVER_MAX_REQUESTS_KEY.value,
+                                      fallback=10000),
+        'max_requests_jitter': config.getint(server_section,
+                                             serverSection.SERVER_MAX_REQUESTS_JITTER_KEY.value,
+                                             fallback=1000),
+        'timeout': config.getint(server_section, serverSection.SERVER_TIMEOUT_KEY.value, fallback=30),
+        'graceful_timeout': config.getint(server_section, serverSection.SERVER_GRACEFUL_TIMEOUT_KEY.value,
+                                          fallback=30),
+        # every worker imports the application itself, so connection
+        # pools, listener threads and the catalog are never shared
+        # across a fork
+        'preload_app': False,
+        'post_worker_init': warm_worker,
+        'worker_exit': close_worker,
+    }
+
+
+def warm_worker(worker) -> None:
+    '''Opens the connection pool and loads the catalog before the worker
+    accepts its first connection. A failure must not fail the boot, the
+    arbiter would halt on it, the first request loads the catalog instead'''
+    import server
+    try:
+        server.load_catalog()
+    except Exception as load_err:
+        logger.error('Worker %s could not load the catalog, deferring it to the first request: %s',
+                     worker.pid, load_err)
+        return
+    logger.info('Worker %s warmed with %s languages', worker.pid, len(server.language_catalog))
+
+
+def close_worker(arbiter, worker) -> None:
+    '''Flushes the batched writes and closes the connections of an exiting
+    worker, once its in-flight requests drained'''
+    from lang_exch.db.db_manager import DatabaseManager
+    try:
+        # a worker which never connected has nothing to close
+        DatabaseManager(connect=False).close()
+    except Exception as close_err:
+        logger.error('Worker %s failed to close its database: %s', worker.pid, close_err)
+
+
+class ProductionApplication(BaseApplication):
+    '''Runs the Flask application in gunicorn worker processes of several
+    threads each. gunicorn reloads workers gracefully on SIGHUP, drains
+    in-flight requests for graceful_timeout on SIGTERM, and replaces a
+    worker after max_requests'''
+
+    def __init__(self, options: dict = None):
+        '''Init method
+        Args:
+            options: gunicorn settings, server_options() by default
+
+        Returns:
+            ProductionApplication()
+        '''
+        self.options = options if options is not None else server_options()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from server import app
+        return app
+
+
+def run(options: dict = None) -> None:
+    '''Serves the application until the gunicorn master is stopped'''
+    options = options if options is not None else server_options()
+    logger.info('Starting %s workers of %s threads on %s', options['workers'], options['threads'],
+                options['bind'])
+    ProductionApplication(options).run()
@@ -0,0 +1,124 @@
+'''Module for encoding JSON responses and caching the encoded bytes'''
+
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+from lang_exch.conf.log.lang_exch_logging import logger
+
+
+def _stdlib_dumps(payload) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def get_encoder(name: str = 'auto'):
+    '''Returns a callable encoding a payload to JSON bytes
+
+    Args:
+        name: one of auto, orjson, ujson or json. auto picks the fastest
+            installed encoder and falls back to the standard library
+
+    Returns:
+        callable(payload) -> bytes
+    '''
+    candidates = ('orjson', 'ujson') if name == 'auto' else (name,)
+    for candidate in candidates:
+        if candidate == 'orjson':
+            try:
+                import orjson
+            except ImportError:
+                continue
+            logger.info('Encoding JSON responses with orjson')
+            return orjson.dumps
+        if candidate == 'ujson':
+            try:
+                import ujson
+            except ImportError:
+                continue
+            logger.info('Encoding JSON responses with ujson')
+            return lambda payload: ujson.dumps(payload, ensure_ascii=False).encode('utf-8')
+    if name not in ('auto', 'json'):
+        logger.warning('JSON encoder %s is not installed, falling back to json', name)
+    return _stdlib_dumps
+
+
+class ResponseCache:
+    '''Keeps encoded response bodies, plain and gzipped, for a version of
+    the catalog. An entry encoded for an older version is never served'''
+
+    def __init__(self, encoder, max_entries=1024, gzip_min_size=1024, gzip_level=6):
+        '''Init method
+        Args:
+            encoder: callable(payload) -> bytes
+            max_entries: number of bodies kept, least recently used
+                entries are dropped first
+            gzip_min_size: bodies smaller than this are never compressed
+            gzip_level: compression level used for large bodies
+
+        Returns:
+            ResponseCache()
+        '''
+        self._encoder = encoder
+        self._max_entries = max_entries
+        self._gzip_min_size = gzip_min_size
+        self._gzip_level = gzip_level
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, payload) -> bytes:
+        '''Encodes a payload without caching it'''
+        return self._encoder(payload)
+
+    def _get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key, version, body: bytes) -> dict:
+        entry = {'version': version, 'body': body, 'gzip': None}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def response(self, build_payload, status_code, key=None, version=None, headers=None) -> Response:
+        '''Creates a JSON response, reusing the encoded bytes of a previous
+        call with the same key and version, and gzipping large bodies when
+        the client accepts it
+
+        Args:
+            build_payload: callable returning the payload, only called
+                on a cache miss
+            status_code: HTTP status code
+            key: cache key, the body is not cached when None
+            version: version of the data the payload is built from
+            headers: extra response headers
+
+        Returns:
+            Response
+        '''
+        entry = self._get(key, version) if key is not None else None
+        if entry is None:
+            body = self._encoder(build_payload())
+            entry = self._put(key, version, body) if key is not None else \
+                {'version': version, 'body': body, 'gzip': None}
+
+        headers = dict(headers or {})
+        body = entry['body']
+        if len(body) >= self._gzip_min_size:
+            headers['Vary'] = 'Accept-Encoding'
+            if 'gzip' in request.accept_encodings:
+                if entry['gzip'] is None:
+                    # racing threads may both compress, either result is valid
+                    entry['gzip'] = gzip.compress(body, self._gzip_level)
+                body = entry['gzip']
+                headers['Content-Encoding'] = 'gzip'
+        return Response(body, status=status_code, headers=headers, mimetype='application/json')
@@ -1,16 +1,243 @@
 '''Server module responsible for entertaining the requests'''
 
 import json
+import threading
+import time
 from http import HTTPStatus
-from flask import Flask, request
+from flask import Flask, Response, g, request, stream_with_context
+from werkzeug.http import quote_etag
 
 from lang_exch.setup.setup import config
-from lang_exch.db.db_manager import DatabaseManager
-from lang_exch.const import serverSection, confSection
-from lang_exch.conf.log.lang_exch_logging import logger
+from lang_exch.db.circuit_breaker import CircuitOpenError
+from lang_exch.db.connection_pool import PoolTimeoutError
+from lang_exch.db.database import MissingLanguagesError
+from lang_exch.db.db_manager import DatabaseManager, InvalidLanguageError, validate_language_name
+from lang_exch.db.transfer import TRANSFER_FORMATS, InvalidImportError, check_format, stream_export
+from lang_exch.db.write_batcher import WriteTimeoutError
+from lang_exch.models.catalog import LanguageCatalog
+from lang_exch.models.language import normalize_name
+from lang_exch.models.similarity import TrigramIndex
+from lang_exch.web.admission import AdmissionController, AdmissionRejectedError
+from lang_exch.web.serialization import ResponseCache, get_encoder
+from lang_exch import metrics
+from lang_exch.const import catalogSection, serverSection, confSection
+from lang_exch.conf.log.lang_exch_logging import logger, sampled_logger
 
 app = Flask(__name__)
-existing_language = {"1": "Gujarati", "9": "Gujarati"}
+MAX_PAGE_SIZE = 1000
+MAX_SEARCH_LIMIT = 100
+MAX_IMPORT_REPORT = 1000
+MAX_LOOKUP_IDS = 1000
+MAX_LANG_ID = 2 ** 31 - 1
+IMPORT_CONTENT_TYPES = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson'}
+FUZZY_DUPLICATE_GUARD = config.getboolean(confSection.CATALOG_SECTION.value,
+                                          catalogSection.CATALOG_FUZZY_GUARD_KEY.value, fallback=False)
+MAX_EDIT_DISTANCE = config.getint(confSection.CATALOG_SECTION.value,
+                                  catalogSection.CATALOG_MAX_DISTANCE_KEY.value, fallback=1)
+SIMILAR_LIMIT = config.getint(confSection.CATALOG_SECTION.value,
+                              catalogSection.CATALOG_SIMILAR_LIMIT_KEY.value, fallback=5)
+language_catalog = LanguageCatalog()
+response_cache = ResponseCache(
+    get_encoder(config.get(confSection.SERVER_SECTION.value,
+                           serverSection.SERVER_JSON_ENCODER_KEY.value, fallback='auto')),
+    max_entries=config.getint(confSection.SERVER_SECTION.value,
+                              serverSection.SERVER_RESPONSE_CACHE_SIZE_KEY.value, fallback=1024),
+    gzip_min_size=config.getint(confSection.SERVER_SECTION.value,
+                                serverSection.SERVER_GZIP_MIN_SIZE_KEY.value, fallback=1024))
+
+_server_section = confSection.SERVER_SECTION.value
+RETRY_AFTER = config.getint(_server_section, serverSection.SERVER_RETRY_AFTER_KEY.value, fallback=1)
+admission_controllers = {
+    route_class: AdmissionController(
+        route_class,
+        config.getint(_server_section, concurrency_key.value, fallback=concurrency),
+        max_queue=config.getint(_server_section, queue_key.value, fallback=queue_size),
+        queue_timeout=config.getfloat(_server_section, serverSection.SERVER_QUEUE_TIMEOUT_KEY.value,
+                                      fallback=100) / 1000.0,
+        retry_after=RETRY_AFTER)
+    for route_class, concurrency_key, concurrency, queue_key, queue_size in (
+        ('read', serverSection.SERVER_READ_CONCURRENCY_KEY, 64, serverSection.SERVER_READ_QUEUE_KEY, 128),
+        ('write', serverSection.SERVER_WRITE_CONCURRENCY_KEY, 16, serverSection.SERVER_WRITE_QUEUE_KEY, 32))}
+SERVE_READS_FROM_CATALOG = config.getboolean(_server_section, serverSection.SERVER_DEGRADED_READS_KEY.value,
+                                             fallback=True)
+# answered from memory only, these never wait on the database
+UNLIMITED_ENDPOINTS = {'search_languages', 'get_similar_languages', 'get_cache_stats', 'get_metrics',
+                       'get_health'}
+# reads sent as a POST, their body being too long for a query string
+POST_READ_ENDPOINTS = {'lookup_many_languages'}
+# reads able to fall back to the in-memory catalog when over the limit
+CATALOG_READ_ENDPOINTS = {'get_a_language', 'get_languages', 'lookup_many_languages'}
+
+@app.before_request
+def start_request_timer() -> None:
+    '''Counts the request as in flight and starts timing it'''
+    g.request_started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+
+@app.before_request
+def admit_request():
+    '''Takes a read or write slot for the request, or sheds it with a 503
+    and Retry-After once the slots and the wait queue of its class are
+    full. Reads over the limit are answered from the catalog instead when
+    configured so'''
+    if request.endpoint is None or request.endpoint in UNLIMITED_ENDPOINTS:
+        return None
+    route_class = 'read' if request.method in ('GET', 'HEAD') or request.endpoint in POST_READ_ENDPOINTS \
+        else 'write'
+    controller = admission_controllers[route_class]
+    try:
+        controller.acquire()
+    except AdmissionRejectedError as admission_err:
+        metrics.ADMISSION_REJECTED.inc(route_class)
+        if route_class == 'read' and SERVE_READS_FROM_CATALOG and \
+                request.endpoint in CATALOG_READ_ENDPOINTS and language_catalog.is_loaded():
+            metrics.ADMISSION_DEGRADED.inc()
+            g.serve_from_catalog = True
+            return None
+        logger.warning('Shedding request %s %s: %s', request.method, request.path, admission_err)
+        message, status_code = error_response(str(admission_err), HTTPStatus.SERVICE_UNAVAILABLE)
+        return message, status_code, {'Retry-After': str(admission_err.retry_after)}
+    g.admission_controller = controller
+    return None
+
+@app.after_request
+def record_status(response: Response) -> Response:
+    '''Remembers the status code for the request duration metric'''
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def stop_request_timer(exc=None) -> None:
+    '''Records the request duration per route, method and status'''
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    metrics.REQUESTS_IN_FLIGHT.dec()
+    # the rule keeps the label set small, e.g. /languages/<int:lang_id>
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = g.pop('response_status', HTTPStatus.INTERNAL_SERVER_ERROR.value)
+    metrics.REQUEST_DURATION.observe(time.perf_counter() - started, request.method, route, status)
+
+@app.teardown_request
+def release_admission(exc=None) -> None:
+    '''Gives the slot taken by admit_request back'''
+    controller = g.pop('admission_controller', None)
+    if controller is not None:
+        controller.release()
+
+def collect_db_metrics() -> None:
+    '''Sets the pool and cache gauges from their current counters'''
+    # a scrape must not connect, the pool gauges are left out until a request did
+    _db_manager = DatabaseManager(connect=False)
+    pool_stats = _db_manager.pool_stats()
+    for state in ('size', 'idle', 'in_use'):
+        if state in pool_stats:
+            metrics.POOL_CONNECTIONS.set(pool_stats[state], state)
+    cache_stats = _db_manager.cache_stats()
+    for event in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+        if event in cache_stats:
+            metrics.CACHE_EVENTS.set(cache_stats[event], event)
+    if 'hit_ratio' in cache_stats:
+        metrics.CACHE_HIT_RATIO.set(cache_stats['hit_ratio'])
+    circuit_stats = _db_manager.circuit_stats()
+    if circuit_stats:
+        metrics.CIRCUIT_OPEN.set(int(circuit_stats['state'] == 'open'))
+        metrics.CIRCUIT_OPENED.set(circuit_stats['times_opened'])
+    for replica in _db_manager.replica_stats():
+        metrics.REPLICA_READS.set(replica['outstanding'], f"{replica['host']}:{replica['port']}")
+
+metrics.REGISTRY.add_collector(collect_db_metrics)
+
+def collect_admission_metrics() -> None:
+    '''Sets the admission gauges from the current slot usage'''
+    for route_class, controller in admission_controllers.items():
+        stats = controller.stats()
+        for state in ('running', 'waiting'):
+            metrics.ADMISSION_REQUESTS.set(stats[state], route_class, state)
+
+metrics.REGISTRY.add_collector(collect_admission_metrics)
+
+@app.errorhandler(CircuitOpenError)
+def database_unavailable(circuit_err: CircuitOpenError):
+    '''Answers a 503 with Retry-After while the database circuit is open,
+    instead of letting the request wait on a failing database'''
+    logger.warning('Failing request %s %s fast: %s', request.method, request.path, circuit_err)
+    message, status_code = error_response('Database temporarily unavailable', HTTPStatus.SERVICE_UNAVAILABLE)
+    # whole seconds, at least one
+    return message, status_code, {'Retry-After': str(max(int(circuit_err.retry_after + 0.999), 1))}
+
+@app.errorhandler(PoolTimeoutError)
+def database_busy(pool_err: PoolTimeoutError):
+    '''Answers a 503 when no database connection freed up in time'''
+    logger.warning('No database connection for %s %s: %s', request.method, request.path, pool_err)
+    message, status_code = error_response('Database busy', HTTPStatus.SERVICE_UNAVAILABLE)
+    return message, status_code, {'Retry-After': str(RETRY_AFTER)}
+
+@app.errorhandler(WriteTimeoutError)
+def write_timed_out(write_err: WriteTimeoutError):
+    '''Answers a 503 when a write was withdrawn unapplied after waiting
+    too long in the batch queue, so it is safe to retry'''
+    logger.warning('Write of %s %s timed out: %s', request.method, request.path, write_err)
+    message, status_code = error_response('Database busy', HTTPStatus.SERVICE_UNAVAILABLE)
+    return message, status_code, {'Retry-After': str(RETRY_AFTER)}
+
+_catalog_load_lock = threading.Lock()
+
+@app.before_first_request
+def load_catalog() -> None:
+    '''Hydrates the in-memory language catalog from the database in bulk.
+    A no-op once loaded, e.g. by a production worker before serving
+
+    Args:
+        None
+
+    Returns:
+        None
+    '''
+    with _catalog_load_lock:
+        if language_catalog.is_loaded():
+            return
+        _db_manager = DatabaseManager()
+        language_catalog.load(_db_manager.get_languages(use_primary=True) or {})
+        # the listener reloads the catalog once LISTEN ran, so the changes
+        # committed between this load and LISTEN are not lost
+        _db_manager.listen_for_changes(apply_catalog_change, reload_catalog)
+
+def reload_catalog() -> None:
+    '''Reloads the whole catalog, used when change events may have been lost'''
+    logger.info('Reloading language catalog from the database')
+    language_catalog.load(DatabaseManager().get_languages(use_primary=True) or {})
+
+def apply_catalog_change(event: dict) -> None:
+    '''Applies a change committed by another worker process to the
+    in-memory catalog
+
+    Args:
+        event: dict with keys op, lang_id and lang_name
+
+    Returns:
+        None
+    '''
+    logger.info('Applying catalog change from another process: %s', event)
+    operation = event.get('op')
+    if operation in ('insert', 'update'):
+        language_catalog.update(int(event['lang_id']), event['lang_name'])
+    elif operation == 'delete':
+        language_catalog.remove(int(event['lang_id']))
+    else:
+        reload_catalog()
+
+
+def client_key() -> str:
+    '''
+    Returns the key identifying the client of the current request, its
+    X-Client-Id header or else its address. A client reads from the
+    primary database for a while after its own writes
+
+    Returns:
+        str
+    '''
+    return request.headers.get('X-Client-Id') or request.remote_addr
 
 def success_response(status_code=None, lang_id=None, lang_name=None, lang_obj=None) -> (dict, int):
     '''
@@ -33,21 +260,82 @@ def success_response(status_code=None, lang_id=None, lang_name=None, lang_obj=No
         message['data'] = lang_obj
     return message, status_code
 
-def error_response(error_string=None, status_code=None) -> (dict, str):
+def error_response(error_string=None, status_code=None, data='') -> (dict, str):
     '''
     Creates an error response with message and status_code
 
     Args:
         error_string: error which got generated
         status_code: HTTP status code
+        data: optional details, e.g. a per-item report of a batch
 
     Returns:
         message: dict: A dictionary formed of error response with language details,
         status_code: HTTP staus code
     '''
-    message = {"error": error_string, "data": ''}
+    message = {"error": error_string, "data": data}
     return message, status_code
 
+def similar_languages(lang_name: str, exclude_id: int = None, max_distance: int = None) -> list:
+    '''
+    Returns the known languages close to lang_name, closest first
+
+    Args:
+        lang_name: name to compare
+        exclude_id: id of a language left out, e.g. the one being renamed
+        max_distance: largest edit distance, the configured one by default
+
+    Returns:
+        list: [{"lang_id": lang_id, "lang_name": lang_name, "distance": int}]
+    '''
+    max_distance = MAX_EDIT_DISTANCE if max_distance is None else max_distance
+    return [{'lang_id': similar_id, 'lang_name': similar_name, 'distance': distance}
+            for similar_id, similar_name, distance in language_catalog.similar(
+                lang_name, max_distance, SIMILAR_LIMIT, exclude_id)]
+
+def near_duplicate_guard():
+    '''
+    Returns check(lang_name, lang_id=None) for the names of one batch
+    or import, listing like similar_languages the known languages close
+    to lang_name and the names checked before it by the same check. A
+    name close to none of them is remembered for the next ones. The
+    list is always empty when the fuzzy duplicate guard is disabled
+
+    Returns:
+        callable(lang_name, lang_id=None) -> list
+    '''
+    checked = TrigramIndex()
+    # normalized name -> (lang_id, lang_name) of the names checked so far
+    checked_names = {}
+
+    def check(lang_name: str, lang_id: int = None) -> list:
+        if not FUZZY_DUPLICATE_GUARD:
+            return []
+        normalized = normalize_name(lang_name)
+        similar = similar_languages(lang_name, lang_id)
+        for distance, checked_name in checked.similar(normalized, MAX_EDIT_DISTANCE, SIMILAR_LIMIT):
+            similar_id, similar_name = checked_names[checked_name]
+            similar.append({'lang_id': similar_id, 'lang_name': similar_name, 'distance': distance})
+        if similar:
+            return sorted(similar, key=lambda language: language['distance'])[:SIMILAR_LIMIT]
+        checked.add(normalized)
+        checked_names[normalized] = (lang_id, lang_name)
+        return []
+
+    return check
+
+def not_modified_response(etag: str) -> Response:
+    '''
+    Creates an empty 304 response for a conditional GET
+
+    Args:
+        etag: entity tag the client already holds
+
+    Returns:
+        Response: 304 Not Modified carrying the ETag
+    '''
+    return Response(status=HTTPStatus.NOT_MODIFIED, headers={'ETag': quote_etag(etag)})
+
 @app.route('/languages', methods=['POST'])
 def create_language() -> (dict, str):
     '''Handles a POST request for adding a new language to the database
@@ -68,31 +356,217 @@ def create_language() -> (dict, str):
         if request.headers['Content-type'] != 'application/json':
             return error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
         lang_input = json.loads(request.data)
-        logger.info(f"Received a request to create a new language with input as: {lang_input}")
+        logger.info('Received a request to create a new language with input as: %s', lang_input)
         lang_name = lang_input['lang_name']
     except (ValueError, KeyError, TypeError) as json_err:
-        logger.error(f"Can not process request, Invalid JSON format: {json_err}")
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
         return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
     if lang_name == '' or not isinstance(lang_name, str):
-        logger.error(f"Can not process request, Invalid input. language name must not be empty and non string")
+        logger.error('Can not process request, Invalid input. language name must not be empty and non string')
         return error_response('Invalid input', HTTPStatus.UNPROCESSABLE_ENTITY)
-    if lang_name in existing_language.values():
-        logger.error(f"Can not process request, language name already exists. language name must be unique")
-        return error_response('Language already exists', HTTPStatus.CONFLICT)
-    _db_manager = DatabaseManager()
-    if _db_manager is not None:
-        lang_id = _db_manager.add_language(lang_name) or None
-        if lang_id is not None:
-            logger.info(f"language {lang_name} successfully added with ID: {lang_id}. \
-                Now updating in memory store")
-            existing_language[lang_id] = lang_name
-        else:
-            logger.error(f"Failed to add language {lang_name} in the database")
-            return error_response('Some problem occured. Failed to add new language entry')
+    with language_catalog.reserve(lang_name) as reserved:
+        if not reserved:
+            logger.error('Can not process request, language name already exists. language name must be unique')
+            return error_response('Language already exists', HTTPStatus.CONFLICT)
+        similar = similar_languages(lang_name) if FUZZY_DUPLICATE_GUARD else []
+        if similar:
+            logger.error('Can not process request, language name %s is too close to: %s', lang_name, similar)
+            return error_response('Language is too similar to existing languages', HTTPStatus.CONFLICT, similar)
+        _db_manager = DatabaseManager(client_key())
+        if _db_manager is not None:
+            try:
+                lang_id = _db_manager.add_language(lang_name) or None
+            except InvalidLanguageError as lang_err:
+                return error_response(str(lang_err), HTTPStatus.UNPROCESSABLE_ENTITY)
+            if lang_id is not None:
+                logger.info('language %s successfully added with ID: %s. Now updating in memory store',
+                            lang_name, lang_id)
+                language_catalog.add(lang_id, lang_name)
+            else:
+                logger.error('Failed to add language %s in the database', lang_name)
+                return error_response('Some problem occured. Failed to add new language entry')
     return success_response(HTTPStatus.CREATED, lang_id)
 
-@app.route('/languages/<lang_id>', methods=['DELETE'])
-def delete_language(lang_id=None) -> (dict, str):
+@app.route('/languages/bulk', methods=['POST'])
+def create_languages() -> (dict, str):
+    '''Handles a POST request for adding many new languages at once.
+    Accepts either a JSON array of names or {"lang_names": [...]}. Every
+    valid name is inserted within a single transaction
+
+    Args:
+        None
+
+    Returns:
+        [success_response | error_response]: dict: dictionary with response
+        [{error: "", "data": [{"lang_name": lang_name, "lang_id": lang_id, "error": "",
+                               "similar": [...] when too close to other languages}]} |
+        {error: <error_string>, "data": ''}
+        status_code: int
+    '''
+    try:
+        if request.headers['Content-type'] != 'application/json':
+            return error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        lang_input = json.loads(request.data)
+        lang_names = lang_input['lang_names'] if isinstance(lang_input, dict) else lang_input
+        if not isinstance(lang_names, list):
+            raise TypeError('a list of language names is expected')
+    except (ValueError, KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+    logger.info('Received a request to create %s new languages', len(lang_names))
+
+    results = [{'lang_name': lang_name, 'lang_id': None, 'error': ''} for lang_name in lang_names]
+    candidates = []
+    for result in results:
+        try:
+            validate_language_name(result['lang_name'])
+        except InvalidLanguageError as lang_err:
+            result['error'] = str(lang_err)
+            continue
+        candidates.append(result)
+
+    check_similar = near_duplicate_guard()
+    with language_catalog.reserve_many([result['lang_name'] for result in candidates]) as reserved:
+        to_insert = []
+        for result, is_free in zip(candidates, reserved):
+            if not is_free:
+                result['error'] = 'Language already exists'
+                continue
+            similar = check_similar(result['lang_name'])
+            if similar:
+                result['error'] = 'Language is too similar to existing languages'
+                result['similar'] = similar
+                continue
+            to_insert.append(result)
+        if to_insert:
+            _db_manager = DatabaseManager(client_key())
+            lang_ids = _db_manager.add_languages([result['lang_name'] for result in to_insert])
+            for result, lang_id in zip(to_insert, lang_ids):
+                result['lang_id'] = lang_id
+                language_catalog.add(lang_id, result['lang_name'])
+    logger.info('%s of %s languages successfully added', len(to_insert), len(results))
+    status_code = HTTPStatus.CREATED if to_insert else HTTPStatus.UNPROCESSABLE_ENTITY
+    return success_response(status_code, lang_obj=results)
+
+@app.route('/languages', methods=['PATCH'])
+def update_languages() -> (dict, str):
+    '''Handles a PATCH request for renaming many languages at once.
+    Accepts either a JSON array of {"lang_id", "lang_name"} objects or
+    {"languages": [...]}. Either every language is updated or none
+
+    Args:
+        None
+
+    Returns:
+        [success_response | error_response]: dict: dictionary with response
+        [{error: "", "data": [{"lang_id": lang_id, "lang_name": lang_name, "error": ""}]} |
+        {error: <error_string>, "data": [{"lang_id": lang_id, "lang_name": lang_name, "error": <error_string>,
+                                          "similar": [...] when too close to other languages}]}
+        status_code: int
+    '''
+    try:
+        if request.headers['Content-type'] != 'application/json':
+            return error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        lang_input = json.loads(request.data)
+        languages = lang_input['languages'] if isinstance(lang_input, dict) else lang_input
+        results = [{'lang_id': int(language['lang_id']), 'lang_name': language['lang_name'], 'error': ''}
+                   for language in languages]
+    except (ValueError, KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+    logger.info('Received a request to update %s languages', len(results))
+
+    seen_ids = set()
+    for result in results:
+        if result['lang_id'] in seen_ids:
+            result['error'] = 'Language ID repeated within the request'
+        elif not language_catalog.has_id(result['lang_id']):
+            result['error'] = 'Language does not exist'
+        else:
+            try:
+                validate_language_name(result['lang_name'])
+            except InvalidLanguageError as lang_err:
+                result['error'] = str(lang_err)
+        seen_ids.add(result['lang_id'])
+
+    # only valid names are reserved, an invalid one may not even be a string
+    candidates = [result for result in results if not result['error']]
+    with language_catalog.reserve_many([result['lang_name'] for result in candidates],
+                                       [result['lang_id'] for result in candidates]) as reserved:
+        check_similar = near_duplicate_guard()
+        for result, is_free in zip(candidates, reserved):
+            if not is_free:
+                result['error'] = 'Language name must be unique'
+                continue
+            similar = check_similar(result['lang_name'], result['lang_id'])
+            if similar:
+                result['error'] = 'Language is too similar to existing languages'
+                result['similar'] = similar
+        if any(result['error'] for result in results):
+            logger.error('Can not process request, batch update rejected as a whole')
+            return error_response('Batch rejected, no language was updated',
+                                  HTTPStatus.UNPROCESSABLE_ENTITY, results)
+        _db_manager = DatabaseManager(client_key())
+        try:
+            _db_manager.update_languages([(result['lang_id'], result['lang_name']) for result in results])
+        except MissingLanguagesError as missing_err:
+            for result in results:
+                if result['lang_id'] in missing_err.lang_ids:
+                    result['error'] = 'Language does not exist'
+            return error_response('Batch rejected, no language was updated', HTTPStatus.NOT_FOUND, results)
+        for result in results:
+            language_catalog.update(result['lang_id'], result['lang_name'])
+    logger.info('%s languages successfully updated', len(results))
+    return success_response(HTTPStatus.OK, lang_obj=results)
+
+@app.route('/languages', methods=['DELETE'])
+def delete_languages() -> (dict, str):
+    '''Handles a DELETE request for deleting many languages at once.
+    Accepts either a JSON array of ids or {"lang_ids": [...]}. Either
+    every language is deleted or none
+
+    Args:
+        None
+
+    Returns:
+        [success_response | error_response]: dict: dictionary with response
+        [{error: "", "data": [{"lang_id": lang_id, "error": ""}]} |
+        {error: <error_string>, "data": [{"lang_id": lang_id, "error": <error_string>}]}
+        status_code: int
+    '''
+    try:
+        if request.headers['Content-type'] != 'application/json':
+            return error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        lang_input = json.loads(request.data)
+        lang_ids = lang_input['lang_ids'] if isinstance(lang_input, dict) else lang_input
+        results = [{'lang_id': int(lang_id), 'error': ''} for lang_id in lang_ids]
+    except (ValueError, KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+    logger.info('Received a request to delete %s languages', len(results))
+
+    for result in results:
+        if not language_catalog.has_id(result['lang_id']):
+            result['error'] = 'Language does not exist'
+    if any(result['error'] for result in results):
+        logger.error('Can not process request, batch delete rejected as a whole')
+        return error_response('Batch rejected, no language was deleted', HTTPStatus.NOT_FOUND, results)
+    _db_manager = DatabaseManager(client_key())
+    lang_ids = list(dict.fromkeys(result['lang_id'] for result in results))
+    try:
+        _db_manager.delete_languages(lang_ids)
+    except MissingLanguagesError as missing_err:
+        for result in results:
+            if result['lang_id'] in missing_err.lang_ids:
+                result['error'] = 'Language does not exist'
+        return error_response('Batch rejected, no language was deleted', HTTPStatus.NOT_FOUND, results)
+    for lang_id in lang_ids:
+        language_catalog.remove(lang_id)
+    logger.info('%s languages successfully deleted', len(lang_ids))
+    return success_response(HTTPStatus.OK, lang_obj=results)
+
+@app.route('/languages/<int:lang_id>', methods=['DELETE'])
+def delete_language(lang_id: int=None) -> (dict, str):
     '''Handles a DELETE request for deleting an existing language
        from the database
 
@@ -105,20 +579,20 @@ def delete_language(lang_id=None) -> (dict, str):
         {error: <error_string>, "data": ''}
         status_code: int
     '''
-    logger.info(f"Received a request to delete the language: {lang_id}")
-    if lang_id not in existing_language.keys():
-        logger.error(f'Language does not exist with ID:{lang_id}')
+    logger.info('Received a request to delete the language: %s', lang_id)
+    if not language_catalog.has_id(lang_id):
+        logger.error('Language does not exist with ID:%s', lang_id)
         return error_response('Language does not exist', HTTPStatus.NOT_FOUND)
-    _db_manager = DatabaseManager()
+    _db_manager = DatabaseManager(client_key())
     if _db_manager is not None:
         _db_manager.delete_language(lang_id)
-        logger.info(f"language with ID: {lang_id} successfully deleted.\
-                Now updating in memory store for respective entry")
-        del existing_language[lang_id]
+        logger.info('language with ID: %s successfully deleted. '
+                    'Now updating in memory store for respective entry', lang_id)
+        language_catalog.remove(lang_id)
     # TODO: Handle Language already in use
     return success_response(HTTPStatus.OK, lang_id)
 
-@app.route('/languages/<lang_id>', methods=['PUT'])
+@app.route('/languages/<int:lang_id>', methods=['PUT'])
 def update_language(lang_id: int=None) -> (dict, str):
     '''Handles a PUT request for updating an existing language
        from the database
@@ -136,29 +610,37 @@ def update_language(lang_id: int=None) -> (dict, str):
         if request.headers['Content-type'] != 'application/json':
             return error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
         lang_input = json.loads(request.data)
-        logger.info(f"Received a request to update a language with input as: {lang_input}")
+        logger.info('Received a request to update a language with input as: %s', lang_input)
         lang_name = lang_input['lang_name']
     except (ValueError, KeyError, TypeError) as json_err:
-        logger.error(f"Can not process request, Invalid JSON format: {json_err}")
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
         return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
     if lang_name == '' or not isinstance(lang_name, str):
-        logger.error(f"Can not process request, Invalid input. language name must not be empty and non string")
+        logger.error('Can not process request, Invalid input. language name must not be empty and non string')
         return error_response('Invalid input', HTTPStatus.UNPROCESSABLE_ENTITY)
-    if lang_id not in existing_language.keys():
-        logger.error(f"Can not process request, language ID does not exist to update")
+    if not language_catalog.has_id(lang_id):
+        logger.error('Can not process request, language ID does not exist to update')
         return error_response('Language does not exist', HTTPStatus.NOT_FOUND)
-    if lang_name in existing_language.values():
-        logger.error(f"Can not process request, language name already exists. language name must be unique")
-        return error_response('Language name must be unique', HTTPStatus.CONFLICT)
-    _db_manager = DatabaseManager()
-    if _db_manager is not None:
-        _db_manager.update_language(lang_id, lang_name)
-        logger.info(f"language ID: {lang_id} successfully updated with: {lang_name}. \
-                Now updating in memory store")
-        existing_language[lang_id] = lang_name
+    with language_catalog.reserve(lang_name, lang_id) as reserved:
+        if not reserved:
+            logger.error('Can not process request, language name already exists. language name must be unique')
+            return error_response('Language name must be unique', HTTPStatus.CONFLICT)
+        similar = similar_languages(lang_name, lang_id) if FUZZY_DUPLICATE_GUARD else []
+        if similar:
+            logger.error('Can not process request, language name %s is too close to: %s', lang_name, similar)
+            return error_response('Language is too similar to existing languages', HTTPStatus.CONFLICT, similar)
+        _db_manager = DatabaseManager(client_key())
+        if _db_manager is not None:
+            try:
+                _db_manager.update_language(lang_id, lang_name)
+            except InvalidLanguageError as lang_err:
+                return error_response(str(lang_err), HTTPStatus.UNPROCESSABLE_ENTITY)
+            logger.info('language ID: %s successfully updated with: %s. Now updating in memory store',
+                        lang_id, lang_name)
+            language_catalog.update(lang_id, lang_name)
     return success_response(HTTPStatus.OK, lang_id)
 
-@app.route('/languages/<lang_id>', methods=['GET'])
+@app.route('/languages/<int:lang_id>', methods=['GET'])
 def get_a_language(lang_id: int=None) -> (dict, str):
     '''Handles a GET request to retrieve a language record
 
@@ -171,19 +653,43 @@ def get_a_language(lang_id: int=None) -> (dict, str):
         {error: <error_string>, "data": ''}
         status_code: int
     '''
-    logger.info(f"Received a request to get the language details for ID: {lang_id}")
-    if lang_id not in existing_language.keys():
-        logger.error(f"No data found for reqested language with ID: {lang_id}")
+    sampled_logger.debug('Received a request to get the language details for ID: %s', lang_id)
+    etag = language_catalog.item_etag(lang_id)
+    if etag is None:
+        logger.error('No data found for reqested language with ID: %s', lang_id)
         return error_response('Language does not exist', HTTPStatus.NOT_FOUND)
-    _db_manager = DatabaseManager()
-    if _db_manager is not None:
+    if request.if_none_match.contains(etag):
+        return not_modified_response(etag)
+
+    def build_payload():
+        if g.get('serve_from_catalog'):
+            return success_response(HTTPStatus.OK, lang_id, language_catalog.get_name(lang_id))[0]
+        _db_manager = DatabaseManager(client_key())
         lang_name = _db_manager.get_a_language(lang_id)
-        logger.info(f"data succesfully fetched: {lang_id}: {lang_name}")
-    return success_response(HTTPStatus.OK, lang_id, lang_name)
+        if lang_name != language_catalog.get_name(lang_id):
+            # a lagging replica answered, the bytes are cached under the
+            # catalog tag so they must match the catalog
+            lang_name = _db_manager.get_a_language(lang_id, use_primary=True)
+        sampled_logger.debug('data succesfully fetched: %s: %s', lang_id, lang_name)
+        return success_response(HTTPStatus.OK, lang_id, lang_name)[0]
+
+    # the item tag changes with the name, so it versions the cached bytes
+    return response_cache.response(build_payload, HTTPStatus.OK, key=('language', lang_id),
+                                   version=etag, headers={'ETag': quote_etag(etag)})
 
-@app.route('/languages/', methods=['GET'])
+# strict_slashes=False serves GET /languages, e.g. the multi-get
+# GET /languages?ids=1,2,3, here as well instead of redirecting it
+@app.route('/languages/', methods=['GET'], strict_slashes=False)
 def get_languages() -> (dict, str):
-    '''Handles a GET request to retrieve a language record
+    '''Handles a GET request to retrieve a language record.
+
+    Query parameters:
+        ids: comma separated language ids, e.g. ids=1,2,3, resolves
+            just those, see lookup_languages
+        limit: return a single page of at most limit languages ordered by id
+        after_id: id of the last language of the previous page
+        stream: when true, stream every language as the JSON array is
+            produced instead of building the response in memory
 
     Args:
         None
@@ -191,23 +697,419 @@ def get_languages() -> (dict, str):
     Returns:
         [success_response | error_response]: dict: dictionary with response
         [{error: "", "data": {Languages:[{"lang_id": lang_id, "lang_name": lang_name}]}} |
+        {error: "", "data": {"languages": [...], "next_after_id": lang_id}} |
+        {error: "", "data": {"languages": [...], "found": [...], "missing": [...]}} |
         {error: <error_string>, "data": ''}
         status_code: int
     '''
+    if 'ids' in request.args:
+        try:
+            lang_ids = parse_lang_ids(request.args['ids'])
+        except ValueError as arg_err:
+            return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+        return lookup_languages(lang_ids)
     languages = []
-    logger.info(f"Received a request to fetch all language data")
-    _db_manager = DatabaseManager()
-    if _db_manager is not None:
-        id_name_map = _db_manager.get_languages() or {}
-    if id_name_map:
-        logger.info(f"Fetched language data: {id_name_map}")
-        for id, name in id_name_map.items():
+    sampled_logger.debug('Received a request to fetch all language data')
+    try:
+        limit = parse_int_arg('limit', 1, MAX_PAGE_SIZE)
+        # ids are 32 bit integers in the database
+        after_id = parse_int_arg('after_id', 0, MAX_LANG_ID)
+    except ValueError as arg_err:
+        return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+    # every representation of the collection gets its own tag
+    version = language_catalog.version
+    etag = f'{language_catalog.etag()}-{limit}-{after_id}-{int(stream)}'
+    if request.if_none_match.contains(etag):
+        return not_modified_response(etag)
+    headers = {'ETag': quote_etag(etag)}
+    if stream:
+        response = stream_languages(language_catalog.snapshot() if g.get('serve_from_catalog') else None)
+        response.headers.update(headers)
+        return response
+
+    def build_page():
+        if g.get('serve_from_catalog'):
+            id_name_pairs = language_catalog.snapshot().page(after_id, limit or MAX_PAGE_SIZE)
+        else:
+            _db_manager = DatabaseManager(client_key())
+            id_name_pairs = (_db_manager.get_languages(limit=limit or MAX_PAGE_SIZE, after_id=after_id)
+                             or {}).items()
+            if any(language_catalog.get_name(id) != name for id, name in id_name_pairs):
+                # a lagging replica answered, see get_a_language
+                id_name_pairs = (_db_manager.get_languages(limit=limit or MAX_PAGE_SIZE, after_id=after_id,
+                                                           use_primary=True) or {}).items()
+        languages = [{'lang_id': id, 'lang_name': name} for id, name in id_name_pairs]
+        next_after_id = languages[-1]['lang_id'] if len(languages) == (limit or MAX_PAGE_SIZE) else None
+        return success_response(HTTPStatus.OK,
+                                lang_obj={'languages': languages, 'next_after_id': next_after_id})[0]
+
+    def build_collection():
+        # the catalog already holds every language, a second copy of the
+        # whole table is not fetched from the database or its cache
+        for id, name in language_catalog.snapshot():
             languages.append({'lang_id': id, 'lang_name': name})
-    return success_response(HTTPStatus.OK, lang_obj=languages)
+        sampled_logger.debug('Fetched language data: %s languages', len(languages))
+        return success_response(HTTPStatus.OK, lang_obj=languages)[0]
+
+    paginated = limit is not None or after_id is not None
+    # the version is read before building, so bytes encoded from data
+    # older than a concurrent write are never served for the new version
+    return response_cache.response(build_page if paginated else build_collection, HTTPStatus.OK,
+                                   key=('languages', limit, after_id), version=version,
+                                   headers=headers)
+
+def parse_int_arg(name: str, minimum: int, maximum: int):
+    '''
+    Returns the integer query parameter name, or None when absent
+
+    Args:
+        name: name of the query parameter
+        minimum: smallest accepted value
+        maximum: largest accepted value
+
+    Returns:
+        int or None
+
+    Exceptions:
+        ValueError
+    '''
+    raw_value = request.args.get(name)
+    if raw_value is None:
+        return None
+    try:
+        value = int(raw_value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if not minimum <= value <= maximum:
+        raise ValueError(f'{name} must be between {minimum} and {maximum}')
+    return value
+
+def parse_lang_ids(raw_ids) -> list:
+    '''
+    Returns the distinct language ids of a multi-get in request order
+
+    Args:
+        raw_ids: list of ids, or a comma separated string of them
+
+    Returns:
+        list: int ids
+
+    Exceptions:
+        ValueError
+    '''
+    if isinstance(raw_ids, str):
+        raw_ids = [raw_id for raw_id in raw_ids.split(',') if raw_id.strip()]
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise ValueError('a non empty list of language ids is expected')
+    if len(raw_ids) > MAX_LOOKUP_IDS:
+        raise ValueError(f'at most {MAX_LOOKUP_IDS} ids can be looked up at once')
+    lang_ids = []
+    for raw_id in raw_ids:
+        try:
+            if isinstance(raw_id, bool) or not isinstance(raw_id, (int, str)):
+                raise ValueError
+            lang_id = int(raw_id)
+        except ValueError:
+            raise ValueError(f'{raw_id!r} is not a language id')
+        # ids are 32 bit integers in the database
+        if not 0 < lang_id <= MAX_LANG_ID:
+            raise ValueError(f'{lang_id} is not a language id')
+        lang_ids.append(lang_id)
+    return list(dict.fromkeys(lang_ids))
+
+def lookup_languages(lang_ids: list) -> (dict, int):
+    '''
+    Resolves many language ids, from the in-memory catalog first. The
+    ids it does not know, e.g. languages just added by another worker,
+    are looked up in the read cache and the database all at once
+
+    Args:
+        lang_ids: distinct ids in the order they are reported
+
+    Returns:
+        success_response: dict: dictionary with response
+        {error: "", "data": {"languages": [{"lang_id": lang_id, "lang_name": lang_name}],
+                             "found": [lang_id], "missing": [lang_id]}}
+        status_code: int
+    '''
+    id_name_map = {}
+    misses = []
+    for lang_id in lang_ids:
+        lang_name = language_catalog.get_name(lang_id)
+        if lang_name is None:
+            misses.append(lang_id)
+        else:
+            id_name_map[lang_id] = lang_name
+    if misses and not g.get('serve_from_catalog'):
+        _db_manager = DatabaseManager(client_key())
+        id_name_map.update(_db_manager.get_languages_by_ids(misses))
+    sampled_logger.debug('Looked up %s languages, %s from the database', len(lang_ids), len(misses))
+    found = [lang_id for lang_id in lang_ids if lang_id in id_name_map]
+    missing = [lang_id for lang_id in lang_ids if lang_id not in id_name_map]
+    languages = [{'lang_id': lang_id, 'lang_name': id_name_map[lang_id]} for lang_id in found]
+    return success_response(HTTPStatus.OK, lang_obj={'languages': languages, 'found': found, 'missing': missing})
+
+@app.route('/languages/lookup', methods=['POST'])
+def lookup_many_languages() -> (dict, str):
+    '''Handles a POST request resolving many language ids at once, for
+    lists too long for a query string. Accepts either a JSON array of
+    ids or {"ids": [...]}
+
+    Args:
+        None
+
+    Returns:
+        [success_response | error_response]: dict: dictionary with response
+        [{error: "", "data": {"languages": [...], "found": [...], "missing": [...]}} |
+        {error: <error_string>, "data": ''}
+        status_code: int
+    '''
+    try:
+        if request.headers['Content-type'] != 'application/json':
+            return error_response('Unsupprted input format', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        lang_input = json.loads(request.data)
+        raw_ids = lang_input['ids'] if isinstance(lang_input, dict) else lang_input
+    except (ValueError, KeyError, TypeError) as json_err:
+        logger.error('Can not process request, Invalid JSON format: %s', json_err)
+        return error_response(f'Invalid JSON: {json_err}', HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+    try:
+        lang_ids = parse_lang_ids(raw_ids)
+    except ValueError as arg_err:
+        return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+    return lookup_languages(lang_ids)
+
+@app.route('/languages/search', methods=['GET'])
+def search_languages() -> (dict, str):
+    '''Handles a GET request for the languages whose name starts with a
+    prefix, ignoring case. Served from the in-memory catalog only
+
+    Query parameters:
+        prefix: beginning of the language names
+        limit: maximum number of languages to return, 10 by default
+
+    Args:
+        None
+
+    Returns:
+        [success_response | error_response]: dict: dictionary with response
+        [{error: "", "data": [{"lang_id": lang_id, "lang_name": lang_name}]} |
+        {error: <error_string>, "data": ''}
+        status_code: int
+    '''
+    try:
+        prefix = request.args.get('prefix')
+        limit = request.args.get('limit', 10, type=int)
+        if prefix is None:
+            raise ValueError('prefix is required')
+        if not 0 < limit <= MAX_SEARCH_LIMIT:
+            raise ValueError(f'limit must be between 1 and {MAX_SEARCH_LIMIT}')
+    except ValueError as arg_err:
+        return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+    matches = language_catalog.search(prefix, limit)
+    return success_response(HTTPStatus.OK, lang_obj=[
+        {'lang_id': lang_id, 'lang_name': lang_name} for lang_id, lang_name in matches])
+
+@app.route('/languages/similar', methods=['GET'])
+def get_similar_languages() -> (dict, str):
+    '''Handles a GET request for the languages whose name is within a few
+    edits of a given name, ignoring case. Served from the in-memory catalog
+
+    Query parameters:
+        name: name to compare
+        max_distance: largest edit distance, the configured one by default
+
+    Args:
+        None
+
+    Returns:
+        [success_response | error_response]: dict: dictionary with response
+        [{error: "", "data": [{"lang_id": lang_id, "lang_name": lang_name, "distance": int}]} |
+        {error: <error_string>, "data": ''}
+        status_code: int
+    '''
+    try:
+        lang_name = request.args.get('name')
+        max_distance = request.args.get('max_distance', MAX_EDIT_DISTANCE, type=int)
+        if not lang_name:
+            raise ValueError('name is required')
+        if not 0 <= max_distance <= 3:
+            raise ValueError('max_distance must be between 0 and 3')
+    except ValueError as arg_err:
+        return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+    return success_response(HTTPStatus.OK, lang_obj=similar_languages(lang_name, max_distance=max_distance))
+
+def stream_languages(id_name_pairs=None) -> Response:
+    '''Streams every language as a JSON array produced row by row from a
+    server side cursor, so peak memory does not depend on the catalog size
+
+    Args:
+        id_name_pairs: iterable of (lang_id, lang_name) streamed instead
+            of the database rows, e.g. a catalog snapshot
+
+    Returns:
+        Response: chunked application/json response
+    '''
+    if id_name_pairs is None:
+        id_name_pairs = DatabaseManager(client_key()).iter_languages()
+
+    def generate():
+        yield '{"error": "", "data": ['
+        separator = ''
+        for lang_id, lang_name in id_name_pairs:
+            yield separator + json.dumps({'lang_id': lang_id, 'lang_name': lang_name})
+            separator = ', '
+        yield ']}'
+
+    return Response(stream_with_context(generate()), status=HTTPStatus.OK,
+                    mimetype='application/json')
+
+@app.route('/languages/export', methods=['GET'])
+def export_languages() -> Response:
+    '''Handles a GET request streaming every language ordered by id, as
+    produced by the database, for backups and environment syncs. Memory
+    stays constant whatever the size of the catalog
+
+    Query parameters:
+        format: csv, with a header line, the default, or ndjson
+
+    Args:
+        None
+
+    Returns:
+        [Response | error_response]: chunked text/csv or
+        application/x-ndjson attachment |
+        {error: <error_string>, "data": ''}
+        status_code: int
+    '''
+    try:
+        fmt = check_format(request.args.get('format', 'csv'))
+    except ValueError as arg_err:
+        return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+    logger.info('Received a request to export every language as %s', fmt)
+    _db_manager = DatabaseManager(client_key())
+    chunks = stream_export(lambda out: _db_manager.export_languages(out, fmt))
+    # failing before the first byte, e.g. with an open circuit, still
+    # gets an error status
+    first_chunk = next(chunks, b'')
+
+    def generate():
+        try:
+            yield first_chunk
+            yield from chunks
+        finally:
+            # aborts the export when the client went away
+            chunks.close()
+
+    return Response(stream_with_context(generate()), status=HTTPStatus.OK, mimetype=TRANSFER_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=languages.{fmt}'})
+
+@app.route('/languages/import', methods=['POST'])
+def import_languages() -> (dict, str):
+    '''Handles a POST request merging the languages of its body, in the
+    format of an export, into the catalog. The body is streamed to the
+    database, rows with an id rename or insert that language, rows
+    without one are inserted under a new id. Conflicting rows are
+    skipped and reported
+
+    Query parameters:
+        format: csv or ndjson, by default taken from the content type
+        report_limit: maximum number of conflicts reported, 100 by default
+
+    Args:
+        None
+
+    Returns:
+        [success_response | error_response]: dict: dictionary with response
+        [{error: "", "data": {"inserted": int, "updated": int, "unchanged": int, "rejected": int,
+                              "conflicts": [{"row", "lang_id", "lang_name", "reason"}]}} |
+        {error: <error_string>, "data": ''}
+        status_code: int
+    '''
+    try:
+        fmt = check_format(request.args.get('format') or IMPORT_CONTENT_TYPES.get(request.mimetype, ''))
+        report_limit = request.args.get('report_limit', 100, type=int)
+        if not 0 <= report_limit <= MAX_IMPORT_REPORT:
+            raise ValueError(f'report_limit must be between 0 and {MAX_IMPORT_REPORT}')
+    except ValueError as arg_err:
+        return error_response(f'Invalid input: {arg_err}', HTTPStatus.BAD_REQUEST)
+    logger.info('Received a request to import languages as %s', fmt)
+    _db_manager = DatabaseManager(client_key())
+    try:
+        # rows too close to a known or an earlier imported name are rejected as too_similar
+        report = _db_manager.import_languages(request.stream, fmt, report_limit,
+                                              near_duplicates=near_duplicate_guard() if FUZZY_DUPLICATE_GUARD
+                                              else None)
+    except InvalidImportError as import_err:
+        logger.error('Can not process request: %s', import_err)
+        return error_response(str(import_err), HTTPStatus.BAD_REQUEST)
+    logger.info('Import merged: %s inserted, %s updated, %s unchanged, %s rejected',
+                report['inserted'], report['updated'], report['unchanged'], report['rejected'])
+    if report['inserted'] or report['updated']:
+        reload_catalog()
+    return success_response(HTTPStatus.OK, lang_obj=report)
+
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats() -> (dict, str):
+    '''Handles a GET request to retrieve the read cache counters
+
+    Args:
+        None
+
+    Returns:
+        success_response: dict: dictionary with response
+        {error: "", "data": {"hits": int, "misses": int, "evictions": int, ...}}
+        status_code: int
+    '''
+    # answered from memory, reading the counters must not connect
+    _db_manager = DatabaseManager(connect=False)
+    return success_response(HTTPStatus.OK, lang_obj=_db_manager.cache_stats())
+
+@app.route('/health', methods=['GET'])
+def get_health() -> (dict, str):
+    '''Handles a GET request reporting whether the database is reachable,
+    answered from the circuit breaker and pool state without querying it
+
+    Args:
+        None
+
+    Returns:
+        success_response: dict: dictionary with response
+        {error: "", "data": {"circuit": {...}, "pool": {...}, "replicas": [...],
+                             "catalog_loaded": bool}}
+        status_code: int, 503 while the circuit is open
+    '''
+    # reports the provider as it is, a health check must not connect
+    _db_manager = DatabaseManager(connect=False)
+    circuit_stats = _db_manager.circuit_stats()
+    health = {'circuit': circuit_stats, 'pool': _db_manager.pool_stats(),
+              'replicas': _db_manager.replica_stats(), 'catalog_loaded': language_catalog.is_loaded()}
+    status_code = HTTPStatus.SERVICE_UNAVAILABLE if circuit_stats.get('state') == 'open' else HTTPStatus.OK
+    return success_response(status_code, lang_obj=health)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics() -> Response:
+    '''Handles a GET request exposing every metric in the Prometheus
+    text format
+
+    Args:
+        None
+
+    Returns:
+        Response: text/plain; version=0.0.4
+    '''
+    return Response(metrics.REGISTRY.render(), status=HTTPStatus.OK,
+                    mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
 
     server_section = confSection.SERVER_SECTION.value
-    app.run(host=config[server_section][serverSection.SERVER_IP_KEY.value], \
-            port=config[server_section][serverSection.SERVER_PORT_KEY.value])
+    if config.get(server_section, serverSection.SERVER_MODE_KEY.value, fallback='development') == 'production':
+        # gunicorn workers import this module as server, not __main__
+        from lang_exch.web.production import run
+        run()
+    else:
+        app.run(host=config[server_section][serverSection.SERVER_IP_KEY.value], \
+                port=config[server_section][serverSection.SERVER_PORT_KEY.value])
@@ -0,0 +1,113 @@
+'''Tests of the change events published and received by the asyncpg
+provider'''
+
+import asyncio
+import json
+
+import pytest
+
+asyncpg = pytest.importorskip('asyncpg')
+
+from lang_exch.db.asyncpg_db import AsyncPostgresDB  # noqa: E402
+from lang_exch.db.change_events import event_payload  # noqa: E402
+from lang_exch.models.language import Language  # noqa: E402
+
+DB_CONFIG = {'host': 'localhost', 'port': '5432', 'username': 'lang_exch', 'password': '',
+             'database': 'lang_exch'}
+
+
+class FakeTransaction:
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeConnection:
+    '''Records the statements it runs and the listeners it is given'''
+
+    def __init__(self):
+        self.executed = []
+        self.listeners = {}
+
+    def transaction(self):
+        return FakeTransaction()
+
+    async def fetchval(self, query, *args):
+        return 7
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def is_closed(self):
+        return False
+
+    def terminate(self):
+        pass
+
+
+class FakePool:
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def acquire(self):
+        conn = self._conn
+
+        class _Acquire:
+            async def __aenter__(self):
+                return conn
+
+            async def __aexit__(self, *exc_info):
+                return False
+        return _Acquire()
+
+    async def close(self):
+        pass
+
+
+def test_write_publishes_a_change_event():
+    conn = FakeConnection()
+    db = AsyncPostgresDB(db_config=DB_CONFIG)
+    db._AsyncPostgresDB__pool = FakePool(conn)
+
+    assert asyncio.run(db.add_language(Language('Tamil'))) == 7
+
+    query, (channel, payload) = conn.executed[-1]
+    assert 'pg_notify' in query
+    assert channel == 'lang_exch_languages'
+    event = json.loads(payload)
+    assert (event['op'], event['lang_id'], event['lang_name']) == ('insert', 7, 'Tamil')
+
+
+def test_notify_of_another_process_reaches_on_change(monkeypatch):
+    conn = FakeConnection()
+
+    async def connect(**kwargs):
+        return conn
+    monkeypatch.setattr(asyncpg, 'connect', connect)
+    received = []
+
+    async def scenario():
+        db = AsyncPostgresDB(db_config=DB_CONFIG)
+        listening = asyncio.Event()
+
+        async def on_reconnect():
+            listening.set()
+        await db.listen(received.append, on_reconnect)
+        await asyncio.wait_for(listening.wait(), 1)
+        on_notify = conn.listeners['lang_exch_languages']
+        other = json.dumps({'op': 'delete', 'lang_id': 3, 'lang_name': None, 'origin': 'another-process'})
+        on_notify(conn, 1, 'lang_exch_languages', other)
+        # the events of this very process are already applied
+        on_notify(conn, 1, 'lang_exch_languages', event_payload('delete', 4))
+        await db.close()
+
+    asyncio.run(scenario())
+
+    assert received == [{'op': 'delete', 'lang_id': 3, 'lang_name': None, 'origin': 'another-process'}]
@@ -0,0 +1,57 @@
+'''Tests of the multi-get forms of the languages collection'''
+
+import pytest
+
+pytest.importorskip('flask')
+
+import server  # noqa: E402
+
+
+class FakeDatabaseManager:
+    '''Knows a single language the catalog does not, as if just added by
+    another worker'''
+
+    def __init__(self, client_key=None):
+        pass
+
+    def get_languages_by_ids(self, lang_ids):
+        return {lang_id: 'Tamil' for lang_id in lang_ids if lang_id == 3}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, 'DatabaseManager', FakeDatabaseManager)
+    server.language_catalog.load({1: 'English', 2: 'French'})
+    return server.app.test_client()
+
+
+def test_get_form_resolves_the_ids(client):
+    response = client.get('/languages?ids=2,1,3,4,2')
+
+    assert response.status_code == 200
+    assert response.get_json()['data'] == {
+        'languages': [{'lang_id': 2, 'lang_name': 'French'}, {'lang_id': 1, 'lang_name': 'English'},
+                      {'lang_id': 3, 'lang_name': 'Tamil'}],
+        'found': [2, 1, 3],
+        'missing': [4],
+    }
+
+
+def test_get_form_with_trailing_slash(client):
+    response = client.get('/languages/?ids=1')
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['found'] == [1]
+
+
+def test_get_form_rejects_invalid_ids(client):
+    assert client.get('/languages?ids=1,abc').status_code == 400
+    assert client.get('/languages?ids=').status_code == 400
+
+
+def test_post_form_resolves_the_ids(client):
+    response = client.post('/languages/lookup', json={'ids': [4, 1]})
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['found'] == [1]
+    assert response.get_json()['data']['missing'] == [4]
@@ -0,0 +1,21 @@
+'''Tests of the paging parameters of the languages collection'''
+
+import pytest
+
+pytest.importorskip('flask')
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+@pytest.mark.parametrize('query', ['limit=abc', 'limit=0', 'limit=1001', 'limit=10&after_id=3000000000',
+                                   'after_id=-1', 'after_id=x'])
+def test_invalid_paging_is_rejected(client, query):
+    response = client.get(f'/languages/?{query}')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid input')